@@ -1,4 +1,4 @@
-from . import checkpointer, extensions, loggers
+from . import checkpointer, extensions, loggers, tasks
 from ._version import __version__
 from .flowmancer import Flowmancer
 from .jobdefinition import file
@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import mmap
+import os
+import re
+import shutil
+from typing import Any, Dict, List, Optional, cast
+
+from pydantic import BaseModel
+
+DEFAULT_ARTIFACT_DIRECTORY = './.flowmancer/artifacts'
+
+_NAME_PATTERN = re.compile(r'^[A-Za-z0-9_.-]+$')
+_DATA_SUFFIX = '.bin'
+_MANIFEST_SUFFIX = '.json'
+
+
+class ArtifactNotFoundError(KeyError):
+    pass
+
+
+class ArtifactExistsError(Exception):
+    pass
+
+
+class ArtifactChecksumError(Exception):
+    pass
+
+
+class ArtifactsUnavailableError(Exception):
+    pass
+
+
+class ArtifactManifest(BaseModel):
+    name: str
+    producer: str
+    size: int
+    # `struct` format and shape of the buffer that was stored, which `get` restores on the returned `memoryview`.
+    format: str = 'B'
+    shape: List[int] = []
+    # Optional, e.g. the `dtype` of a numpy array, which may describe the data more precisely than `format`.
+    dtype: Optional[str] = None
+    sha256: str
+
+
+def _to_bytes_view(data: Any) -> memoryview:
+    view = memoryview(data)
+    if not view.c_contiguous:
+        view = memoryview(view.tobytes())
+    return view.cast('B') if view.ndim != 1 or view.format != 'B' else view
+
+
+class ArtifactStore:
+    # Hands large buffers from one task to the tasks downstream of it without going through `shared_dict`. Each
+    # artifact is written once to a file in the job's artifact directory, alongside a JSON manifest, and every reader
+    # maps that file into memory rather than copying it. Artifacts are removed by the job once every task downstream of
+    # their producer has completed.
+    def __init__(self, directory: str = DEFAULT_ARTIFACT_DIRECTORY, producer: str = 'unnamed') -> None:
+        self.directory = directory
+        self.producer = producer
+        self._maps: Dict[str, mmap.mmap] = dict()
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return {'directory': self.directory, 'producer': self.producer}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.directory = state['directory']
+        self.producer = state['producer']
+        self._maps = dict()
+
+    def _path(self, name: str, suffix: str) -> str:
+        if not _NAME_PATTERN.match(name):
+            raise ValueError(f'Artifact names may only contain letters, digits, `_`, `.` and `-`: {name}')
+        return os.path.join(self.directory, name + suffix)
+
+    def put(self, name: str, data: Any, dtype: Optional[str] = None) -> ArtifactManifest:
+        # `data` may be any object supporting the buffer protocol: `bytes`, `bytearray`, `memoryview`, `array.array`,
+        # a numpy array and so on.
+        source = memoryview(data)
+        view = _to_bytes_view(data)
+        existing = self.manifest(name) if os.path.exists(self._path(name, _MANIFEST_SUFFIX)) else None
+        if existing is not None and existing.producer != self.producer:
+            raise ArtifactExistsError(f"Artifact '{name}' was already produced by task '{existing.producer}'.")
+
+        os.makedirs(self.directory, exist_ok=True)
+        data_path = self._path(name, _DATA_SUFFIX)
+        tmp_path = f'{data_path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb+') as f:
+            if view.nbytes:
+                f.truncate(view.nbytes)
+                with mmap.mmap(f.fileno(), view.nbytes) as m:
+                    m[:] = view
+                    m.flush()
+        os.replace(tmp_path, data_path)
+
+        manifest = ArtifactManifest(
+            name=name,
+            producer=self.producer,
+            size=view.nbytes,
+            format=source.format,
+            shape=list(source.shape or []),
+            dtype=dtype or (str(data.dtype) if hasattr(data, 'dtype') else None),
+            sha256=hashlib.sha256(view).hexdigest()
+        )
+        # The manifest is written last, so an artifact is only visible once its data is complete.
+        manifest_path = self._path(name, _MANIFEST_SUFFIX)
+        with open(f'{manifest_path}.tmp', 'w') as f:
+            f.write(manifest.model_dump_json())
+        os.replace(f'{manifest_path}.tmp', manifest_path)
+        return manifest
+
+    def manifest(self, name: str) -> ArtifactManifest:
+        try:
+            with open(self._path(name, _MANIFEST_SUFFIX), 'r') as f:
+                return ArtifactManifest(**json.load(f))
+        except FileNotFoundError:
+            raise ArtifactNotFoundError(name)
+
+    def get(self, name: str, verify: bool = False) -> memoryview:
+        # Returns a read-only view directly over the mapped file. Use `np.frombuffer(view, dtype=...)` or similar to
+        # wrap it without copying.
+        manifest = self.manifest(name)
+        if not manifest.size:
+            return memoryview(b'')
+        if name not in self._maps:
+            with open(self._path(name, _DATA_SUFFIX), 'rb') as f:
+                self._maps[name] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._maps[name])
+        if verify and hashlib.sha256(view).hexdigest() != manifest.sha256:
+            raise ArtifactChecksumError(f"Checksum of artifact '{name}' does not match its manifest.")
+        try:
+            # `memoryview.cast` is typed for literal formats only.
+            fmt = cast(Any, manifest.format)
+            return view.cast(fmt, manifest.shape) if manifest.shape else view.cast(fmt)
+        except (TypeError, ValueError):
+            # Formats that `memoryview.cast` does not support (e.g. numpy structured types) are returned as raw bytes.
+            return view
+
+    def names(self) -> List[str]:
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(f[:-len(_MANIFEST_SUFFIX)] for f in os.listdir(self.directory) if f.endswith(_MANIFEST_SUFFIX))
+
+    def delete(self, name: str) -> None:
+        m = self._maps.pop(name, None)
+        if m is not None:
+            try:
+                m.close()
+            except BufferError:
+                # Views handed out by `get` are still alive; the mapping is released with them.
+                pass
+        for suffix in (_MANIFEST_SUFFIX, _DATA_SUFFIX):
+            try:
+                os.unlink(self._path(name, suffix))
+            except FileNotFoundError:
+                pass
+
+    def delete_produced_by(self, producer: str) -> List[str]:
+        deleted = []
+        for name in self.names():
+            try:
+                if self.manifest(name).producer == producer:
+                    self.delete(name)
+                    deleted.append(name)
+            except ArtifactNotFoundError:
+                pass
+        return deleted
+
+    def clear(self) -> None:
+        self.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def close(self) -> None:
+        for name in list(self._maps.keys()):
+            m = self._maps.pop(name)
+            try:
+                m.close()
+            except BufferError:
+                pass
+
+
+class UnavailableArtifactStore(ArtifactStore):
+    # Handed to tasks that share no artifact directory with the rest of their job, e.g. those run by remote workers.
+    # Any use of it fails, rather than storing artifacts that no other task would ever see nor the job clean up.
+    def __init__(self, reason: str, producer: str = 'unnamed') -> None:
+        super().__init__('', producer)
+        self.reason = reason
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return {**super().__getstate__(), 'reason': self.reason}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        super().__setstate__(state)
+        self.reason = state['reason']
+
+    def _path(self, name: str, suffix: str) -> str:
+        raise ArtifactsUnavailableError(self.reason)
+
+    def names(self) -> List[str]:
+        return []
+
+    def clear(self) -> None:
+        pass
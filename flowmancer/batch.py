@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import asyncio
+from contextlib import asynccontextmanager
+from multiprocessing import Pipe, Process
+from multiprocessing.connection import Connection
+from multiprocessing.sharedctypes import RawArray
+from typing import Any, AsyncIterator, List, Optional, Sequence, Set, Tuple
+
+from .eventbus.execution import ExecutionState
+from .executor import Dispatcher, Executor, ProcessResult, exec_task_lifecycle
+
+
+def _run_batch(specs: List[Tuple[Any, ...]], conn: Connection, cancelled: Sequence[int]) -> None:
+    # Runs in the batch's process. Each task is announced as it starts and again once it has finished, so that the job
+    # knows which ones to pick back up should the process die part way through.
+    ran = 0
+    for i, args in enumerate(specs):
+        if cancelled[i]:
+            continue
+        conn.send(('start', i))
+        # `shared_process` follows the arguments given by `Executor.lifecycle_args`.
+        exec_task_lifecycle(*args + (ran > 0,))
+        conn.send(('done', i))
+        ran += 1
+    conn.close()
+
+
+@asynccontextmanager
+async def _held(semaphore: Optional[asyncio.Semaphore]) -> AsyncIterator[None]:
+    if semaphore is None:
+        yield
+        return
+    async with semaphore:
+        yield
+
+
+class _Attempt:
+    __slots__ = ('executor', 'result', 'future', 'batch', 'index')
+
+    def __init__(self, executor: Executor, result: ProcessResult, future: asyncio.Future) -> None:
+        self.executor = executor
+        self.result = result
+        self.future = future
+        self.batch: Optional[_Batch] = None
+        self.index = -1
+
+
+class _Batch:
+    __slots__ = ('attempts', 'cancelled', 'current', 'started', 'proc')
+
+    def __init__(self, attempts: List[_Attempt]) -> None:
+        self.attempts = attempts
+        # Set for attempts cancelled before the batch's process got to them, which it then skips.
+        self.cancelled = RawArray('b', len(attempts))
+        # The attempt the batch's process is running, if any.
+        self.current = -1
+        self.started: Set[int] = set()
+        self.proc: Optional[Process] = None
+        for i, a in enumerate(attempts):
+            a.batch = self
+            a.index = i
+
+    def on_message(self, kind: str, i: int) -> None:
+        if kind == 'start':
+            self.current = i
+            self.started.add(i)
+            # Until now the task has only been waiting for its turn. Those cancelled meanwhile are left as they are.
+            if not self.attempts[i].future.done():
+                self.attempts[i].executor.state = ExecutionState.RUNNING
+            return
+        self.current = -1
+        future = self.attempts[i].future
+        if not future.done():
+            future.set_result(None)
+
+
+class BatchDispatcher(Dispatcher):
+    # Runs the attempts of many tasks one after another in a single process, so that jobs of many short tasks do not
+    # spend most of their time starting processes. Attempts are gathered for up to `max_wait_seconds`, or until there
+    # are `max_size` of them. Each task still goes through its own lifecycle, with its own logs and result; a failing
+    # task fails alone and, should the process die part way through, whichever tasks it had yet to start are run in
+    # another. A batch takes a single `max_concurrency` slot.
+    takes_slot = False
+    announces_start = True
+
+    def __init__(self, max_size: int = 50, max_wait_seconds: float = 0.01) -> None:
+        self.max_size = max(1, max_size)
+        self.max_wait_seconds = max_wait_seconds
+        self._pending: List[_Attempt] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._batches: Set[asyncio.Task] = set()
+
+    async def run(self, executor: Executor, result: ProcessResult) -> None:
+        attempt = _Attempt(executor, result, asyncio.get_running_loop().create_future())
+        self._submit(attempt)
+        try:
+            await attempt.future
+        except asyncio.CancelledError:
+            self._cancel(attempt)
+            raise
+
+    async def stop(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._batches:
+            await asyncio.gather(*self._batches, return_exceptions=True)
+
+    def _submit(self, attempt: _Attempt) -> None:
+        attempt.batch = None
+        self._pending.append(attempt)
+        if len(self._pending) >= self.max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.max_wait_seconds, self._flush)
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._pending:
+            attempts, self._pending = self._pending[:self.max_size], self._pending[self.max_size:]
+            t = asyncio.create_task(self._run_batch(attempts))
+            self._batches.add(t)
+            t.add_done_callback(self._batches.discard)
+
+    def _cancel(self, attempt: _Attempt) -> None:
+        batch = attempt.batch
+        if batch is None:
+            if attempt in self._pending:
+                self._pending.remove(attempt)
+            return
+        batch.cancelled[attempt.index] = 1
+        if batch.current == attempt.index and batch.proc is not None and batch.proc.is_alive():
+            # As with a task run in a process of its own, SIGTERM runs its `on_abort`.
+            batch.proc.terminate()
+
+    @staticmethod
+    def _watch(loop: asyncio.AbstractEventLoop, batch: _Batch, conn: Connection) -> None:
+        try:
+            while True:
+                kind, i = conn.recv()
+                loop.call_soon_threadsafe(batch.on_message, kind, i)
+        except (EOFError, OSError):
+            pass
+        finally:
+            conn.close()
+
+    async def _run_batch(self, attempts: List[_Attempt]) -> None:
+        loop = asyncio.get_running_loop()
+        first = attempts[0].executor
+        async with _held(first.semaphore), _held(first.shared_semaphore):
+            attempts = [a for a in attempts if not a.future.done()]
+            if not attempts:
+                return
+            batch = _Batch(attempts)
+            reader, writer = Pipe(duplex=False)
+            batch.proc = Process(
+                target=_run_batch,
+                args=([a.executor.lifecycle_args(a.result) for a in attempts], writer, batch.cancelled),
+                daemon=False
+            )
+            batch.proc.start()
+            writer.close()
+            await loop.run_in_executor(None, BatchDispatcher._watch, loop, batch, reader)
+            await loop.run_in_executor(None, batch.proc.join)
+
+        exitcode = batch.proc.exitcode or 1
+        for a in attempts:
+            if a.future.done():
+                continue
+            if a.index in batch.started or not batch.started:
+                # The task the process died running. Should it have died before running any, they all fail, as another
+                # process would likely meet the same fate.
+                a.result.fail(exitcode)
+                a.future.set_result(None)
+            else:
+                self._submit(a)
@@ -0,0 +1,67 @@
+# Synthetic job shapes for the benchmark suite. Each generator returns a mapping of task name to the names of the tasks
+# it depends on, in an order where every task comes after its dependencies.
+from __future__ import annotations
+
+import time
+from typing import Callable, Dict, List
+
+from ..task import Task, task
+
+Dag = Dict[str, List[str]]
+
+
+@task
+class NoOpTask(Task):
+    def run(self) -> None:
+        pass
+
+
+@task
+class SleepTask(Task):
+    seconds: float = 0.01
+
+    def run(self) -> None:
+        time.sleep(self.seconds)
+
+
+def wide(nodes: int) -> Dag:
+    # One root that every other task depends on.
+    dag: Dag = {'t0': []}
+    for i in range(1, nodes):
+        dag[f't{i}'] = ['t0']
+    return dag
+
+
+def chain(nodes: int) -> Dag:
+    # Every task depends on the one before it, so the critical path is the whole job.
+    dag: Dag = {'t0': []}
+    for i in range(1, nodes):
+        dag[f't{i}'] = [f't{i - 1}']
+    return dag
+
+
+def diamond(nodes: int, width: int = 8) -> Dag:
+    # Repeated fan-out/fan-in: a join task, then `width` tasks depending on it, then the next join depending on all of
+    # them, and so on.
+    dag: Dag = {'t0': []}
+    join = 't0'
+    layer: List[str] = []
+    for i in range(1, nodes):
+        name = f't{i}'
+        if len(layer) < width:
+            dag[name] = [join]
+            layer.append(name)
+        else:
+            dag[name] = layer
+            join, layer = name, []
+    return dag
+
+
+SHAPES: Dict[str, Callable[[int], Dag]] = {'wide': wide, 'chain': chain, 'diamond': diamond}
+
+
+def critical_path_length(dag: Dag) -> int:
+    depth: Dict[str, int] = dict()
+    for name, deps in dag.items():
+        depth[name] = 1 + max((depth[d] for d in deps), default=0)
+    return max(depth.values(), default=0)
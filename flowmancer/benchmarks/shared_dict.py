@@ -0,0 +1,72 @@
+# Contention benchmark for the `shared_dict` backends: N processes hammer the same dict with a read-heavy workload,
+# mirroring tasks that read configuration out of `shared_dict` in an inner loop.
+#
+#   python -m flowmancer.benchmarks.shared_dict --processes 8 --reads 20000
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from multiprocessing import Barrier, Manager, Process, Queue
+from typing import Any, Dict, List, MutableMapping
+
+from ..shareddict import SharedMemoryDict
+
+
+def _worker(d: MutableMapping[str, Any], barrier: Any, out: Queue, idx: int, reads: int, write_every: int) -> None:
+    barrier.wait()
+    start = time.perf_counter()
+    for i in range(reads):
+        _ = d['config']
+        if write_every and i % write_every == 0:
+            d[f'counter-{idx}'] = i
+    out.put(time.perf_counter() - start)
+
+
+def _run(d: MutableMapping[str, Any], processes: int, reads: int, write_every: int) -> Dict[str, float]:
+    barrier = Barrier(processes)
+    out: Queue = Queue()
+    procs = [Process(target=_worker, args=(d, barrier, out, i, reads, write_every)) for i in range(processes)]
+    start = time.perf_counter()
+    for p in procs:
+        p.start()
+    elapsed: List[float] = [out.get() for _ in procs]
+    for p in procs:
+        p.join()
+    wall = time.perf_counter() - start
+    return {
+        'wall_seconds': wall,
+        'max_process_seconds': max(elapsed),
+        'reads_per_second': processes * reads / max(elapsed),
+    }
+
+
+def run_benchmark(processes: int = 4, reads: int = 10000, write_every: int = 100) -> Dict[str, Any]:
+    initial = {'config': {'threshold': 0.5, 'name': 'benchmark', 'values': list(range(32))}}
+    results: Dict[str, Any] = {'processes': processes, 'reads': reads, 'write_every': write_every}
+
+    with Manager() as manager:
+        results['manager'] = _run(manager.dict(initial), processes, reads, write_every)
+
+    shm = SharedMemoryDict.create(16 * 1024 * 1024, initial)
+    try:
+        results['shared_memory'] = _run(shm, processes, reads, write_every)
+    finally:
+        shm.close()
+        shm.unlink()
+
+    results['speedup'] = results['shared_memory']['reads_per_second'] / results['manager']['reads_per_second']
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Compare shared_dict backends under concurrent access.')
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--reads', type=int, default=10000)
+    parser.add_argument('--write-every', type=int, default=100, help='Write once per this many reads; 0 to disable.')
+    args = parser.parse_args()
+    print(json.dumps(run_benchmark(args.processes, args.reads, args.write_every), indent=2))
+
+
+if __name__ == '__main__':
+    main()
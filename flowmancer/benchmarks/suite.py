@@ -0,0 +1,325 @@
+# Performance benchmarks for the scheduler, the log bus, checkpointing and startup. Results are a flat mapping of
+# metric name to value, so that runs from different commits can be compared key by key:
+#
+#   flowmancer benchmark --output before.json
+#   flowmancer benchmark --compare before.json
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from multiprocessing import Manager, Process, Queue
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, cast
+
+from .._version import __version__
+from ..checkpointer import CheckpointContents
+from ..checkpointer.file import FileCheckpointer
+from ..eventbus import EventBus
+from ..eventbus.log import LogEndEvent, LogWriter, SerializableLogEvent, Severity
+from ..flowmancer import Flowmancer, _create_loop
+from ..jobdefinition import CheckpointerDefinition, ConfigurationDefinition, JobDefinition, TaskDefinition
+from ..loggers.file import FileLogger
+from . import shared_dict
+from .dags import SHAPES, Dag, chain, critical_path_length
+
+Results = Dict[str, float]
+
+
+@contextlib.contextmanager
+def _workdir() -> Iterator[str]:
+    # Jobs resolve a few paths relative to the working directory, so run each one in a scratch directory.
+    orig_cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix='flowmancer-benchmark-') as tmp:
+        os.chdir(tmp)
+        try:
+            yield tmp
+        finally:
+            os.chdir(orig_cwd)
+
+
+def _job_definition(
+    dag: Dag, directory: str, variant: str, parameters: Dict[str, Any], max_concurrency: int
+) -> JobDefinition:
+    return JobDefinition(
+        config=ConfigurationDefinition(
+            name='benchmark',
+            max_concurrency=max_concurrency,
+            artifact_directory=os.path.join(directory, 'artifacts'),
+            instrumentation_interval_seconds=0
+        ),
+        tasks={
+            n: TaskDefinition(variant=variant, depends_on=deps, parameters=parameters)  # type: ignore
+            for n, deps in dag.items()
+        },
+        loggers=dict(),
+        extensions=dict(),
+        checkpointer=CheckpointerDefinition(
+            variant='FileCheckpointer', parameters={'checkpoint_dir': directory}  # type: ignore
+        )
+    )
+
+
+def run_job(
+    dag: Dag, variant: str = 'NoOpTask', parameters: Optional[Dict[str, Any]] = None, max_concurrency: int = 0
+) -> float:
+    # Returns the wall time of the whole job, from start up to the last event being handled.
+    with _workdir() as tmp:
+        f = Flowmancer(test=True).load_job_definition(
+            _job_definition(dag, tmp, variant, parameters or dict(), max_concurrency), tmp
+        )
+        started = time.perf_counter()
+        ret = f.start(raise_exception_on_failure=True)
+        elapsed = time.perf_counter() - started
+    if ret:
+        raise RuntimeError(f'Benchmark job failed with {ret} failed task(s).')
+    return elapsed
+
+
+def bench_scheduling(nodes: int, max_concurrency: int) -> Results:
+    # Overhead of running no-op tasks, after taking away the cost of starting and stopping a job with a single task.
+    results: Results = dict()
+    base = run_job(chain(1), max_concurrency=max_concurrency)
+    results['scheduling.empty_job.wall_seconds'] = base
+    for shape, generate in SHAPES.items():
+        wall = run_job(generate(nodes), max_concurrency=max_concurrency)
+        results[f'scheduling.{shape}_{nodes}.wall_seconds'] = wall
+        results[f'scheduling.{shape}_{nodes}.seconds_per_task'] = max(0.0, wall - base) / max(1, nodes - 1)
+    return results
+
+
+def bench_critical_path(length: int, sleep_seconds: float) -> Results:
+    # Time between a task finishing and the next one in a chain starting, beyond the time the tasks themselves take.
+    parameters = {'seconds': sleep_seconds}
+    single = run_job(chain(1), 'SleepTask', parameters)
+    wall = run_job(chain(length), 'SleepTask', parameters)
+    hops = critical_path_length(chain(length)) - 1
+    return {
+        f'critical_path.chain_{length}.wall_seconds': wall,
+        f'critical_path.chain_{length}.hop_latency_seconds': max(0.0, wall - single - hops * sleep_seconds) / hops
+    }
+
+
+def bench_graph_setup(nodes: int) -> Results:
+    # Building and validating very large jobs, without running them.
+    results: Results = dict()
+    for shape, generate in SHAPES.items():
+        dag = generate(nodes)
+        f = Flowmancer(test=True)
+        started = time.perf_counter()
+        for n, deps in dag.items():
+            f.add_executor(name=n, task_class='NoOpTask', deps=deps)
+        added = time.perf_counter()
+        if not f._dependencies_are_valid():
+            raise RuntimeError(f'Generated {shape} job is not valid.')
+        f._validate_tasks()
+        validated = time.perf_counter()
+        results[f'graph_setup.{shape}_{nodes}.add_seconds_per_task'] = (added - started) / nodes
+        results[f'graph_setup.{shape}_{nodes}.validate_seconds'] = validated - added
+    return results
+
+
+async def _scheduled_bytes(f: Flowmancer) -> int:
+    # Memory taken by starting the job's scheduling, with every task held back from running.
+    for dtl in f._executors.values():
+        dtl.instance.semaphore = asyncio.Semaphore(0)
+    before = tracemalloc.get_traced_memory()[0]
+    root_event = asyncio.Event()
+    tasks = f._init_executors(root_event)
+    for _ in range(3):
+        await asyncio.sleep(0)
+    scheduled = tracemalloc.get_traced_memory()[0] - before
+    root_event.set()
+    for t in tasks:
+        t.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return scheduled
+
+
+def bench_memory(nodes: int) -> Results:
+    # Memory held by the job itself for very large jobs: once every task has been added, and once scheduling starts.
+    results: Results = dict()
+    for shape, generate in SHAPES.items():
+        dag = generate(nodes)
+        tracemalloc.start()
+        try:
+            started = tracemalloc.get_traced_memory()[0]
+            f = Flowmancer(test=True)
+            for n, deps in dag.items():
+                f.add_executor(name=n, task_class='NoOpTask', deps=deps)
+            added = tracemalloc.get_traced_memory()[0] - started
+            results[f'memory.{shape}_{nodes}.job_bytes_per_task'] = added / nodes
+            with _create_loop() as loop:
+                scheduled = loop.run_until_complete(_scheduled_bytes(f))
+            results[f'memory.{shape}_{nodes}.scheduling_bytes_per_task'] = scheduled / nodes
+        finally:
+            tracemalloc.stop()
+    return results
+
+
+def _emit_logs(bus: EventBus[SerializableLogEvent], lines: int) -> None:
+    writer = LogWriter('benchmark', bus)
+    message = 'x' * 80
+    for _ in range(lines):
+        writer.emit_log_write_event(message, Severity.INFO)
+    writer.close()
+
+
+async def _write_logs(bus: EventBus[SerializableLogEvent], directory: str) -> None:
+    log = FileLogger(base_log_dir=directory, retention_days=-1)
+    await log.on_create()
+    while True:
+        m = bus.get()
+        await log.update(m)
+        if isinstance(m, LogEndEvent):
+            break
+    await log.on_destroy()
+
+
+def bench_logs(lines: int) -> Results:
+    # Log lines per second from a task process's `LogWriter`, over the log bus, into the `FileLogger`, for each kind of
+    # queue the log bus may use.
+    results: Results = dict()
+    with _workdir() as tmp, Manager() as manager:
+        for backend, q in (('manager', manager.Queue()), ('queue', Queue())):
+            bus = EventBus[SerializableLogEvent]('benchmark', cast(Any, q))
+            started = time.perf_counter()
+            p = Process(target=_emit_logs, args=(bus, lines))
+            p.start()
+            asyncio.run(_write_logs(bus, os.path.join(tmp, backend)))
+            p.join()
+            results[f'logs.{backend}.lines_per_second'] = lines / (time.perf_counter() - started)
+    return results
+
+
+def bench_checkpoint(sizes: List[int], repeats: int = 5) -> Results:
+    # Time to copy `shared_dict` and write a checkpoint, against the number of keys in `shared_dict`.
+    results: Results = dict()
+    with _workdir() as tmp, Manager() as manager:
+        checkpointer = FileCheckpointer(checkpoint_dir=tmp)
+        states = {'COMPLETED': {f't{i}' for i in range(1000)}}
+        for size in sizes:
+            content = {f'key-{i}': {'value': i, 'label': f'label-{i}'} for i in range(size)}
+            for backend, d in (('dict', content), ('manager', manager.dict(content))):
+                timings = []
+                for _ in range(repeats):
+                    started = time.perf_counter()
+                    asyncio.run(checkpointer.write_checkpoint(
+                        'benchmark', CheckpointContents(name='benchmark', states=states, shared_dict=d.copy())
+                    ))
+                    timings.append(time.perf_counter() - started)
+                results[f'checkpoint.{backend}_{size}.write_seconds'] = statistics.median(timings)
+            results[f'checkpoint.dict_{size}.bytes'] = os.path.getsize(os.path.join(tmp, 'benchmark'))
+    return results
+
+
+def _time_import(extra_args: List[str]) -> float:
+    code = 'import time; s = time.perf_counter(); import flowmancer; print(time.perf_counter() - s)'
+    env = dict(os.environ)
+    package_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    env['PYTHONPATH'] = os.pathsep.join([package_root] + ([env['PYTHONPATH']] if env.get('PYTHONPATH') else []))
+    out = subprocess.run([sys.executable, *extra_args, '-c', code], env=env, check=True, capture_output=True, text=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def bench_import(repeats: int = 5) -> Results:
+    # Cold: a fresh interpreter without any bytecode cache, so every module is compiled. Warm: a fresh interpreter
+    # with the bytecode cache already in place, as on every run after the first.
+    with tempfile.TemporaryDirectory(prefix='flowmancer-pycache-') as cache:
+        cold = _time_import(['-X', f'pycache_prefix={cache}'])
+    _time_import([])
+    warm = statistics.median(_time_import([]) for _ in range(repeats))
+    return {'import.cold_seconds': cold, 'import.warm_seconds': warm}
+
+
+def bench_shared_dict(processes: int = 4, reads: int = 5000) -> Results:
+    r = shared_dict.run_benchmark(processes, reads)
+    return {
+        'shared_dict.manager.reads_per_second': r['manager']['reads_per_second'],
+        'shared_dict.shared_memory.reads_per_second': r['shared_memory']['reads_per_second']
+    }
+
+
+def _benchmarks(nodes: int, large: bool, max_concurrency: int) -> Dict[str, Callable[[], Results]]:
+    return {
+        'scheduling': lambda: bench_scheduling(nodes, max_concurrency),
+        'critical_path': lambda: bench_critical_path(min(nodes, 20), 0.01),
+        'graph_setup': lambda: {
+            k: v for size in ([10_000, 100_000] if large else [10_000]) for k, v in bench_graph_setup(size).items()
+        },
+        'logs': lambda: bench_logs(100_000 if large else 20_000),
+        'checkpoint': lambda: bench_checkpoint([0, 1_000, 10_000, 100_000] if large else [0, 1_000, 10_000]),
+        'import': lambda: bench_import(),
+        'shared_dict': lambda: bench_shared_dict(),
+        'memory': lambda: {
+            k: v for size in ([10_000, 100_000] if large else [10_000]) for k, v in bench_memory(size).items()
+        },
+    }
+
+
+BENCHMARKS = list(_benchmarks(0, False, 0).keys())
+
+
+def run_benchmarks(
+    names: Optional[List[str]] = None, nodes: int = 100, large: bool = False, max_concurrency: Optional[int] = None
+) -> Dict[str, Any]:
+    available = _benchmarks(nodes, large, max_concurrency if max_concurrency is not None else (os.cpu_count() or 1))
+    unknown = set(names or []).difference(available.keys())
+    if unknown:
+        raise ValueError(f'Unknown benchmark(s): {sorted(unknown)}. Available: {BENCHMARKS}')
+    results: Results = dict()
+    for name in (names or BENCHMARKS):
+        results.update(available[name]())
+    return {
+        'meta': {
+            'flowmancer_version': __version__,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'nodes': nodes,
+            'large': large
+        },
+        'results': results
+    }
+
+
+def _higher_is_better(metric: str) -> bool:
+    return metric.endswith('_per_second')
+
+
+def compare(
+    baseline: Dict[str, Any], current: Dict[str, Any], threshold: float = 0.25
+) -> Tuple[List[Dict[str, Any]], List[str]]:
+    # Returns every metric present in both runs with its relative change, along with the names of those that got worse
+    # by more than `threshold`. Sizes such as checkpoint bytes count as worse when they grow.
+    rows: List[Dict[str, Any]] = []
+    regressions: List[str] = []
+    base, cur = baseline.get('results', dict()), current.get('results', dict())
+    for metric in sorted(set(base.keys()).intersection(cur.keys())):
+        before, after = base[metric], cur[metric]
+        change = (after - before) / before if before else 0.0
+        worse = -change if _higher_is_better(metric) else change
+        regressed = worse > threshold
+        rows.append({'metric': metric, 'baseline': before, 'current': after, 'change': change, 'regressed': regressed})
+        if regressed:
+            regressions.append(metric)
+    return rows, regressions
+
+
+def format_comparison(rows: List[Dict[str, Any]]) -> str:
+    width = max([len(r['metric']) for r in rows] + [6])
+    lines = [f'{"metric":<{width}}  {"baseline":>12}  {"current":>12}  {"change":>8}']
+    for r in rows:
+        flag = '  REGRESSED' if r['regressed'] else ''
+        lines.append(
+            f'{r["metric"]:<{width}}  {r["baseline"]:>12.6g}  {r["current"]:>12.6g}  {r["change"]:>+8.1%}{flag}'
+        )
+    return '\n'.join(lines)
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import os
+import sys
+import threading
+from types import TracebackType
+from typing import List, Optional, Tuple, Type
+
+from .eventbus.log import LogWriter, Severity
+
+# Most bytes read from a pipe at once. Whatever complete lines a read yields are sent on as a single message.
+READ_SIZE = 65536
+# Seconds to wait, once the task is done, for its output to be read. Processes started by the task and left running
+# may still hold the pipes open, in which case their output from then on is not captured.
+_DRAIN_TIMEOUT = 5.0
+
+
+def _to_message(data: bytes) -> Optional[str]:
+    # Same as with Python-level capture, blank lines are left out.
+    lines = [line.rstrip('\r') for line in data.decode(errors='replace').split('\n') if line.strip()]
+    return '\n'.join(lines) if lines else None
+
+
+class LineBuffer:
+    # Turns output read in chunks of any size into messages of whole lines, holding onto any incomplete last line until
+    # the rest of it is read.
+    __slots__ = ('_pending',)
+
+    def __init__(self) -> None:
+        self._pending = b''
+
+    def feed(self, chunk: bytes) -> Optional[str]:
+        pending = self._pending + chunk
+        end = pending.rfind(b'\n')
+        if end < 0:
+            # A line longer than a whole read is sent on in pieces, rather than held onto indefinitely.
+            if len(pending) >= READ_SIZE:
+                self._pending = b''
+                return _to_message(pending)
+            self._pending = pending
+            return None
+        self._pending = pending[end + 1:]
+        return _to_message(pending[:end])
+
+    def flush(self) -> Optional[str]:
+        pending, self._pending = self._pending, b''
+        return _to_message(pending) if pending else None
+
+
+class FdCapture:
+    # Points the task process's file descriptors 1 and 2 at pipes, so that whatever is written to them - by native code,
+    # `os.write` or child processes alike - makes it to the task's loggers as INFO and ERROR messages respectively.
+    # Writes cost nothing beyond the system call; a thread per pipe reads it in large chunks and splits it into lines.
+    def __init__(self, writer: LogWriter) -> None:
+        self.writer = writer
+        self._saved: List[Tuple[int, int]] = []
+        self._readers: List[threading.Thread] = []
+
+    def __enter__(self) -> FdCapture:
+        for fd, severity in ((1, Severity.INFO), (2, Severity.ERROR)):
+            r, w = os.pipe()
+            self._saved.append((fd, os.dup(fd)))
+            os.dup2(w, fd)
+            os.close(w)
+            reader = threading.Thread(
+                target=self._drain, args=(r, severity), daemon=True, name=f'FdCapture-{self.writer.name}-{fd}'
+            )
+            reader.start()
+            self._readers.append(reader)
+        return self
+
+    def __exit__(
+        self, exc_type: Optional[Type[BaseException]], exc: Optional[BaseException], tb: Optional[TracebackType]
+    ) -> None:
+        self.close()
+
+    def close(self) -> None:
+        # Anything still buffered by Python's own streams goes out through the pipes before they are closed.
+        for stream in (sys.stdout, sys.stderr):
+            try:
+                stream.flush()
+            except Exception:
+                pass
+        # Restoring the original descriptors closes the task's ends of the pipes, which ends the readers.
+        for fd, saved in self._saved:
+            os.dup2(saved, fd)
+            os.close(saved)
+        self._saved.clear()
+        for reader in self._readers:
+            reader.join(_DRAIN_TIMEOUT)
+        self._readers.clear()
+
+    def _drain(self, r: int, severity: Severity) -> None:
+        lines = LineBuffer()
+        try:
+            while True:
+                chunk = os.read(r, READ_SIZE)
+                if not chunk:
+                    break
+                self._emit(lines.feed(chunk), severity)
+            self._emit(lines.flush(), severity)
+        finally:
+            os.close(r)
+
+    def _emit(self, message: Optional[str], severity: Severity) -> None:
+        if message is not None:
+            self.writer.emit_log_write_event(message, severity)
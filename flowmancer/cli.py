@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from argparse import ArgumentParser, Namespace
+from typing import List, Optional
+
+from .daemon import DEFAULT_SOCKET_PATH, FlowmancerDaemon, JobRejectedError, submit_job
+from .exceptions import VarFormatError
+from .remote import WorkerAgent
+
+
+def _run_worker(args: Namespace) -> int:
+    agent = WorkerAgent(
+        args.host,
+        args.port,
+        worker_id=args.worker_id,
+        slots=args.slots,
+        token=args.token,
+        reconnect_interval_seconds=args.reconnect_interval,
+        extension_directories=args.extension_directories,
+        extension_packages=args.extension_packages,
+        once=args.once
+    )
+    try:
+        asyncio.run(agent.run())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def _run_daemon(args: Namespace) -> int:
+    daemon = FlowmancerDaemon(
+        args.socket_path,
+        max_concurrency=args.max_concurrency,
+        max_jobs=args.max_jobs,
+        app_root_dir=args.app_root_dir,
+        debug=args.debug
+    )
+    try:
+        asyncio.run(daemon.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def _run_submit(args: Namespace) -> int:
+    jobdef_vars = dict()
+    for v in args.jobdef_vars:
+        parts = v.split('=')
+        if len(parts) <= 1:
+            raise VarFormatError('`var` arguments must follow the pattern: <key>=<value>')
+        jobdef_vars[parts[0]] = '='.join(parts[1:])
+    try:
+        return asyncio.run(submit_job(
+            args.jobdef,
+            socket_path=args.socket_path,
+            jobdef_type=args.jobdef_type,
+            jobdef_vars=jobdef_vars,
+            restart=args.restart,
+            max_concurrency=args.max_concurrency,
+            wait=not args.no_wait
+        ))
+    except JobRejectedError as e:
+        print(f'ERROR: Job was rejected by the daemon: {e}')
+        return 1
+
+
+def _run_benchmark(args: Namespace) -> int:
+    # Imported here, as the benchmarks register their own task classes.
+    from .benchmarks.suite import compare, format_comparison, run_benchmarks
+
+    results = run_benchmarks(
+        args.benchmarks or None, nodes=args.nodes, large=args.large, max_concurrency=args.max_concurrency
+    )
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    elif not args.compare:
+        print(json.dumps(results, indent=2))
+    if not args.compare:
+        return 0
+    with open(args.compare) as f:
+        rows, regressions = compare(json.load(f), results, threshold=args.threshold)
+    print(format_comparison(rows))
+    if regressions:
+        print(f'ERROR: {len(regressions)} metric(s) regressed by more than {args.threshold:.0%}.')
+        return 1
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = ArgumentParser(prog='flowmancer', description='Flowmancer command line utilities.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    worker = subparsers.add_parser('worker', help='Run an agent that executes tasks dispatched by a remote job.')
+    worker.add_argument('--host', action='store', dest='host', default='127.0.0.1')
+    worker.add_argument('--port', action='store', type=int, dest='port', default=7676)
+    worker.add_argument('--id', action='store', dest='worker_id')
+    worker.add_argument('--slots', action='store', type=int, dest='slots')
+    worker.add_argument('--token', action='store', dest='token')
+    worker.add_argument('--reconnect-interval', action='store', type=float, dest='reconnect_interval', default=5.0)
+    worker.add_argument('--extension-directory', action='append', dest='extension_directories', default=[])
+    worker.add_argument('--extension-package', action='append', dest='extension_packages', default=[])
+    worker.add_argument('--once', action='store_true', dest='once', default=False)
+    worker.set_defaults(handler=_run_worker)
+
+    daemon = subparsers.add_parser('daemon', help='Run a long-lived process that accepts and runs submitted jobs.')
+    daemon.add_argument('--socket', action='store', dest='socket_path', default=DEFAULT_SOCKET_PATH)
+    daemon.add_argument('--max-concurrency', action='store', type=int, dest='max_concurrency', default=0)
+    daemon.add_argument('--max-jobs', action='store', type=int, dest='max_jobs', default=0)
+    daemon.add_argument('--app-root', action='store', dest='app_root_dir')
+    daemon.add_argument('-d', '--debug', action='store_true', dest='debug', default=False)
+    daemon.set_defaults(handler=_run_daemon)
+
+    submit = subparsers.add_parser('submit', help='Submit a job to a running daemon and wait for its exit code.')
+    submit.add_argument('-j', '--jobdef', action='store', dest='jobdef', required=True)
+    submit.add_argument('-t', '--type', action='store', dest='jobdef_type', default='yaml')
+    submit.add_argument('-r', '--restart', action='store_true', dest='restart', default=False)
+    submit.add_argument('--max-concurrency', action='store', type=int, dest='max_concurrency')
+    submit.add_argument('--var', action='append', dest='jobdef_vars', default=[])
+    submit.add_argument('--socket', action='store', dest='socket_path', default=DEFAULT_SOCKET_PATH)
+    submit.add_argument('--no-wait', action='store_true', dest='no_wait', default=False)
+    submit.set_defaults(handler=_run_submit)
+
+    benchmark = subparsers.add_parser('benchmark', help='Run performance benchmarks and print the results as JSON.')
+    benchmark.add_argument('-b', '--benchmark', action='append', dest='benchmarks', default=[])
+    benchmark.add_argument('--nodes', action='store', type=int, dest='nodes', default=100)
+    benchmark.add_argument('--large', action='store_true', dest='large', default=False)
+    benchmark.add_argument('--max-concurrency', action='store', type=int, dest='max_concurrency')
+    benchmark.add_argument('-o', '--output', action='store', dest='output')
+    benchmark.add_argument('--compare', action='store', dest='compare')
+    benchmark.add_argument('--threshold', action='store', type=float, dest='threshold', default=0.25)
+    benchmark.set_defaults(handler=_run_benchmark)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
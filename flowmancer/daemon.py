@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import stat
+import time
+from enum import Enum
+from multiprocessing import Manager
+from multiprocessing.managers import SyncManager
+from typing import Any, Dict, Optional
+from uuid import uuid4
+
+from .checkpointer import NoCheckpointAvailableError
+from .exceptions import NoTasksLoadedError
+from .flowmancer import Flowmancer, _load_extension_modules
+from .remote.protocol import STREAM_LIMIT, Connection
+
+DEFAULT_SOCKET_PATH = './.flowmancer/daemon.sock'
+
+
+class DaemonMessageType(str, Enum):
+    SUBMIT = 'submit'
+    ACCEPTED = 'accepted'
+    REJECTED = 'rejected'
+    FINISHED = 'finished'
+
+
+class JobRejectedError(Exception):
+    pass
+
+
+class FlowmancerDaemon:
+    def __init__(
+        self,
+        socket_path: str = DEFAULT_SOCKET_PATH,
+        *,
+        max_concurrency: int = 0,
+        max_jobs: int = 0,
+        app_root_dir: Optional[str] = None,
+        debug: bool = False
+    ) -> None:
+        self.socket_path = socket_path
+        self.max_concurrency = max_concurrency
+        self.max_jobs = max_jobs
+        self.app_root_dir = os.path.abspath(app_root_dir or os.getcwd())
+        self.debug = debug
+        self._manager: Optional[SyncManager] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._job_slots: Optional[asyncio.Semaphore] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        # Keyed by job name, since two concurrent runs of the same job would share a checkpoint.
+        self._running: Dict[str, asyncio.Task] = dict()
+
+    @property
+    def running_jobs(self) -> Dict[str, asyncio.Task]:
+        return dict(self._running)
+
+    async def start(self) -> None:
+        # Jobs run relative to the daemon's app root, just as `Flowmancer().start()` runs relative to the driver file.
+        os.chdir(self.app_root_dir)
+        self._manager = Manager()
+        if self.max_concurrency > 0:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        if self.max_jobs > 0:
+            self._job_slots = asyncio.Semaphore(self.max_jobs)
+
+        # Pay the cost of importing task, extension and logger modules once for all jobs.
+        _load_extension_modules([], [])
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.socket_path)), exist_ok=True)
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self._server = await asyncio.start_unix_server(self._handle_client, path=self.socket_path, limit=STREAM_LIMIT)
+        os.chmod(self.socket_path, stat.S_IRUSR | stat.S_IWUSR)
+        print(f'Flowmancer daemon accepting jobs on {self.socket_path}')
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        for t in list(self._running.values()):
+            t.cancel()
+        await asyncio.gather(*self._running.values(), return_exceptions=True)
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        if self._manager is not None:
+            self._manager.shutdown()
+            self._manager = None
+
+    async def serve_forever(self) -> None:
+        await self.start()
+        try:
+            assert self._server is not None
+            await self._server.serve_forever()
+        finally:
+            await self.stop()
+
+    async def _prepare_job(self, request: Dict[str, Any]) -> Flowmancer:
+        f = Flowmancer(debug=self.debug, manager=self._manager, shared_semaphore=self._semaphore)
+        for k, v in (request.get('vars') or dict()).items():
+            f.set_jobdef_var(k, v)
+        f.load_job_definition(request['jobdef'], self.app_root_dir, request.get('jobdef_type', 'yaml'))
+        if not f._executors:
+            raise NoTasksLoadedError('No Tasks have been loaded! Please check the submitted Job Definition file.')
+        if request.get('max_concurrency') is not None:
+            f._config.max_concurrency = int(request['max_concurrency'])
+        f._validate_tasks()
+        if request.get('restart'):
+            try:
+                f._restore_checkpoint(await f._checkpointer_instance.read_checkpoint(f._config.name))
+            except NoCheckpointAvailableError:
+                print(f"No checkpoint found for '{f._config.name}'. Starting new job.")
+        return f
+
+    async def _run_job(self, f: Flowmancer) -> int:
+        if self._job_slots is None:
+            return await f._run()
+        async with self._job_slots:
+            return await f._run()
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        conn = Connection(reader, writer)
+        try:
+            request = await conn.receive()
+            if request is None or request['type'] != DaemonMessageType.SUBMIT.value:
+                return
+            try:
+                f = await self._prepare_job(request)
+                if f._config.name in self._running:
+                    raise JobRejectedError(f"A job named '{f._config.name}' is already running.")
+            except Exception as e:
+                await conn.send(DaemonMessageType.REJECTED, reason=str(e))
+                return
+
+            name = f._config.name
+            job_id = uuid4().hex
+            started = time.monotonic()
+            task = asyncio.create_task(self._run_job(f))
+            self._running[name] = task
+            print(f"Job '{name}' ({job_id}) started.")
+            await conn.send(DaemonMessageType.ACCEPTED, job_id=job_id, name=name)
+            try:
+                exit_code = await asyncio.shield(task)
+            except asyncio.CancelledError:
+                exit_code = 130
+            except Exception as e:
+                print(f"ERROR: Job '{name}' ({job_id}) raised: {e}")
+                exit_code = 99
+            finally:
+                self._running.pop(name, None)
+            print(f"Job '{name}' ({job_id}) finished with exit code {exit_code} in {time.monotonic() - started:.3f}s.")
+            if request.get('wait', True):
+                await conn.send(DaemonMessageType.FINISHED, job_id=job_id, exit_code=exit_code)
+        except ConnectionError:
+            # Clients that disconnect early do not affect the job; it keeps running to completion.
+            pass
+        finally:
+            conn.close()
+
+
+async def submit_job(
+    jobdef: str,
+    *,
+    socket_path: str = DEFAULT_SOCKET_PATH,
+    jobdef_type: str = 'yaml',
+    jobdef_vars: Optional[Dict[str, str]] = None,
+    restart: bool = False,
+    max_concurrency: Optional[int] = None,
+    wait: bool = True
+) -> int:
+    reader, writer = await asyncio.open_unix_connection(socket_path, limit=STREAM_LIMIT)
+    conn = Connection(reader, writer)
+    try:
+        await conn.send(
+            DaemonMessageType.SUBMIT,
+            jobdef=os.path.abspath(jobdef),
+            jobdef_type=jobdef_type,
+            vars=jobdef_vars or dict(),
+            restart=restart,
+            max_concurrency=max_concurrency,
+            wait=wait
+        )
+        msg = await conn.receive()
+        if msg is None:
+            raise ConnectionError('Daemon closed the connection before accepting the job.')
+        if msg['type'] == DaemonMessageType.REJECTED.value:
+            raise JobRejectedError(msg.get('reason', 'unknown'))
+        if not wait:
+            return 0
+        msg = await conn.receive()
+        if msg is None:
+            raise ConnectionError('Daemon closed the connection before the job finished.')
+        return int(msg['exit_code'])
+    finally:
+        conn.close()
@@ -1,13 +1,16 @@
 from __future__ import annotations
 
+import asyncio
 import json
+import threading
+import time
 from abc import ABC, abstractmethod
 from collections import defaultdict
 from datetime import datetime, timezone
-from queue import Queue
+from queue import Full, Queue
 from typing import Any, Dict, Generic, Optional, Type, TypeVar
 
-from pydantic import BaseModel, ConfigDict, field_serializer
+from pydantic import BaseModel, ConfigDict, Field, field_serializer
 
 _event_classes: Dict[str, Dict[str, Type[SerializableEvent]]] = defaultdict(dict)
 
@@ -23,7 +26,10 @@ class NotADeserializableEventError(Exception):
 class SerializableEvent(BaseModel, ABC):
     model_config = ConfigDict(extra='forbid')
     job_name: Optional[str] = None
-    timestamp: datetime = datetime.now(timezone.utc).astimezone()
+    # Both are taken when the event is created. `monotonic_ns` is meant for measuring durations between events; it is
+    # only comparable between events created on the same host.
+    timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc).astimezone())
+    monotonic_ns: int = Field(default_factory=time.monotonic_ns)
 
     @classmethod
     @abstractmethod
@@ -63,25 +69,197 @@ class UnknownEvent(SerializableEvent):
 T = TypeVar('T', bound=SerializableEvent)
 
 
+# Put on a bus's own queue to stop the thread relaying events published by other processes.
+_STOP_RELAY = '\0flowmancer:stop-relay\0'
+
+
+class BusWakeup:
+    # Set whenever an event is published to the bus it was handed out by, from whichever thread. Only the first event
+    # after each `clear` does any work, so bursts of events cost a single wakeup.
+    __slots__ = ('_loop', '_event', '_full', '_thread', '_pending')
+
+    def __init__(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._event = asyncio.Event()
+        # Set once the bus is full, at which point readers should not hold off reading it.
+        self._full = asyncio.Event()
+        self._thread = threading.get_ident()
+        self._pending = False
+
+    def _set(self, e: asyncio.Event) -> None:
+        if threading.get_ident() == self._thread:
+            e.set()
+            return
+        try:
+            self._loop.call_soon_threadsafe(e.set)
+        except RuntimeError:
+            # The loop has already been closed.
+            pass
+
+    def set(self) -> None:
+        if self._pending:
+            return
+        self._pending = True
+        self._set(self._event)
+
+    def set_full(self) -> None:
+        self._set(self._full)
+
+    # Must be called before reading from the bus, so that no event published while reading is missed.
+    def clear(self) -> None:
+        self._pending = False
+        self._event.clear()
+        self._full.clear()
+
+    def is_set(self) -> bool:
+        return self._pending
+
+    async def wait(self) -> None:
+        await self._event.wait()
+
+    async def wait_full(self) -> None:
+        await self._full.wait()
+
+
 class EventBus(Generic[T]):
-    __slots__ = ('_queue', 'job_name')
+    __slots__ = ('_queue', 'job_name', 'capacity', 'overflow', 'sample_every', '_wakeup', '_inbox', '_relay')
 
-    def __init__(self, j: str, q: Optional[Queue[str]] = None) -> None:
-        self._queue = q or Queue()
+    def __init__(self, j: str, q: Optional[Queue[str]] = None, capacity: int = 0) -> None:
+        # `capacity` is the most events the bus holds at once, or 0 for no limit. A given `q` must have been created
+        # with it as its `maxsize`. What a producer does once the bus is full is its own choice: `put` waits for room,
+        # while `offer` gives up. Producers that can choose follow `overflow`, the value of a `LogOverflowPolicy`.
+        self._queue = q or Queue(capacity)
         self.job_name = j
+        self.capacity = capacity
+        self.overflow = 'block'
+        self.sample_every = 10
+        self._wakeup: Optional[BusWakeup] = None
+        # Events published by other processes are moved here by the relay thread, which is what wakes the listener.
+        self._inbox: Optional[Queue[str]] = None
+        self._relay: Optional[threading.Thread] = None
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Only the queue itself is shared with other processes.
+        return {
+            '_queue': self._queue, 'job_name': self.job_name, 'capacity': self.capacity, 'overflow': self.overflow,
+            'sample_every': self.sample_every
+        }
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__init__(state['job_name'], state['_queue'], state['capacity'])  # type: ignore
+        self.overflow = state['overflow']
+        self.sample_every = state['sample_every']
+
+    @property
+    def is_shared(self) -> bool:
+        # Whether the queue is shared with other processes, in which case any call on it may wait on another process
+        # (e.g. a `Manager`).
+        return not isinstance(self._queue, Queue)
 
     def put(self, m: T) -> None:
         self._queue.put(m.serialize())
+        # Events put by this process on a relayed bus are woken up for by the relay, as are those of any other process.
+        if self._wakeup is not None and self._relay is None:
+            self._wakeup.set()
+
+    def offer(self, m: T) -> bool:
+        # Same as `put`, but returns False rather than waiting should the bus be full.
+        try:
+            self._queue.put_nowait(m.serialize())
+        except Full:
+            return False
+        if self._wakeup is not None and self._relay is None:
+            self._wakeup.set()
+        return True
+
+    def _reader(self) -> Queue[str]:
+        if self._inbox is not None and (self._relay is not None or not self._inbox.empty()):
+            return self._inbox
+        return self._queue
 
     def get(self) -> T:
         # Until it's better determined how to handle global properties, inject into events as they are read.
         # For now, no checks on key name collisions - not too big an issue since `EventBus` not accepted from users.
-        event = SerializableEvent.deserialize(self._queue.get())
+        m = self._reader().get()
+        while m == _STOP_RELAY:
+            # Left behind for a relay that was given up on; see `stop_listening`.
+            m = self._reader().get()
+        event = SerializableEvent.deserialize(m)
         event.job_name = self.job_name
         return event
 
     def empty(self) -> bool:
-        return self._queue.empty()
+        return self._reader().empty()
+
+    def qsize(self) -> Optional[int]:
+        try:
+            return self._queue.qsize() + (self._inbox.qsize() if self._inbox is not None else 0)
+        except NotImplementedError:
+            # e.g. `multiprocessing.Queue` on macOS.
+            return None
+
+    def replace_queue(self, q: Queue[str], capacity: int = 0) -> None:
+        # Carry over anything already published, e.g. state changes emitted while restoring from a checkpoint.
+        # Must be done before anyone starts listening.
+        assert self._relay is None
+        while not self._queue.empty():
+            q.put(self._queue.get())
+        self._queue = q
+        self.capacity = capacity
+
+    def listen(self) -> BusWakeup:
+        # Returns a wakeup that is set as events are published, for the loop that is running. Should the queue be shared
+        # with other processes, a thread is started to wait on it; stop it with `stop_listening` once done.
+        self._wakeup = BusWakeup()
+        if not self.is_shared:
+            if not self._queue.empty():
+                self._wakeup.set()
+        else:
+            # Bounded just as the queue itself, so that the relay only takes in events as fast as they are read.
+            self._inbox = self._inbox or Queue(self.capacity)
+            self._relay = threading.Thread(
+                target=EventBus._run_relay, args=(self._queue, self._inbox, self._wakeup), daemon=True,
+                name=f'EventBus-{self.job_name}'
+            )
+            self._relay.start()
+        return self._wakeup
+
+    @staticmethod
+    def _run_relay(q: Queue[str], inbox: Queue[str], wakeup: BusWakeup) -> None:
+        while True:
+            try:
+                m = q.get()
+            except Exception:
+                # The queue has gone away, e.g. along with its `Manager`.
+                return
+            if m == _STOP_RELAY:
+                return
+            try:
+                inbox.put_nowait(m)
+            except Full:
+                wakeup.set_full()
+                inbox.put(m)
+            wakeup.set()
+
+    def stop_listening(self, wait: bool = True) -> None:
+        # With `wait`, blocks until every event published before the call can be read from the bus. As the relay may be
+        # waiting for room, the bus must keep being read from meanwhile.
+        relay = self._relay
+        self._wakeup = None
+        if relay is None:
+            return
+        if wait:
+            self._queue.put(_STOP_RELAY)
+            relay.join()
+        else:
+            # Only when giving up on the bus altogether, e.g. once cancelled. Should it be full, the relay is left be.
+            # A relay that has already exited (e.g. along with its `Manager`) would leave the stop for readers to find.
+            if relay.is_alive():
+                try:
+                    self._queue.put_nowait(_STOP_RELAY)
+                except Full:
+                    pass
+        self._relay = None
 
 
 def serializable_event(t: type[T]) -> type[T]:
@@ -1,7 +1,9 @@
 from __future__ import annotations
 
 from enum import Enum
-from typing import Dict, Set, Union
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+from pydantic import BaseModel
 
 from . import SerializableEvent, serializable_event
 
@@ -23,41 +25,144 @@ class ExecutionState(str, Enum):
     INIT = '_'
 
 
+# Each state is stored as a single byte per task, with 0 meaning the task is in no state at all.
+_STATES: List[ExecutionState] = list(ExecutionState)
+_CODES: Dict[ExecutionState, int] = {es: i + 1 for i, es in enumerate(_STATES)}
+
+
+class _StateView:
+    # The tasks in one state of an `ExecutionStateMap`, behaving much like the set of their names. Since a task is
+    # only ever in a single state, adding a task here moves it out of whichever state it was in before.
+    __slots__ = ('_map', '_code')
+
+    def __init__(self, m: ExecutionStateMap, code: int) -> None:
+        self._map = m
+        self._code = code
+
+    def __len__(self) -> int:
+        return self._map._counts[self._code]
+
+    def __bool__(self) -> bool:
+        return self._map._counts[self._code] > 0
+
+    def __contains__(self, name: object) -> bool:
+        i = self._map._ids.get(name)  # type: ignore
+        return i is not None and self._map._codes[i] == self._code
+
+    def __iter__(self) -> Iterator[str]:
+        if not self:
+            return
+        names = self._map._names
+        # Scanning the bytes themselves is far quicker than looking at each task in turn.
+        codes = self._map._codes
+        i = codes.find(self._code)
+        while i >= 0:
+            yield names[i]
+            i = codes.find(self._code, i + 1)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, _StateView):
+            other = set(other)
+        return set(self) == other
+
+    def __repr__(self) -> str:
+        return repr(set(self))
+
+    def add(self, name: str) -> None:
+        self._map._set(name, self._code)
+
+    def update(self, names: Iterable[str]) -> None:
+        # Taken as a list first, since `names` may well be the view of another state in this same map.
+        for n in list(names):
+            self._map._set(n, self._code)
+
+    def remove(self, name: str) -> None:
+        if name not in self:
+            raise KeyError(name)
+        self._map._set(name, 0)
+
+    def discard(self, name: str) -> None:
+        if name in self:
+            self._map._set(name, 0)
+
+    def clear(self) -> None:
+        for n in list(self):
+            self._map._set(n, 0)
+
+    def copy(self) -> Set[str]:
+        return set(self)
+
+
 class ExecutionStateMap:
+    # The state of every task in a job. Names are interned to ids once, and the states themselves are kept as one byte
+    # per task alongside a count per state, so that even jobs with hundreds of thousands of tasks stay compact and
+    # checking whether any task is still in a given state costs the same regardless of the job's size.
     def __init__(self) -> None:
-        self.data: Dict[ExecutionState, Set[str]] = dict()
+        self._ids: Dict[str, int] = dict()
+        self._names: List[str] = []
+        self._codes = bytearray()
+        self._counts = [0] * (len(_STATES) + 1)
+        self._views = [_StateView(self, c) for c in range(len(_STATES) + 1)]
+
+    def _set(self, name: str, code: int) -> None:
+        i = self._ids.get(name)
+        if i is None:
+            if not code:
+                return
+            i = self._ids[name] = len(self._names)
+            self._names.append(name)
+            self._codes.append(0)
+        self._counts[self._codes[i]] -= 1
+        self._counts[code] += 1
+        self._codes[i] = code
 
-    def __getitem__(self, k: Union[str, ExecutionState]) -> Set[str]:
-        es = ExecutionState(k)
-        if es not in self.data:
-            self.data[es] = set()
-        return self.data[ExecutionState(k)]
+    def __getitem__(self, k: Union[str, ExecutionState]) -> _StateView:
+        return self._views[_CODES[ExecutionState(k)]]
 
-    def __setitem__(self, k: Union[str, ExecutionState], v: Set[str]) -> None:
-        es = ExecutionState(k)
-        self.data[es] = v
+    def __setitem__(self, k: Union[str, ExecutionState], v: Iterable[str]) -> None:
+        view = self[k]
+        names = list(v)
+        view.clear()
+        view.update(names)
 
     def __str__(self):
-        return str(self.data)
+        return str(self.to_simple_dict())
+
+    def transition(self, name: str, to_state: Union[str, ExecutionState]) -> None:
+        self._set(name, _CODES[ExecutionState(to_state)])
 
-    def items(self):
-        return self.data.items()
+    def state_of(self, name: str) -> Optional[ExecutionState]:
+        i = self._ids.get(name)
+        if i is None or not self._codes[i]:
+            return None
+        return _STATES[self._codes[i] - 1]
 
-    def keys(self):
-        return self.data.keys()
+    def count(self, k: Union[str, ExecutionState]) -> int:
+        return self._counts[_CODES[ExecutionState(k)]]
 
-    def values(self):
-        return self.data.values()
+    def items(self) -> Iterator[Tuple[ExecutionState, _StateView]]:
+        return ((es, self._views[_CODES[es]]) for es in _STATES)
+
+    def keys(self) -> List[ExecutionState]:
+        return list(_STATES)
+
+    def values(self) -> List[_StateView]:
+        return [self._views[_CODES[es]] for es in _STATES]
 
     @classmethod
     def from_simple_dict(cls, data: Dict[str, Set[str]]) -> ExecutionStateMap:
         m = ExecutionStateMap()
         for k, v in data.items():
-            m[ExecutionState(k)] = v
+            m[ExecutionState(k)].update(v)
         return m
 
     def to_simple_dict(self) -> Dict[str, Set[str]]:
-        return {k.value: v for k, v in self.data.items()}
+        # Empty states are left out.
+        d: Dict[str, Set[str]] = dict()
+        for i, code in enumerate(self._codes):
+            if code:
+                d.setdefault(_STATES[code - 1].value, set()).add(self._names[i])
+        return d
 
 
 @serializable_event
@@ -65,3 +170,104 @@ class ExecutionStateTransition(SerializableExecutionEvent):
     name: str
     from_state: ExecutionState
     to_state: ExecutionState
+
+
+@serializable_event
+class TaskRetry(SerializableExecutionEvent):
+    # Published when an attempt has failed and the task is about to sleep for `backoff_seconds` before trying again.
+    name: str
+    attempt: int
+    backoff_seconds: float
+
+
+@serializable_event
+class TaskTimeout(SerializableExecutionEvent):
+    # Published when an attempt has run for longer than the task's `timeout_seconds` and is being stopped. The attempt
+    # counts as failed, so it is followed by a `TaskRetry` should the task have attempts left.
+    name: str
+    attempt: int
+    timeout_seconds: float
+
+
+class ProfiledFunction(BaseModel):
+    function: str
+    calls: int
+    total_seconds: float
+    cumulative_seconds: float
+
+
+class AllocationSite(BaseModel):
+    location: str
+    size_bytes: int
+    count: int
+
+
+@serializable_event
+class TaskProfile(SerializableExecutionEvent):
+    # Summary of a profiled `run`, published by the task's own process. The full profile and snapshot are written to
+    # `profile_path` and `snapshot_path` respectively.
+    name: str
+    profile_path: Optional[str] = None
+    top_functions: List[ProfiledFunction] = []
+    snapshot_path: Optional[str] = None
+    peak_traced_memory_bytes: Optional[int] = None
+    top_allocations: List[AllocationSite] = []
+
+
+@serializable_event
+class TaskLogBackpressure(SerializableExecutionEvent):
+    # Published as a task's logger closes, should the log bus have been full for any of its messages. `blocked` is how
+    # many messages the task had to wait for room for, and `blocked_seconds` how long it waited in all.
+    name: str
+    dropped: int
+    blocked: int
+    blocked_seconds: float
+
+
+@serializable_event
+class TaskResourceUsage(SerializableExecutionEvent):
+    # Resources consumed by one attempt of a task, measured by the task's own process as it finishes. CPU time, memory
+    # and context switches include any processes the task started and waited on. I/O counters are only available on
+    # Linux.
+    name: str
+    wall_seconds: float
+    user_cpu_seconds: float
+    system_cpu_seconds: float
+    max_rss_bytes: int
+    voluntary_context_switches: int
+    involuntary_context_switches: int
+    read_bytes: Optional[int] = None
+    write_bytes: Optional[int] = None
+    # Set for tasks run after others in the same process (see `BatchDispatcher`). All else is the task's own, but
+    # `max_rss_bytes` is the peak of the process so far, which may have been reached by a task before it.
+    shared_process: bool = False
+
+
+class SampleSummary(BaseModel):
+    count: int
+    total: float
+    max: float
+
+
+@serializable_event
+class JobInstrumentation(SerializableExecutionEvent):
+    # Periodic sample of the job's own health, published by the job process itself. Lag is how much later than
+    # scheduled the event loop got around to waking a sleeping coroutine, across the whole sampling window. Queue
+    # depths are `None` where the platform cannot report them.
+    loop_lag_seconds_max: float
+    loop_lag_seconds_mean: float
+    log_bus_depth: Optional[int] = None
+    execution_bus_depth: Optional[int] = None
+    # Duration of each checkpoint written since the previous sample.
+    checkpoint_write_seconds: List[float] = []
+    # Time taken by each pass of the job's internal loops (`loggers`, `extensions`, `checkpointer`), excluding sleeps.
+    pusher_iteration_seconds: Dict[str, SampleSummary] = dict()
+    # Number of events taken off each bus (`log`, `execution`) per pass.
+    events_drained_per_cycle: Dict[str, SampleSummary] = dict()
+    # Time spent in the `update` method of each extension and logger, keyed as `extension:<name>` or `logger:<name>`.
+    update_seconds: Dict[str, SampleSummary] = dict()
+    # Per extension: time events waited in its queue before being handled, events waiting at the time of the sample and
+    # events discarded (or coalesced) since the previous sample because its queue was full.
+    extension_lag_seconds: Dict[str, SampleSummary] = dict()
+    extension_queue_depth: Dict[str, int] = dict()
+    extension_events_dropped: Dict[str, int] = dict()
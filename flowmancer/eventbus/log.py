@@ -1,9 +1,13 @@
 from __future__ import annotations
 
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
-from typing import Iterable, Optional
+from typing import Any, Iterable, Optional, Union, cast
 
 from . import EventBus, SerializableEvent, serializable_event
+from .execution import TaskLogBackpressure
 
 
 class Severity(str, Enum):
@@ -14,6 +18,19 @@ class Severity(str, Enum):
     CRITICAL = 'CRITICAL'
 
 
+_SEVERITY_RANKS = {s: i for i, s in enumerate(Severity)}
+
+
+class LogOverflowPolicy(str, Enum):
+    # Once the log bus is full, make the task wait for room for each message.
+    BLOCK = 'block'
+    # Discard the task's DEBUG messages while the log bus is full; it waits for room for any others.
+    DROP_DEBUG = 'drop_debug'
+    # While the log bus is full, only keep one in every `log_sample_every` of the task's messages, waiting for room for
+    # those, and discard the rest.
+    SAMPLE = 'sample'
+
+
 class SerializableLogEvent(SerializableEvent):
     name: str
 
@@ -44,25 +61,96 @@ class UnknownLogEvent(SerializableLogEvent):
 
 
 class LogWriter:
-    __slots__ = ('bus', 'name')
+    __slots__ = (
+        'bus', 'name', 'min_severity', '_min_rank', 'dropped', 'blocked', 'blocked_seconds', '_overflowed', '_executor'
+    )
 
-    def __init__(self, name: str, bus: Optional[EventBus[SerializableLogEvent]]) -> None:
+    def __init__(
+        self, name: str, bus: Optional[EventBus[SerializableLogEvent]], min_severity: Severity = Severity.DEBUG
+    ) -> None:
         self.name = name
         self.bus = bus
+        # Messages less severe than this are discarded here, before an event is even created for them.
+        self.min_severity = Severity(min_severity)
+        self._min_rank = _SEVERITY_RANKS[self.min_severity]
+        # Counts for this task alone, of the messages affected by the log bus being full.
+        self.dropped = 0
+        self.blocked = 0
+        self.blocked_seconds = 0.0
+        self._overflowed = 0
+        # Only created for tasks that log from the event loop to a bus shared with other processes.
+        self._executor: Optional[ThreadPoolExecutor] = None
         if self.bus:
             self.bus.put(LogStartEvent(name=self.name))
 
+    def _droppable(self, severity: Severity) -> bool:
+        assert self.bus is not None
+        if self.bus.overflow == LogOverflowPolicy.DROP_DEBUG:
+            return severity == Severity.DEBUG
+        if self.bus.overflow == LogOverflowPolicy.SAMPLE:
+            self._overflowed += 1
+            return bool((self._overflowed - 1) % max(1, self.bus.sample_every))
+        return False
+
+    def is_enabled_for(self, severity: Union[str, Severity]) -> bool:
+        return bool(self.bus) and _SEVERITY_RANKS[Severity(severity)] >= self._min_rank
+
+    # Returns the event should it have to wait for room on the bus, or else None once it has been sent or discarded.
+    def _offer(self, message: str, severity: Severity) -> Optional[LogWriteEvent]:
+        if not self.bus or _SEVERITY_RANKS[severity] < self._min_rank:
+            return None
+        e = LogWriteEvent(name=self.name, severity=severity, message=message)
+        if self.bus.offer(e):
+            return None
+        if self._droppable(severity):
+            self.dropped += 1
+            return None
+        self.blocked += 1
+        return e
+
     def emit_log_write_event(self, message: str, severity: Severity) -> None:
-        if self.bus:
-            self.bus.put(LogWriteEvent(
-                name=self.name,
-                severity=severity,
-                message=message
-            ))
+        e = self._offer(message, severity)
+        if e is None:
+            return
+        started = time.perf_counter()
+        cast(EventBus, self.bus).put(e)
+        self.blocked_seconds += time.perf_counter() - started
+
+    # For tasks run on the job's own event loop, which must not block on a full bus as the loop is what empties it.
+    async def emit_log_write_event_async(self, message: str, severity: Severity) -> None:
+        if self.bus and self.bus.is_shared:
+            # Even offering to such a bus is a round trip to another process, so it is done by a thread of the
+            # writer's own, which also keeps its messages in order.
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f'LogWriter-{self.name}')
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(self._executor, self.emit_log_write_event, message, severity)
+            return
+        e = self._offer(message, severity)
+        if e is None:
+            return
+        started = time.perf_counter()
+        await asyncio.get_running_loop().run_in_executor(None, cast(EventBus, self.bus).put, e)
+        self.blocked_seconds += time.perf_counter() - started
 
     def close(self) -> None:
-        if self.bus:
-            self.bus.put(LogEndEvent(name=self.name))
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        if not self.bus:
+            return
+        if self.dropped or self.blocked:
+            if self.dropped:
+                self.bus.put(LogWriteEvent(
+                    name=self.name,
+                    severity=Severity.WARNING,
+                    message=f'{self.dropped} log message(s) were discarded while the log bus was full.'
+                ))
+            # Published through the log bus, which is the only bus shared with the task's process.
+            cast(EventBus, self.bus).put(TaskLogBackpressure(
+                name=self.name, dropped=self.dropped, blocked=self.blocked, blocked_seconds=self.blocked_seconds
+            ))
+        self.bus.put(LogEndEvent(name=self.name))
 
 
 class StdOutLogWriterWrapper:
@@ -99,17 +187,34 @@ class TaskLogWriterWrapper:
     def __init__(self, log_writer: LogWriter) -> None:
         self._base = log_writer
 
-    def debug(self, m: str) -> None:
-        self._base.emit_log_write_event(m, Severity.DEBUG)
+    # Messages may be given as a format string and its `args`, as with the `logging` module, in which case they are
+    # only formatted should they be kept. Use `is_enabled_for` to skip building costly messages altogether.
+    def is_enabled_for(self, severity: Union[str, Severity]) -> bool:
+        return self._base.is_enabled_for(severity)
+
+    def _emit(self, severity: Severity, m: str, args: Any) -> None:
+        base = self._base
+        if base.bus and _SEVERITY_RANKS[severity] >= base._min_rank:
+            base.emit_log_write_event(m % args if args else m, severity)
+
+    def debug(self, m: str, *args: Any) -> None:
+        self._emit(Severity.DEBUG, m, args)
+
+    def info(self, m: str, *args: Any) -> None:
+        self._emit(Severity.INFO, m, args)
 
-    def info(self, m: str) -> None:
-        self._base.emit_log_write_event(m, Severity.INFO)
+    def warning(self, m: str, *args: Any) -> None:
+        self._emit(Severity.WARNING, m, args)
 
-    def warning(self, m: str) -> None:
-        self._base.emit_log_write_event(m, Severity.WARNING)
+    def error(self, m: str, *args: Any) -> None:
+        self._emit(Severity.ERROR, m, args)
 
-    def error(self, m: str) -> None:
-        self._base.emit_log_write_event(m, Severity.ERROR)
+    def critical(self, m: str, *args: Any) -> None:
+        self._emit(Severity.CRITICAL, m, args)
 
-    def critical(self, m: str) -> None:
-        self._base.emit_log_write_event(m, Severity.CRITICAL)
+    # Same as the above, for tasks run on the job's own event loop. See `AsyncTask`.
+    async def log_async(self, severity: Union[str, Severity], m: str, *args: Any) -> None:
+        base = self._base
+        severity = Severity(severity)
+        if base.bus and _SEVERITY_RANKS[severity] >= base._min_rank:
+            await base.emit_log_write_event_async(m % args if args else m, severity)
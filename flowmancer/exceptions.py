@@ -46,3 +46,17 @@ class TaskClassNotFoundError(Exception):
 
 class ModuleLoadError(Exception):
     pass
+
+
+class CommandFailedError(Exception):
+    def __init__(self, message: str, returncode: int) -> None:
+        super().__init__(message)
+        self.returncode = returncode
+
+
+class CommandTimeoutError(Exception):
+    pass
+
+
+class SensorTimeoutError(Exception):
+    pass
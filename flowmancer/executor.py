@@ -2,26 +2,42 @@ from __future__ import annotations
 
 import asyncio
 import inspect
+import os
 import signal
 import sys
+import time
 import traceback
+from abc import ABC, abstractmethod
 from contextlib import asynccontextmanager
 from multiprocessing import Process
 from multiprocessing.managers import DictProxy
 from multiprocessing.sharedctypes import Value
-from typing import Any, AsyncIterator, Callable, Coroutine, Dict, List, Optional, TextIO, Type, Union, cast
+from typing import Any, AsyncIterator, Callable, Coroutine, Dict, List, Optional, TextIO, Tuple, Type, Union, cast
 
+from .artifacts import DEFAULT_ARTIFACT_DIRECTORY, ArtifactStore
+from .capture import FdCapture
 from .eventbus import EventBus
-from .eventbus.execution import ExecutionState, ExecutionStateTransition, SerializableExecutionEvent
+from .eventbus.execution import (
+    ExecutionState,
+    ExecutionStateTransition,
+    SerializableExecutionEvent,
+    TaskRetry,
+    TaskTimeout,
+)
 from .eventbus.log import (
     LogWriter,
     SerializableLogEvent,
+    Severity,
     StdErrLogWriterWrapper,
     StdOutLogWriterWrapper,
     TaskLogWriterWrapper,
 )
 from .exceptions import TaskClassNotFoundError
-from .task import Task, _task_classes
+from .profiling import DEFAULT_PROFILE_DIRECTORY, profiled
+from .resources import collect_resource_usage
+from .retry import RetryOn, backoff_seconds, is_retryable
+from .streams import TaskStreams
+from .task import AsyncTask, Task, _task_classes
 
 
 async def _default_await_dependencies() -> bool:
@@ -29,8 +45,11 @@ async def _default_await_dependencies() -> bool:
 
 
 class ProcessResult:
-    def __init__(self) -> None:
+    def __init__(self, retry_on: Optional[List[RetryOn]] = None) -> None:
         self._retcode = Value('i', 0)
+        self._retryable = Value('i', 1)
+        # Failures that an attempt is retried after, if any; see `is_retryable`.
+        self.retry_on = list(retry_on or [])
 
     @property
     def is_failed(self) -> bool:
@@ -40,6 +59,25 @@ class ProcessResult:
     def is_failed(self, v: bool) -> None:
         self._retcode.value = v  # type: ignore
 
+    @property
+    def retryable(self) -> bool:
+        return bool(self._retryable.value)  # type: ignore
+
+    @retryable.setter
+    def retryable(self, v: bool) -> None:
+        self._retryable.value = v  # type: ignore
+
+    def reset(self) -> None:
+        self.is_failed = False
+        self.retryable = True
+
+    # Fails the attempt, given the exception raised or the exit code of its process. Only the first failure of an
+    # attempt decides whether it is retried, as any further ones (e.g. of `on_failure`) tend to be caused by it.
+    def fail(self, cause: Union[BaseException, int]) -> None:
+        if not self.is_failed:
+            self.retryable = is_retryable(cause, self.retry_on)
+        self.is_failed = True
+
 
 def exec_task_lifecycle(
     task_name: str,
@@ -49,14 +87,34 @@ def exec_task_lifecycle(
     result: ProcessResult,
     shared_dict: Optional[Union[Dict[str, Any], DictProxy[str, Any]]] = None,
     is_restart: bool = False,
-    depends_on: Optional[List[str]] = None
+    depends_on: Optional[List[str]] = None,
+    artifact_directory: Optional[Union[str, ArtifactStore]] = None,
+    streams: Optional[TaskStreams] = None,
+    profile: Optional[List[str]] = None,
+    profile_directory: Optional[str] = None,
+    min_severity: Severity = Severity.DEBUG,
+    output_capture: str = 'python',
+    process_group: bool = False,
+    shared_process: bool = False
 ):
-    base_log_writer = LogWriter(task_name, log_event_bus)
+    started = time.monotonic()
+    # Usage is reported from here on, as the process may have run other tasks before this one.
+    usage_before = collect_resource_usage(task_name, started) if log_event_bus is not None else None
+    if process_group and hasattr(os, 'setpgid'):
+        # Leads a process group of its own, so that it can be killed along with any processes it has started.
+        os.setpgid(0, 0)
+    base_log_writer = LogWriter(task_name, log_event_bus, min_severity)
     # Pydantic's BaseModel appears to interfere with the Manager objects when it serializes model values...
     # As a result, any Manager objects should be assigned here directly after being split off into a new process.
     parameters = parameters or dict()
     parameters['logger'] = TaskLogWriterWrapper(base_log_writer)
     parameters['shared_dict'] = cast(Dict[str, Any], shared_dict) if shared_dict is not None else dict()
+    # A store may be given in place of a directory, e.g. by remote workers, which have none shared with the job.
+    parameters['artifacts'] = (
+        artifact_directory if isinstance(artifact_directory, ArtifactStore)
+        else ArtifactStore(artifact_directory or DEFAULT_ARTIFACT_DIRECTORY, task_name)
+    )
+    parameters['streams'] = streams or TaskStreams()
     parameters['metadata'] = {
         'name': task_name,
         'variant': task_class.__name__,
@@ -67,45 +125,155 @@ def exec_task_lifecycle(
     # Bind signal only in new child process
     stdout_log_writer = cast(TextIO, StdOutLogWriterWrapper(base_log_writer))
     stderr_log_writer = cast(TextIO, StdErrLogWriterWrapper(base_log_writer))
+    fd_capture: Optional[FdCapture] = None
 
     def _exec_lifecycle_stage(stage: Callable[[], None]) -> None:
         try:
             stage()
-        except Exception:
+        except Exception as e:
             print(traceback.format_exc(), file=stderr_log_writer)
-            result.is_failed = True
+            result.fail(e)
 
     signal.signal(signal.SIGTERM, lambda *_: _exec_lifecycle_stage(task_instance.on_abort))
     _sout = sys.stdout
     _serr = sys.stderr
 
     try:
-        sys.stdout = stdout_log_writer
-        sys.stderr = stderr_log_writer
+        if output_capture == 'fd':
+            fd_capture = FdCapture(base_log_writer).__enter__()
+            # Python's own output goes through the same descriptors, so it stays in order with everything else.
+            sys.stdout = open(1, 'w', buffering=1, closefd=False)
+            sys.stderr = open(2, 'w', buffering=1, closefd=False)
+        else:
+            sys.stdout = stdout_log_writer
+            sys.stderr = stderr_log_writer
 
         _exec_lifecycle_stage(task_instance.on_create)
 
         if is_restart:
             _exec_lifecycle_stage(task_instance.on_restart)
 
-        _exec_lifecycle_stage(task_instance.run)
+        if profile:
+            with profiled(task_name, profile, profile_directory or DEFAULT_PROFILE_DIRECTORY, log_event_bus):
+                _exec_lifecycle_stage(task_instance.run)
+        else:
+            _exec_lifecycle_stage(task_instance.run)
 
         if result.is_failed:
             _exec_lifecycle_stage(task_instance.on_failure)
         else:
             _exec_lifecycle_stage(task_instance.on_success)
             result.is_failed = False
-    except Exception:
+    except Exception as e:
         print(traceback.format_exc(), file=sys.stderr)
-        result.is_failed = True
+        result.fail(e)
     finally:
         _exec_lifecycle_stage(task_instance.on_destroy)
+        task_instance.artifacts.close()
+        task_instance.streams.end(f"Task '{task_name}' failed." if result.is_failed else None)
+        if log_event_bus is not None:
+            usage = collect_resource_usage(task_name, started, usage_before, shared_process)
+            if usage is not None:
+                # Published through the log bus, which is the only bus shared with the task's process.
+                cast(EventBus, log_event_bus).put(usage)
+        if fd_capture is not None:
+            fd_capture.close()
         base_log_writer.close()
         sys.stdout = _sout
         sys.stderr = _serr
 
 
+async def exec_async_task_lifecycle(
+    task_name: str,
+    task_class: Type[AsyncTask],
+    parameters: Optional[Dict[str, Any]],
+    log_event_bus: Optional[EventBus[SerializableLogEvent]],
+    result: ProcessResult,
+    shared_dict: Optional[Union[Dict[str, Any], DictProxy[str, Any]]] = None,
+    is_restart: bool = False,
+    depends_on: Optional[List[str]] = None,
+    artifact_directory: Optional[str] = None,
+    streams: Optional[TaskStreams] = None,
+    min_severity: Severity = Severity.DEBUG
+) -> None:
+    # Same as `exec_task_lifecycle`, but for an `AsyncTask` run on the job's own event loop. Being cancelled aborts it.
+    loop = asyncio.get_running_loop()
+    # Anything that may wait for room on the log bus is done off the loop, as the loop is what empties it.
+    base_log_writer = await loop.run_in_executor(None, LogWriter, task_name, log_event_bus, min_severity)
+    # Unlike in a process of its own, changes made here would be seen by later attempts.
+    parameters = dict(parameters or dict())
+    parameters['logger'] = TaskLogWriterWrapper(base_log_writer)
+    parameters['shared_dict'] = cast(Dict[str, Any], shared_dict) if shared_dict is not None else dict()
+    parameters['artifacts'] = ArtifactStore(artifact_directory or DEFAULT_ARTIFACT_DIRECTORY, task_name)
+    parameters['streams'] = streams or TaskStreams()
+    parameters['metadata'] = {
+        'name': task_name,
+        'variant': task_class.__name__,
+        'depends_on': depends_on or []
+    }
+
+    async def _exec_lifecycle_stage(stage: Callable[[], Any]) -> None:
+        try:
+            outcome = stage()
+            if inspect.isawaitable(outcome):
+                await outcome
+        except Exception as e:
+            await base_log_writer.emit_log_write_event_async(traceback.format_exc(), Severity.ERROR)
+            result.fail(e)
+
+    try:
+        task_instance = task_class(**parameters)
+    except Exception as e:
+        await base_log_writer.emit_log_write_event_async(traceback.format_exc(), Severity.ERROR)
+        result.fail(e)
+        await loop.run_in_executor(None, base_log_writer.close)
+        return
+
+    try:
+        await _exec_lifecycle_stage(task_instance.on_create)
+        if is_restart:
+            await _exec_lifecycle_stage(task_instance.on_restart)
+        await _exec_lifecycle_stage(task_instance.run_async)
+        if result.is_failed:
+            await _exec_lifecycle_stage(task_instance.on_failure)
+        else:
+            await _exec_lifecycle_stage(task_instance.on_success)
+    except asyncio.CancelledError:
+        await _exec_lifecycle_stage(task_instance.on_abort)
+        result.is_failed = True
+        raise
+    finally:
+        await _exec_lifecycle_stage(task_instance.on_destroy)
+        task_instance.artifacts.close()
+        task_instance.streams.end(f"Task '{task_name}' failed." if result.is_failed else None)
+        await loop.run_in_executor(None, base_log_writer.close)
+
+
+class Dispatcher(ABC):
+    # Runs a single attempt of an Executor's task somewhere other than a local child process. Implementations must
+    # set `result.is_failed` before returning.
+    # Whether each attempt takes a `max_concurrency` slot of its own. Dispatchers that do not are expected to see to the
+    # job's limits themselves.
+    takes_slot = True
+    # Whether the dispatcher sets the Executor RUNNING itself once its task actually starts, rather than as soon as the
+    # attempt is handed over.
+    announces_start = False
+
+    @abstractmethod
+    async def run(self, executor: Executor, result: ProcessResult) -> None:
+        pass
+
+
 class Executor:
+    # Jobs may hold a great many of these at once, so their attributes are fixed.
+    __slots__ = (
+        'name', 'log_event_bus', 'execution_event_bus', 'shared_dict', 'max_attempts', 'semaphore', 'backoff',
+        'task_class', 'parameters', 'await_dependencies', '_state', 'proc', 'is_restart', 'depends_on', 'dispatcher',
+        'shared_semaphore', 'artifact_directory', 'streams', 'uses_slot', 'profile', 'profile_directory',
+        'min_severity', 'output_capture', 'timeout_seconds', 'kill_grace_seconds', 'backoff_policy',
+        'max_backoff_seconds', 'retry_on', 'event', 'started', '_finished'
+    )
+
     def __init__(
         self,
         name: str,
@@ -115,11 +283,12 @@ class Executor:
         shared_dict: Optional[Union[DictProxy[str, Any], Dict[str, Any]]] = None,
         semaphore: Optional[asyncio.Semaphore] = None,
         max_attempts: int = 1,
-        backoff: int = 0,
+        backoff: float = 0,
         await_dependencies: Callable[[], Coroutine[Any, Any, bool]] = _default_await_dependencies,
         is_restart: bool = False,
         parameters: Optional[Dict[str, Any]] = None,
-        depends_on: Optional[List[str]] = None
+        depends_on: Optional[List[str]] = None,
+        dispatcher: Optional[Dispatcher] = None
     ) -> None:
         self.name = name
         self.log_event_bus = log_event_bus
@@ -135,6 +304,34 @@ class Executor:
         self.proc: Optional[Process] = None
         self.is_restart = is_restart
         self.depends_on = depends_on
+        self.dispatcher = dispatcher
+        # Budget shared with other jobs (e.g. in daemon mode), acquired after this job's own `semaphore`.
+        self.shared_semaphore: Optional[asyncio.Semaphore] = None
+        self.artifact_directory: Optional[str] = None
+        # Channels to and from the tasks this task streams records with. A task consuming a stream only makes progress
+        # while its producer runs, so it does not take a concurrency slot of its own; this also ensures a producer
+        # blocked on a full channel never holds up its consumer from starting.
+        self.streams: Optional[TaskStreams] = None
+        self.uses_slot = True
+        self.profile: List[str] = []
+        self.profile_directory: Optional[str] = None
+        self.min_severity = Severity.DEBUG
+        # Either 'python', to capture what is written to `sys.stdout` and `sys.stderr`, or 'fd', to capture everything
+        # written to the task process's file descriptors 1 and 2.
+        self.output_capture = 'python'
+        # Attempts running for longer than `timeout_seconds` are stopped: a task run in a process is sent SIGTERM, which
+        # runs its `on_abort`, and should it still be running `kill_grace_seconds` later, its whole process group is
+        # sent SIGKILL. Tasks run on the job's own event loop, or by a `Dispatcher`, are cancelled instead.
+        self.timeout_seconds: Optional[float] = None
+        self.kill_grace_seconds = 5.0
+        # How long to wait between attempts, starting from `backoff`; see `backoff_seconds`.
+        self.backoff_policy = 'fixed'
+        self.max_backoff_seconds: Optional[float] = None
+        self.retry_on: List[RetryOn] = []
+        # Only created once something actually waits on this task, which most often it has already finished by then.
+        self.event: Optional[asyncio.Event] = None
+        self.started: Optional[asyncio.Event] = None
+        self._finished = False
 
     @property
     def state(self) -> ExecutionState:
@@ -146,6 +343,15 @@ class Executor:
         if self.execution_event_bus is not None:
             self.execution_event_bus.put(event)
         self._state = val
+        if val == ExecutionState.RUNNING and self.started is not None:
+            self.started.set()
+
+    def _finish(self) -> None:
+        self._finished = True
+        if self.event is not None:
+            self.event.set()
+        if self.started is not None:
+            self.started.set()
 
     def get_task_class(self) -> Type[Task]:
         if inspect.isclass(self.task_class) and issubclass(self.task_class, Task):
@@ -168,64 +374,89 @@ class Executor:
             if self.semaphore:
                 self.semaphore.release()
 
-    # Quick patch until the execution handling is improved...this is to ensure all Event objects are init'ed before
-    # firing up Executors to avoid situations where `self.event` for a dependency is None/not yet initialized.
+    def _takes_slot(self) -> bool:
+        if not self.uses_slot:
+            return False
+        if self.dispatcher is not None:
+            return self.dispatcher.takes_slot
+        return self.get_task_class().takes_slot
+
+    @asynccontextmanager
+    async def acquire_slot(self) -> AsyncIterator[None]:
+        if not self._takes_slot():
+            yield
+            return
+        async with self.acquire_lock():
+            if self.shared_semaphore is None:
+                yield
+            else:
+                async with self.shared_semaphore:
+                    yield
+
+    # Readies the Executor for another run of its job.
     def init_event(self) -> None:
-        # Need to wait for main loop to initiate before spawning Event
-        self.event = asyncio.Event()
+        self.event = None
+        self.started = None
+        self._finished = False
 
     async def wait(self) -> None:
+        if self._finished:
+            return
+        if self.event is None:
+            self.event = asyncio.Event()
         await self.event.wait()
 
+    # Returns once the task is running or has finished without ever running.
+    async def wait_started(self) -> None:
+        if self._finished or self._state == ExecutionState.RUNNING:
+            return
+        if self.started is None:
+            self.started = asyncio.Event()
+        await self.started.wait()
+
     async def start(self) -> None:
         try:
             # In the event of a restart and this task is already complete, return immediately.
             if self.state == ExecutionState.COMPLETED:
-                self.event.set()
                 return
 
-            # Trigger a state change from INIT -> PENDING
-            self.state = ExecutionState.PENDING
+            # Trigger a state change from INIT -> PENDING, unless the job already did so as the task was queued.
+            if self.state != ExecutionState.PENDING:
+                self.state = ExecutionState.PENDING
 
             if not await self.await_dependencies():
                 self.state = ExecutionState.DEFAULTED
-                self.event.set()
                 return
 
             # In the event of skipped task, return immediately.
             if self.state == ExecutionState.SKIP:
-                self.event.set()
                 return
 
             attempts = 0
-            result = ProcessResult()
+            delay = 0.0
+            result = ProcessResult(self.retry_on)
             while attempts < self.max_attempts and self.state == ExecutionState.PENDING:
-                async with self.acquire_lock():
-                    result.is_failed = False
-                    self.state = ExecutionState.RUNNING
+                async with self.acquire_slot():
+                    result.reset()
+                    if self.dispatcher is None or not self.dispatcher.announces_start:
+                        self.state = ExecutionState.RUNNING
                     attempts += 1
-                    self.proc = Process(
-                        target=exec_task_lifecycle,
-                        args=(
-                            self.name,
-                            self.get_task_class(),
-                            self.parameters,
-                            self.log_event_bus,
-                            result,
-                            self.shared_dict,
-                            self.is_restart,
-                            self.depends_on
-                        ),
-                        daemon=False
-                    )
-                    self.proc.start()
-                    loop = asyncio.get_running_loop()
-                    await loop.run_in_executor(None, self.proc.join)
+                    if await self._run_attempt(result) and self.execution_event_bus is not None:
+                        self.execution_event_bus.put(TaskTimeout(
+                            name=self.name, attempt=attempts, timeout_seconds=cast(float, self.timeout_seconds)
+                        ))
 
-                # Restart check
-                if result.is_failed and (attempts < self.max_attempts):
+                # Restart check. Failures not covered by `retry_on` fail the task straight away.
+                if result.is_failed and result.retryable and (attempts < self.max_attempts):
                     self.state = ExecutionState.PENDING
-                    await asyncio.sleep(self.backoff)
+                    delay = backoff_seconds(
+                        self.backoff_policy, self.backoff, attempts, delay, self.max_backoff_seconds
+                    )
+                    if self.execution_event_bus is not None:
+                        self.execution_event_bus.put(
+                            TaskRetry(name=self.name, attempt=attempts, backoff_seconds=delay)
+                        )
+                    await asyncio.sleep(delay)
 
             if result.is_failed:
                 self.state = ExecutionState.FAILED
@@ -235,7 +466,104 @@ class Executor:
             self.terminate()
             self.state = ExecutionState.ABORTED
         finally:
-            self.event.set()
+            self._finish()
+            if self.streams is not None:
+                self._release_streams()
+
+    def _release_streams(self) -> None:
+        assert self.streams is not None
+        for c in self.streams.outputs.values():
+            c.mark_writer_exited()
+        loop = asyncio.get_running_loop()
+        for c in self.streams.inputs.values():
+            loop.run_in_executor(None, c.drain)
+
+    # Returns whether the attempt ran out of time, in which case it has failed.
+    async def _run_attempt(self, result: ProcessResult) -> bool:
+        self.proc = None
+        attempt = self.dispatcher.run(self, result) if self.dispatcher is not None else self._run_local(result)
+        if self.timeout_seconds is None:
+            await attempt
+            return False
+        running = asyncio.ensure_future(attempt)
+        try:
+            done, _ = await asyncio.wait({running}, timeout=self.timeout_seconds)
+            if not done:
+                if self.proc is not None:
+                    await self._stop_process(running)
+                else:
+                    running.cancel()
+                    await asyncio.gather(running, return_exceptions=True)
+                # Whatever failure it was stopped with, an attempt that ran out of time may always be retried.
+                result.is_failed = True
+                result.retryable = True
+                return True
+            running.result()
+            return False
+        except asyncio.CancelledError:
+            # A task's process is seen to by `terminate`; anything else has to be cancelled along with the job.
+            if self.proc is None:
+                running.cancel()
+            raise
+
+    async def _stop_process(self, running: asyncio.Future) -> None:
+        proc = cast(Process, self.proc)
+        proc.terminate()
+        await asyncio.wait({running}, timeout=self.kill_grace_seconds)
+        # Even should the task itself have exited, processes it started may not have.
+        if hasattr(os, 'killpg') and proc.pid is not None:
+            try:
+                os.killpg(proc.pid, signal.SIGKILL)
+            except (ProcessLookupError, PermissionError):
+                pass
+        else:
+            proc.kill()
+        await running
+
+    # Arguments of `exec_task_lifecycle` for a single attempt.
+    def lifecycle_args(self, result: ProcessResult) -> Tuple[Any, ...]:
+        return (
+            self.name,
+            self.get_task_class(),
+            self.parameters,
+            self.log_event_bus,
+            result,
+            self.shared_dict,
+            self.is_restart,
+            self.depends_on,
+            self.artifact_directory,
+            self.streams,
+            self.profile,
+            self.profile_directory,
+            self.min_severity,
+            self.output_capture,
+            self.timeout_seconds is not None
+        )
+
+    async def _run_local(self, result: ProcessResult) -> None:
+        task_class = self.get_task_class()
+        if issubclass(task_class, AsyncTask):
+            await exec_async_task_lifecycle(
+                self.name,
+                task_class,
+                self.parameters,
+                self.log_event_bus,
+                result,
+                self.shared_dict,
+                self.is_restart,
+                self.depends_on,
+                self.artifact_directory,
+                self.streams,
+                self.min_severity
+            )
+            return
+        self.proc = Process(target=exec_task_lifecycle, args=self.lifecycle_args(result), daemon=False)
+        self.proc.start()
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.proc.join)
+        # e.g. the task called `sys.exit`, or its process was killed.
+        if self.proc.exitcode:
+            result.fail(self.proc.exitcode)
 
     def terminate(self) -> None:
         if self.proc is not None:
@@ -1,6 +1,6 @@
 # noqa: F401
 # Ensure implementations are registered
-from . import notifications, progressbar
+from . import notifications, progressbar, prometheus, trace
 from .extension import Extension, extension
 
 __all__ = ['Extension', 'extension']
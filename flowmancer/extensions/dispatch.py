@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from ..eventbus.execution import SerializableExecutionEvent
+from ..jobdefinition import ExtensionOverflowPolicy
+
+_Key = Tuple[str, Optional[str]]
+
+
+def _coalesce_key(e: SerializableExecutionEvent) -> _Key:
+    return type(e).__name__, getattr(e, 'name', None)
+
+
+class ExtensionQueue:
+    # Events waiting to be handled by one extension. The job hands events to every extension's queue without ever
+    # waiting, and each extension works through its own at its own pace, so that a slow extension only falls behind by
+    # itself. Once `maxsize` events are waiting, `overflow` decides whether further events are held back until there is
+    # room or an event is discarded.
+    def __init__(self, maxsize: int = 10000, overflow: str = ExtensionOverflowPolicy.BLOCK.value) -> None:
+        self.maxsize = max(1, maxsize)
+        self.overflow = ExtensionOverflowPolicy(overflow)
+        # Each slot is [event, time it was queued], so a coalesced event may be swapped in without losing its place.
+        self._slots: Deque[List[Any]] = deque()
+        self._latest: Dict[_Key, List[Any]] = dict()
+        # With `block`, events beyond `maxsize`, in order, along with the time they were queued.
+        self._held: Deque[List[Any]] = deque()
+        self._readable = asyncio.Event()
+        self._writable = asyncio.Event()
+        self._writable.set()
+        self._closed = False
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return len(self._slots) + len(self._held)
+
+    def _pop(self) -> List[Any]:
+        slot = self._slots.popleft()
+        key = _coalesce_key(slot[0])
+        if self._latest.get(key) is slot:
+            del self._latest[key]
+        return slot
+
+    def _append(self, slot: List[Any]) -> None:
+        self._slots.append(slot)
+        self._latest[_coalesce_key(slot[0])] = slot
+        self._readable.set()
+
+    async def put(self, e: SerializableExecutionEvent) -> None:
+        # Same as `offer`, but with `block` waits for room rather than holding the event back.
+        while self.overflow == ExtensionOverflowPolicy.BLOCK and len(self) >= self.maxsize:
+            self._writable.clear()
+            await self._writable.wait()
+        self.offer(e)
+
+    def offer(self, e: SerializableExecutionEvent) -> None:
+        slot = [e, time.perf_counter()]
+        if self.overflow == ExtensionOverflowPolicy.BLOCK:
+            if self._held or len(self._slots) >= self.maxsize:
+                self._held.append(slot)
+            else:
+                self._append(slot)
+            return
+        key = _coalesce_key(e)
+        while len(self._slots) >= self.maxsize:
+            self.dropped += 1
+            if self.overflow == ExtensionOverflowPolicy.COALESCE and key in self._latest:
+                self._latest[key][0] = e
+                return
+            self._pop()
+        self._append(slot)
+
+    async def get(self) -> Optional[Tuple[SerializableExecutionEvent, float]]:
+        # Returns the next event and the `time.perf_counter()` at which it was queued, or `None` once the queue has
+        # been closed and every event in it handed out.
+        while not self._slots:
+            if self._closed:
+                return None
+            self._readable.clear()
+            await self._readable.wait()
+        slot = self._pop()
+        if self._held:
+            self._append(self._held.popleft())
+        self._writable.set()
+        return slot[0], slot[1]
+
+    def close(self) -> None:
+        self._closed = True
+        self._readable.set()
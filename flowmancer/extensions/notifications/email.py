@@ -1,5 +1,6 @@
 import smtplib
 from email.message import EmailMessage
+from typing import Optional
 
 from ..extension import extension
 from .notification import Notification
@@ -13,11 +14,30 @@ class EmailNotification(Notification):
     sender_user: str
     sender_host: str
 
-    async def send_notification(self, title: str, msg: str) -> None:
+    # Kept open between notifications, and reopened should the server have closed it in the meantime.
+    _smtp: Optional[smtplib.SMTP] = None
+
+    def _connection(self) -> smtplib.SMTP:
+        if self._smtp is None:
+            self._smtp = smtplib.SMTP(self.smtp_host, self.smtp_port, timeout=self.timeout_seconds)
+        return self._smtp
+
+    def deliver(self, title: str, msg: str) -> None:
         em = EmailMessage()
         em['From'] = f'{self.sender_user}@{self.sender_host}'
         em['Subject'] = title
         em['To'] = self.recipient
         em.set_content(msg)
-        with smtplib.SMTP(self.smtp_host, self.smtp_port) as s:
-            s.send_message(em)
+        try:
+            self._connection().send_message(em)
+        except (smtplib.SMTPServerDisconnected, ConnectionError):
+            self.close()
+            self._connection().send_message(em)
+
+    def close(self) -> None:
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._smtp = None
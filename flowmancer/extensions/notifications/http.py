@@ -0,0 +1,26 @@
+from typing import Any, Optional
+
+import requests
+
+from .notification import Notification, NotificationRejectedError
+
+
+class HttpNotification(Notification):
+    # Base for notifications sent as HTTP requests. Requests share one pooled session, so that consecutive
+    # notifications reuse the same connection.
+    _session: Optional[requests.Session] = None
+
+    def post(self, url: str, **kwargs: Any) -> requests.Response:
+        if self._session is None:
+            self._session = requests.Session()
+        r = self._session.post(url, timeout=self.timeout_seconds, **kwargs)
+        # Anything but throttling or a server-side error would only fail the same way again.
+        if 400 <= r.status_code < 500 and r.status_code != 429:
+            raise NotificationRejectedError(f'{r.status_code} {r.reason}: {r.text[:200]}')
+        r.raise_for_status()
+        return r
+
+    def close(self) -> None:
+        if self._session is not None:
+            self._session.close()
+            self._session = None
@@ -1,46 +1,166 @@
-from abc import abstractmethod
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from typing import Any, List, Optional, Tuple
 
 from ...executor import SerializableExecutionEvent
 from ..extension import Extension
 
 
+class NotificationRejectedError(Exception):
+    # Raised by `deliver` when retrying cannot help, e.g. the service rejected the credentials or the message.
+    pass
+
+
 class Notification(Extension):
+    class NotificationState:
+        def __init__(self) -> None:
+            self.pending: List[Tuple[str, str]] = []
+            self.wakeup: Optional[asyncio.Event] = None
+            self.worker: Optional[asyncio.Task] = None
+            self.closing = False
+            # A single thread per notification, so that the pooled session or connection is only ever used by one
+            # thread at a time.
+            self.executor: Optional[ThreadPoolExecutor] = None
+
     notify_on_create: bool = True
     notify_on_success: bool = True
     notify_on_failure: bool = True
     notify_on_abort: bool = True
+    timeout_seconds: float = 10.0
+    max_retries: int = 3
+    # Doubled after each failed attempt.
+    retry_backoff_seconds: float = 1.0
+    # Notifications raised within this many seconds of one another are sent together as one digest.
+    digest_window_seconds: float = 2.0
+    max_digest_size: int = 20
+    # How long to keep trying to deliver what is still pending once the job has ended.
+    flush_timeout_seconds: float = 30.0
+
+    _state: NotificationState = NotificationState()
+
+    def model_post_init(self, __context: Any) -> None:
+        # Same as an abstract method, though either of the two will do. Checked here rather than as the class is
+        # defined, as in-between bases (e.g. `HttpNotification`) implement neither.
+        cls = type(self)
+        if cls.deliver is Notification.deliver and cls.send_notification is Notification.send_notification:
+            raise TypeError(f"Can't instantiate {cls.__name__} without implementing `deliver` or `send_notification`.")
+        super().model_post_init(__context)
 
     async def update(self, _: SerializableExecutionEvent) -> None:
         # We don't want notifications to be spammed...
         pass
 
-    @abstractmethod
-    async def send_notification(self, title: str, msg: str) -> None:
+    def deliver(self, title: str, msg: str) -> None:
+        # Blocking delivery, run on the notification's own thread rather than the event loop.
+        raise NotImplementedError(f'{type(self).__name__} must implement `deliver` or `send_notification`.')
+
+    def close(self) -> None:
+        # Releases any pooled session or connection. Also run on the notification's own thread.
         pass
 
+    async def send_notification(self, title: str, msg: str) -> None:
+        s = self._state
+        if s.executor is None:
+            s.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=type(self).__name__)
+        await asyncio.get_running_loop().run_in_executor(s.executor, self.deliver, title, msg)
+
+    def notify(self, title: str, msg: str) -> None:
+        # Queues the notification for the background worker and returns immediately.
+        s = self._state
+        if s.worker is None:
+            s.wakeup = asyncio.Event()
+            s.worker = asyncio.create_task(self._deliver_pending())
+        s.pending.append((title, msg))
+        if s.wakeup is not None:
+            s.wakeup.set()
+
+    def _digest(self, batch: List[Tuple[str, str]]) -> Tuple[str, str]:
+        if len(batch) == 1:
+            return batch[0]
+        title = f'{batch[0][0]} (+{len(batch) - 1} more)'
+        return title, '\n\n'.join(f'{t}\n{m}' for t, m in batch)
+
+    async def _send_with_retry(self, title: str, msg: str) -> None:
+        for attempt in range(self.max_retries + 1):
+            try:
+                # Built-in notifications also time out on their own; this bounds custom `send_notification`s too.
+                await asyncio.wait_for(self.send_notification(title, msg), timeout=self.timeout_seconds * 2)
+                return
+            except NotificationRejectedError as e:
+                print(f'WARNING: {type(self).__name__} notification was rejected: {e}')
+                return
+            except NotImplementedError as e:
+                # A mistake in the notification itself, which no amount of retrying will fix.
+                print(f'WARNING: {type(self).__name__} notification is not implemented: {e}')
+                return
+            except Exception as e:
+                if attempt >= self.max_retries:
+                    print(f'WARNING: {type(self).__name__} notification failed after {attempt + 1} attempts: {e!r}')
+                    return
+                await asyncio.sleep(self.retry_backoff_seconds * (2 ** attempt))
+
+    async def _deliver_pending(self) -> None:
+        s = self._state
+        while True:
+            if not s.pending:
+                if s.closing:
+                    return
+                assert s.wakeup is not None
+                s.wakeup.clear()
+                await s.wakeup.wait()
+                continue
+            # Give a burst a moment to finish, so that it is sent as a single digest.
+            if not s.closing and self.digest_window_seconds > 0:
+                assert s.wakeup is not None
+                s.wakeup.clear()
+                try:
+                    await asyncio.wait_for(s.wakeup.wait(), timeout=self.digest_window_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                if s.wakeup.is_set() and not s.closing and len(s.pending) < self.max_digest_size:
+                    continue
+            batch, s.pending = s.pending[:self.max_digest_size], s.pending[self.max_digest_size:]
+            await self._send_with_retry(*self._digest(batch))
+
+    async def on_destroy(self) -> None:
+        s = self._state
+        s.closing = True
+        if s.worker is not None:
+            assert s.wakeup is not None
+            s.wakeup.set()
+            try:
+                await asyncio.wait_for(s.worker, timeout=self.flush_timeout_seconds)
+            except asyncio.TimeoutError:
+                print(f'WARNING: {type(self).__name__} gave up on {len(s.pending)} undelivered notification(s).')
+        if s.executor is not None:
+            await asyncio.get_running_loop().run_in_executor(s.executor, self.close)
+            s.executor.shutdown(wait=False)
+        self._state = Notification.NotificationState()
+
     async def on_create(self) -> None:
+        self._state = Notification.NotificationState()
         if self.notify_on_create:
-            await self.send_notification(
+            self.notify(
                 "Flowmancer Job Notification: STARTING",
                 f"Job initiated at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
             )
 
     async def on_success(self) -> None:
         if self.notify_on_success:
-            await self.send_notification(
+            self.notify(
                 "Flowmancer Job Notification: SUCCESS",
                 f"Job completed successfully at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
             )
 
     async def on_failure(self) -> None:
         if self.notify_on_failure:
-            await self.send_notification(
+            self.notify(
                 "Flowmancer Job Notification: FAILURE", f"Job failed at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
             )
 
     async def on_abort(self) -> None:
         if self.notify_on_abort:
-            await self.send_notification(
+            self.notify(
                 "Flowmancer Job Notification: ABORTED", f"Job aborted at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
             )
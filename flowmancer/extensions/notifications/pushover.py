@@ -1,15 +1,14 @@
-import requests
-
 from ..extension import extension
-from .notification import Notification
+from .http import HttpNotification
 
 
 @extension
-class PushoverNotification(Notification):
+class PushoverNotification(HttpNotification):
     app_token: str
     user_key: str
+    api_url: str = 'https://api.pushover.net/1/messages.json'
 
-    async def send_notification(self, title: str, msg: str) -> None:
+    def deliver(self, title: str, msg: str) -> None:
         headers = {'Content-type': 'application/x-www-form-urlencoded'}
         data = {'token': self.app_token, 'user': self.user_key, 'title': title, 'message': msg}
-        requests.post('https://api.pushover.net/1/messages.json', headers=headers, data=data)
+        self.post(self.api_url, headers=headers, data=data)
@@ -1,17 +1,15 @@
 import json
 
-import requests
-
 from ..extension import extension
-from .notification import Notification
+from .http import HttpNotification
 
 
 @extension
-class SlackWebhookNotification(Notification):
+class SlackWebhookNotification(HttpNotification):
     webhook: str
 
-    async def send_notification(self, title: str, msg: str) -> None:
-        requests.post(
+    def deliver(self, title: str, msg: str) -> None:
+        self.post(
             self.webhook,
             data=json.dumps({'text': title, 'attachments': [{'text': msg}]}),
             headers={'Content-Type': 'application/json'},
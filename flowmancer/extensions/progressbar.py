@@ -1,75 +1,164 @@
 import asyncio
 import time
-from collections import defaultdict
-from typing import Dict
+from collections import defaultdict, deque
+from typing import Deque, Dict, Optional, Tuple
 
+from rich.console import Console
 from rich.progress import Progress, TaskID
 
 from ..executor import ExecutionState, ExecutionStateTransition, SerializableExecutionEvent
 from .extension import Extension, extension
 
+# Throughput is measured over this trailing window.
+_THROUGHPUT_WINDOW_SECONDS = 60.0
+
+
+def _format_seconds(seconds: float) -> str:
+    seconds = int(seconds)
+    h, rem = divmod(seconds, 3600)
+    m, s = divmod(rem, 60)
+    return f'{h}:{m:02d}:{s:02d}' if h else f'{m}:{s:02d}'
+
 
 @extension
 class RichProgressBar(Extension):
     class RichProgressBarState:
         def __init__(self) -> None:
-            self.state_counts: Dict[ExecutionState, int]
-            self.start_time: float
-            self.progress: Progress
+            self.state_counts: Dict[ExecutionState, int] = defaultdict(lambda: 0)
+            self.start_time: float = time.monotonic()
+            self.progress: Optional[Progress] = None
             self.event: asyncio.Event
             self.task: TaskID
             self.update_task: asyncio.Task
+            self.headless = False
+            # Only running totals are kept, so that the cost of an update or a redraw does not grow with the job.
+            self.running_since: Dict[str, int] = dict()
+            self.run_seconds_total = 0.0
+            self.runs_finished = 0
+            self.first_run_ns: Optional[int] = None
+            self.last_run_ns: Optional[int] = None
+            self.samples: Deque[Tuple[float, int]] = deque()
+
+    # Minimum time between redraws. Should drawing get slow, redraws are spaced further apart, up to
+    # `max_refresh_interval_seconds`.
+    refresh_interval_seconds: float = 0.5
+    max_refresh_interval_seconds: float = 5.0
+    # Whether to print one-line summaries instead of a progress bar. Detected from the terminal if not given.
+    headless: Optional[bool] = None
+    summary_interval_seconds: float = 30.0
 
     _state: RichProgressBarState = RichProgressBarState()
 
-    def _update_pbar(self, advance: int = 0) -> None:
-        pending = self._state.state_counts[ExecutionState.PENDING]
-        running = self._state.state_counts[ExecutionState.RUNNING]
-        failed = (
-            self._state.state_counts[ExecutionState.FAILED] + self._state.state_counts[ExecutionState.DEFAULTED]
+    def _counts(self) -> Tuple[int, int, int, int]:
+        c = self._state.state_counts
+        failed = c[ExecutionState.FAILED] + c[ExecutionState.DEFAULTED]
+        return c[ExecutionState.PENDING], c[ExecutionState.RUNNING], c[ExecutionState.COMPLETED], failed
+
+    def _throughput_per_minute(self, now: float) -> Optional[float]:
+        s = self._state
+        _, _, completed, failed = self._counts()
+        s.samples.append((now, completed + failed))
+        while len(s.samples) > 2 and now - s.samples[1][0] >= _THROUGHPUT_WINDOW_SECONDS:
+            s.samples.popleft()
+        first_time, first_done = s.samples[0]
+        if now - first_time <= 0:
+            return None
+        return (completed + failed - first_done) / (now - first_time) * 60.0
+
+    def eta_seconds(self) -> Optional[float]:
+        # The mean duration of the runs seen so far, spread over as many tasks as have been running at once on
+        # average, applied to the tasks that remain.
+        s = self._state
+        if not s.runs_finished or s.first_run_ns is None or s.last_run_ns is None:
+            return None
+        wall = (s.last_run_ns - s.first_run_ns) / 1e9
+        if wall <= 0:
+            return None
+        pending, running, _, _ = self._counts()
+        mean = s.run_seconds_total / s.runs_finished
+        parallelism = max(1.0, s.run_seconds_total / wall)
+        return (pending + running) * mean / parallelism
+
+    def describe(self, now: float) -> str:
+        pending, running, completed, failed = self._counts()
+        throughput = self._throughput_per_minute(now)
+        eta = self.eta_seconds()
+        return (
+            f'Pending: {pending} - Running: {running} - Completed: {completed} - Failed: {failed} '
+            + f'(Elapsed: {_format_seconds(now - self._state.start_time)}'
+            + (f', {throughput:.1f} tasks/min' if throughput is not None else '')
+            + (f', ETA: {_format_seconds(eta)}' if eta is not None and (pending or running) else '')
+            + ')'
         )
-        completed = self._state.state_counts[ExecutionState.COMPLETED]
-        total = (pending + running + failed + completed) or 100
-        elapsed = int(time.time() - self._state.start_time)
-        m = (
-            f'Pending: {pending} - '
-            + f'Running: {running} - '
-            + f'Completed: {completed} - '
-            + f'Failed: {failed} '
-            + f'(Elapsed: {elapsed} sec.)'
+
+    def _render(self) -> None:
+        s = self._state
+        now = time.monotonic()
+        description = self.describe(now)
+        if s.progress is None:
+            print(f'[{self.__class__.__name__}] {description}', flush=True)
+            return
+        pending, running, completed, failed = self._counts()
+        s.progress.update(
+            s.task,
+            description=description,
+            completed=completed + failed,
+            total=(pending + running + completed + failed) or 100,
+            refresh=True
         )
-        self._state.progress.update(self._state.task, description=m, advance=advance, total=total)
 
     async def _continuous_update_pbar(self) -> None:
+        s = self._state
+        interval = self.summary_interval_seconds if s.headless else self.refresh_interval_seconds
         while True:
-            self._update_pbar()
-            if self._state.event.is_set():
+            started = time.perf_counter()
+            self._render()
+            if s.event.is_set():
                 # Need to imitate do-while to ensure pbar is updated one final time
                 # before exiting loop due to Event set.
                 break
-            await asyncio.sleep(0.5)
+            if not s.headless:
+                # Keep drawing to a small share of the loop's time.
+                cost = time.perf_counter() - started
+                interval = min(self.max_refresh_interval_seconds, max(self.refresh_interval_seconds, cost * 50))
+            try:
+                await asyncio.wait_for(s.event.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
 
     async def on_create(self) -> None:
-        self._state.state_counts = defaultdict(lambda: 0)
-        self._state.start_time = time.time()
-        self._state.progress = Progress()
-        self._state.event = asyncio.Event()
-        self._state.task = self._state.progress.add_task('Pending: 0 - Running: 0 - Completed: 0 - Failed: 0')
-        self._state.progress.start()
-
-        loop = asyncio.get_event_loop()
-        self._state.update_task = loop.create_task(self._continuous_update_pbar())
+        self._state = RichProgressBar.RichProgressBarState()
+        s = self._state
+        console = Console()
+        s.headless = self.headless if self.headless is not None else (
+            not console.is_terminal or console.is_dumb_terminal
+        )
+        s.event = asyncio.Event()
+        if not s.headless:
+            # Redrawn only when told to, rather than from rich's own refresh thread.
+            s.progress = Progress(console=console, auto_refresh=False)
+            s.task = s.progress.add_task('Pending: 0 - Running: 0 - Completed: 0 - Failed: 0')
+            s.progress.start()
+        s.update_task = asyncio.create_task(self._continuous_update_pbar())
 
     async def on_destroy(self) -> None:
         self._state.event.set()
         await asyncio.gather(self._state.update_task)
-        self._state.progress.stop()
+        if self._state.progress is not None:
+            self._state.progress.stop()
 
     async def update(self, e: SerializableExecutionEvent) -> None:
         if isinstance(e, ExecutionStateTransition):
+            s = self._state
             from_state = ExecutionState(e.from_state)
             to_state = ExecutionState(e.to_state)
-            self._state.state_counts[from_state] -= 1
-            self._state.state_counts[to_state] += 1
-            if to_state in (ExecutionState.FAILED, ExecutionState.COMPLETED, ExecutionState.DEFAULTED):
-                self._update_pbar(1)
+            s.state_counts[from_state] -= 1
+            s.state_counts[to_state] += 1
+            if to_state == ExecutionState.RUNNING:
+                s.running_since[e.name] = e.monotonic_ns
+                if s.first_run_ns is None:
+                    s.first_run_ns = e.monotonic_ns
+            elif from_state == ExecutionState.RUNNING and e.name in s.running_since:
+                s.run_seconds_total += (e.monotonic_ns - s.running_since.pop(e.name)) / 1e9
+                s.runs_finished += 1
+                s.last_run_ns = e.monotonic_ns
@@ -0,0 +1,213 @@
+import asyncio
+import os
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from ..eventbus.execution import (
+    ExecutionState,
+    ExecutionStateTransition,
+    JobInstrumentation,
+    SerializableExecutionEvent,
+    TaskResourceUsage,
+)
+from .extension import Extension, extension
+
+_DEFAULT_BUCKETS = [0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0]
+_OVERFLOW_LABEL = 'other'
+
+
+def _escape(v: str) -> str:
+    return v.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(**kwargs: str) -> str:
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in kwargs.items()) + '}'
+
+
+class _Histogram:
+    def __init__(self, buckets: List[float]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, v: float) -> None:
+        self.count += 1
+        self.sum += v
+        for i, b in enumerate(self.buckets):
+            if v <= b:
+                self.counts[i] += 1
+
+    def lines(self, name: str, **labels: str) -> List[str]:
+        out = [f'{name}_bucket{_labels(**labels, le=str(b))} {c}' for b, c in zip(self.buckets, self.counts)]
+        out.append(f'{name}_bucket{_labels(**labels, le="+Inf")} {self.count}')
+        out.append(f'{name}_sum{_labels(**labels)} {self.sum}')
+        out.append(f'{name}_count{_labels(**labels)} {self.count}')
+        return out
+
+
+@extension
+class PrometheusTextfileExporter(Extension):
+    class PrometheusTextfileExporterState:
+        def __init__(self) -> None:
+            self.job_name: str = 'flowmancer'
+            self.states: Dict[str, str] = dict()
+            self.running_since: Dict[str, int] = dict()
+            self.task_labels: Dict[str, str] = dict()
+            self.durations: Dict[str, _Histogram] = dict()
+            self.retries: Dict[str, int] = defaultdict(lambda: 0)
+            self.cpu_seconds: Dict[str, float] = defaultdict(lambda: 0.0)
+            self.max_rss_bytes: Dict[str, int] = defaultdict(lambda: 0)
+            self.loop_lag = _Histogram([0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0])
+            self.last_instrumentation: Optional[JobInstrumentation] = None
+            self.checkpoint_writes = _Histogram([0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0])
+            self.update_seconds: Dict[str, float] = defaultdict(lambda: 0.0)
+            self.event: asyncio.Event
+            self.writer: asyncio.Task
+
+    # Written to `<directory>/<job name>.prom`, which should be the directory given to node_exporter's
+    # `--collector.textfile.directory`.
+    directory: str = './.flowmancer/metrics'
+    interval_seconds: float = 15.0
+    # Tasks beyond this many are counted under a single `task="other"` label, so that very large jobs do not flood
+    # Prometheus with series.
+    max_task_labels: int = 100
+    duration_buckets: List[float] = _DEFAULT_BUCKETS
+
+    _state: PrometheusTextfileExporterState = PrometheusTextfileExporterState()
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.directory, f'{self._state.job_name}.prom')
+
+    def _task_label(self, name: str) -> str:
+        label = self._state.task_labels.get(name)
+        if label is None:
+            label = name if len(self._state.task_labels) < self.max_task_labels else _OVERFLOW_LABEL
+            self._state.task_labels[name] = label
+        return label
+
+    def render(self) -> str:
+        s = self._state
+        job = s.job_name
+        lines: List[str] = []
+
+        lines.append('# HELP flowmancer_tasks Number of tasks in each state.')
+        lines.append('# TYPE flowmancer_tasks gauge')
+        counts: Dict[str, int] = defaultdict(lambda: 0)
+        for state in s.states.values():
+            counts[state] += 1
+        for state in ExecutionState:
+            lines.append(f'flowmancer_tasks{_labels(job=job, state=state.name.lower())} {counts[state.value]}')
+
+        lines.append('# HELP flowmancer_task_duration_seconds Time tasks spent running, per attempt.')
+        lines.append('# TYPE flowmancer_task_duration_seconds histogram')
+        for task, h in sorted(s.durations.items()):
+            lines.extend(h.lines('flowmancer_task_duration_seconds', job=job, task=task))
+
+        lines.append('# HELP flowmancer_task_retries_total Attempts that failed and were retried.')
+        lines.append('# TYPE flowmancer_task_retries_total counter')
+        for task, n in sorted(s.retries.items()):
+            lines.append(f'flowmancer_task_retries_total{_labels(job=job, task=task)} {n}')
+
+        lines.append('# HELP flowmancer_task_cpu_seconds_total CPU time used by tasks, including their children.')
+        lines.append('# TYPE flowmancer_task_cpu_seconds_total counter')
+        for task, v in sorted(s.cpu_seconds.items()):
+            lines.append(f'flowmancer_task_cpu_seconds_total{_labels(job=job, task=task)} {v}')
+
+        lines.append('# HELP flowmancer_task_max_rss_bytes Peak resident set size of any attempt of the task.')
+        lines.append('# TYPE flowmancer_task_max_rss_bytes gauge')
+        for task, n in sorted(s.max_rss_bytes.items()):
+            lines.append(f'flowmancer_task_max_rss_bytes{_labels(job=job, task=task)} {n}')
+
+        lines.append('# HELP flowmancer_event_loop_lag_seconds Maximum event loop lag per sampling window.')
+        lines.append('# TYPE flowmancer_event_loop_lag_seconds histogram')
+        lines.extend(s.loop_lag.lines('flowmancer_event_loop_lag_seconds', job=job))
+
+        lines.append('# HELP flowmancer_checkpoint_write_seconds Time taken to write a checkpoint.')
+        lines.append('# TYPE flowmancer_checkpoint_write_seconds histogram')
+        lines.extend(s.checkpoint_writes.lines('flowmancer_checkpoint_write_seconds', job=job))
+
+        lines.append('# HELP flowmancer_update_seconds_total Time spent in `update` by each extension and logger.')
+        lines.append('# TYPE flowmancer_update_seconds_total counter')
+        for plugin, v in sorted(s.update_seconds.items()):
+            lines.append(f'flowmancer_update_seconds_total{_labels(job=job, plugin=plugin)} {v}')
+
+        i = s.last_instrumentation
+        for name, value, desc in (
+            ('flowmancer_log_bus_depth', i.log_bus_depth if i else None, 'Log events waiting to be written.'),
+            (
+                'flowmancer_execution_bus_depth',
+                i.execution_bus_depth if i else None,
+                'Execution events waiting to be handled.'
+            ),
+        ):
+            if value is not None:
+                lines.append(f'# HELP {name} {desc}')
+                lines.append(f'# TYPE {name} gauge')
+                lines.append(f'{name}{_labels(job=job)} {value}')
+
+        lines.append('# HELP flowmancer_last_update_timestamp_seconds When this file was last written.')
+        lines.append('# TYPE flowmancer_last_update_timestamp_seconds gauge')
+        lines.append(f'flowmancer_last_update_timestamp_seconds{_labels(job=job)} {time.time()}')
+        return '\n'.join(lines) + '\n'
+
+    def write(self) -> None:
+        # Written to a temporary file in the same directory, then renamed over the old one, so that the collector
+        # never reads a partially written file.
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = f'{self.path}.{os.getpid()}.tmp'
+        with open(tmp, 'w') as f:
+            f.write(self.render())
+        os.replace(tmp, self.path)
+
+    async def _continuous_write(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._state.event.wait(), timeout=self.interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self.write()
+            # Imitates do-while, so the file is written one final time once the job ends.
+            if self._state.event.is_set():
+                break
+
+    async def on_create(self) -> None:
+        self._state = PrometheusTextfileExporter.PrometheusTextfileExporterState()
+        self._state.event = asyncio.Event()
+        self._state.writer = asyncio.create_task(self._continuous_write())
+
+    async def on_destroy(self) -> None:
+        self._state.event.set()
+        await asyncio.gather(self._state.writer)
+
+    async def update(self, e: SerializableExecutionEvent) -> None:
+        s = self._state
+        if e.job_name:
+            s.job_name = e.job_name
+        if isinstance(e, ExecutionStateTransition):
+            to_state = ExecutionState(e.to_state)
+            from_state = ExecutionState(e.from_state)
+            s.states[e.name] = to_state.value
+            now = e.monotonic_ns
+            if to_state == ExecutionState.RUNNING:
+                s.running_since[e.name] = now
+            elif from_state == ExecutionState.RUNNING and e.name in s.running_since:
+                label = self._task_label(e.name)
+                if label not in s.durations:
+                    s.durations[label] = _Histogram(self.duration_buckets)
+                s.durations[label].observe((now - s.running_since.pop(e.name)) / 1e9)
+                if to_state == ExecutionState.PENDING:
+                    s.retries[label] += 1
+        elif isinstance(e, TaskResourceUsage):
+            label = self._task_label(e.name)
+            s.cpu_seconds[label] += e.user_cpu_seconds + e.system_cpu_seconds
+            s.max_rss_bytes[label] = max(s.max_rss_bytes[label], e.max_rss_bytes)
+        elif isinstance(e, JobInstrumentation):
+            s.last_instrumentation = e
+            s.loop_lag.observe(e.loop_lag_seconds_max)
+            for v in e.checkpoint_write_seconds:
+                s.checkpoint_writes.observe(v)
+            for plugin, summary in e.update_seconds.items():
+                s.update_seconds[plugin] += summary.total
@@ -0,0 +1,160 @@
+import heapq
+import json
+import os
+from typing import Any, Dict, List, Tuple
+
+from ..eventbus.execution import ExecutionState, ExecutionStateTransition, SerializableExecutionEvent, TaskRetry
+from .extension import Extension, extension
+
+# Chrome trace "processes" used to group tracks: one track per slot for running tasks, and a separate set of tracks for
+# tasks waiting on dependencies, a free slot or a retry backoff.
+_SLOTS_PID = 1
+_WAITING_PID = 2
+
+
+class _Lanes:
+    # Hands out the lowest free track number, so that at any time every busy track holds exactly one span.
+    def __init__(self) -> None:
+        self.free: List[int] = []
+        self.count = 0
+
+    def acquire(self) -> int:
+        if self.free:
+            return heapq.heappop(self.free)
+        self.count += 1
+        return self.count
+
+    def release(self, lane: int) -> None:
+        heapq.heappush(self.free, lane)
+
+
+@extension
+class ChromeTraceExporter(Extension):
+    class ChromeTraceExporterState:
+        def __init__(self) -> None:
+            self.job_name: str = 'flowmancer'
+            self.base_ns: int = -1
+            self.last_ns: int = 0
+            self.events: List[Dict[str, Any]] = []
+            self.running = _Lanes()
+            self.waiting = _Lanes()
+            # Task name -> (span name, category, start ns, pid, lane, args) of the span it is currently in.
+            self.open: Dict[str, Tuple[str, str, int, int, int, Dict[str, Any]]] = dict()
+            self.attempts: Dict[str, int] = dict()
+
+    # Written to `<directory>/<job name>.trace.json`, which may be opened in https://ui.perfetto.dev or
+    # chrome://tracing.
+    directory: str = './.flowmancer/traces'
+
+    _state: ChromeTraceExporterState = ChromeTraceExporterState()
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.directory, f'{self._state.job_name}.trace.json')
+
+    def _us(self, ns: int) -> float:
+        return (ns - self._state.base_ns) / 1000.0
+
+    def _open(self, name: str, span: str, category: str, ns: int, running: bool, **args: Any) -> None:
+        lanes = self._state.running if running else self._state.waiting
+        pid = _SLOTS_PID if running else _WAITING_PID
+        self._state.open[name] = (span, category, ns, pid, lanes.acquire(), {'task': name, **args})
+
+    def _close(self, name: str, ns: int, **args: Any) -> None:
+        if name not in self._state.open:
+            return
+        span, category, start, pid, lane, span_args = self._state.open.pop(name)
+        (self._state.running if pid == _SLOTS_PID else self._state.waiting).release(lane)
+        self._state.events.append({
+            'name': span,
+            'cat': category,
+            'ph': 'X',
+            'ts': self._us(start),
+            'dur': max(0.0, (ns - start) / 1000.0),
+            'pid': pid,
+            'tid': lane,
+            'args': {**span_args, **args}
+        })
+
+    def _metadata(self) -> List[Dict[str, Any]]:
+        s = self._state
+        meta: List[Dict[str, Any]] = [
+            {'name': 'process_name', 'ph': 'M', 'pid': _SLOTS_PID, 'args': {'name': f'{s.job_name}: running'}},
+            {'name': 'process_name', 'ph': 'M', 'pid': _WAITING_PID, 'args': {'name': f'{s.job_name}: waiting'}},
+        ]
+        for pid, lanes, label in ((_SLOTS_PID, s.running, 'slot'), (_WAITING_PID, s.waiting, 'queue')):
+            for i in range(1, lanes.count + 1):
+                meta.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': i, 'args': {'name': f'{label} {i}'}})
+        return meta
+
+    def render(self) -> Dict[str, Any]:
+        return {
+            'displayTimeUnit': 'ms',
+            'traceEvents': self._metadata() + sorted(self._state.events, key=lambda e: e['ts'])
+        }
+
+    def write(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = f'{self.path}.{os.getpid()}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.render(), f)
+        os.replace(tmp, self.path)
+
+    async def on_create(self) -> None:
+        self._state = ChromeTraceExporter.ChromeTraceExporterState()
+
+    async def on_destroy(self) -> None:
+        # Spans still open belong to tasks that never reached a final state, e.g. when the job was interrupted.
+        for name in list(self._state.open.keys()):
+            self._close(name, self._state.last_ns, state='unfinished')
+        if self._state.events:
+            self.write()
+
+    async def update(self, e: SerializableExecutionEvent) -> None:
+        s = self._state
+        if e.job_name:
+            s.job_name = e.job_name
+        if s.base_ns < 0:
+            s.base_ns = e.monotonic_ns
+        s.last_ns = max(s.last_ns, e.monotonic_ns)
+        ns = e.monotonic_ns
+
+        if isinstance(e, TaskRetry):
+            s.events.append({
+                'name': 'backoff',
+                'cat': 'backoff',
+                'ph': 'X',
+                'ts': self._us(ns),
+                'dur': e.backoff_seconds * 1_000_000,
+                'pid': _WAITING_PID,
+                'tid': s.open[e.name][4] if e.name in s.open else 0,
+                'args': {'task': e.name, 'attempt': e.attempt}
+            })
+            return
+        if not isinstance(e, ExecutionStateTransition):
+            return
+
+        to_state = ExecutionState(e.to_state)
+        from_state = ExecutionState(e.from_state)
+        if to_state == ExecutionState.PENDING:
+            self._close(e.name, ns, state='failed' if from_state == ExecutionState.RUNNING else None)
+            retrying = from_state == ExecutionState.RUNNING
+            self._open(e.name, f'{e.name} (retry)' if retrying else e.name, 'pending', ns, running=False)
+        elif to_state == ExecutionState.RUNNING:
+            self._close(e.name, ns)
+            s.attempts[e.name] = s.attempts.get(e.name, 0) + 1
+            self._open(e.name, e.name, 'running', ns, running=True, attempt=s.attempts[e.name])
+        else:
+            self._close(e.name, ns, state=to_state.name.lower())
+            if from_state != ExecutionState.RUNNING and to_state != ExecutionState.COMPLETED:
+                # e.g. defaulted due to a failed dependency; never ran, so mark it on the timeline instead.
+                s.events.append({
+                    'name': f'{e.name} {to_state.name.lower()}',
+                    'cat': 'state',
+                    'ph': 'i',
+                    's': 'p',
+                    'ts': self._us(ns),
+                    'pid': _WAITING_PID,
+                    'tid': 0,
+                    'args': {'task': e.name}
+                })
@@ -2,27 +2,37 @@ from __future__ import annotations
 
 import asyncio
 import contextlib
+import functools
 import importlib
 import inspect
 import json
 import os
 import pkgutil
+import sys
 import time
 from argparse import ArgumentParser
-from dataclasses import dataclass
-from multiprocessing import Manager
-from multiprocessing.managers import DictProxy
-from typing import Any, Dict, List, Optional, Type, Union, cast
+from dataclasses import dataclass, field
+from multiprocessing import Manager, Queue
+from multiprocessing.managers import DictProxy, SyncManager
+from typing import Any, Awaitable, Coroutine, Dict, List, Optional, Set, Tuple, Type, Union, cast
 
 from pathlib import Path
 from pydantic import BaseModel, ValidationError
 
+from .artifacts import ArtifactStore
+from .batch import BatchDispatcher
 from .checkpointer import CheckpointContents, Checkpointer, NoCheckpointAvailableError
 from .checkpointer.checkpointer import _checkpointer_classes
 from .checkpointer.file import FileCheckpointer
-from .eventbus import EventBus
-from .eventbus.execution import ExecutionState, ExecutionStateMap, ExecutionStateTransition, SerializableExecutionEvent
-from .eventbus.log import SerializableLogEvent
+from .eventbus import BusWakeup, EventBus
+from .eventbus.execution import (
+    ExecutionState,
+    ExecutionStateMap,
+    ExecutionStateTransition,
+    JobInstrumentation,
+    SerializableExecutionEvent,
+)
+from .eventbus.log import SerializableLogEvent, Severity
 from .exceptions import (
     CheckpointInvalidError,
     ExtensionsDirectoryNotFoundError,
@@ -33,18 +43,37 @@ from .exceptions import (
     VarFormatError,
 )
 from .executor import Executor
+from .extensions.dispatch import ExtensionQueue
 from .extensions.extension import Extension, _extension_classes
 from .jobdefinition import (
+    BackoffPolicy,
     ConfigurationDefinition,
     ExtensionDefinition,
+    ExtensionOverflowPolicy,
     JobDefinition,
     LoadParams,
     LoggerDefinition,
+    LogOverflowPolicy,
+    OutputCapture,
+    ProfileMode,
+    SharedStateBackend,
     TaskDefinition,
     _job_definition_classes,
 )
+from .loggers.file import FileLogger
 from .loggers.logger import Logger, _logger_classes
-from .task import Task
+from .remote.coordinator import RemoteDispatcher
+from .instrumentation import (
+    EVENTS_DRAINED_PER_CYCLE,
+    EXTENSION_LAG_SECONDS,
+    PUSHER_ITERATION_SECONDS,
+    UPDATE_SECONDS,
+    SchedulerStats,
+)
+from .profiling import DEFAULT_PROFILE_DIRECTORY
+from .shareddict import SharedMemoryDict
+from .streams import StreamChannel, TaskStreams
+from .task import AsyncTask, Task
 
 __all__ = ['Flowmancer']
 
@@ -53,6 +82,48 @@ __all__ = ['Flowmancer']
 class ExecutorDetails:
     instance: Executor
     dependencies: List[str]
+    streams_from: List[str] = field(default_factory=list)
+    stream_capacity: int = 1000
+    # Overrides the job's `log_level` for this task.
+    log_level: Optional[str] = None
+    # Overrides the job's `output_capture` for this task.
+    output_capture: Optional[str] = None
+    # Whether the task may be run in a batch, should the job have `batch` configured.
+    batch: bool = True
+
+
+class _DependencyWaiter:
+    # The `await_dependencies` of a single task. Much lighter than a closure or partial per task.
+    __slots__ = ('job', 'name')
+
+    def __init__(self, job: Flowmancer, name: str) -> None:
+        self.job = job
+        self.name = name
+
+    def __call__(self) -> Coroutine[Any, Any, bool]:
+        return self.job._await_dependencies(self.name)
+
+
+async def _wait_any(*aws: Awaitable[Any], timeout: Optional[float] = None) -> None:
+    tasks = [asyncio.ensure_future(a) for a in aws]
+    try:
+        await asyncio.wait(tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for t in tasks:
+            t.cancel()
+
+
+async def _wait_for_batch(
+    signal: Union[asyncio.Event, BusWakeup], root_event: asyncio.Event, last: float, interval: float, fallback: float
+) -> None:
+    # Waits for `signal` or the end of the job. Once signalled, waits on until `interval` seconds have passed since the
+    # `last` batch, so that what arrives in a burst is handled together and `interval` bounds the added latency. A bus
+    # that fills up meanwhile is read from straight away. `fallback` is the longest to wait without being signalled.
+    await _wait_any(signal.wait(), root_event.wait(), timeout=fallback)
+    delay = last + interval - time.monotonic()
+    if delay > 0 and not root_event.is_set():
+        full = [signal.wait_full()] if isinstance(signal, BusWakeup) else []
+        await _wait_any(root_event.wait(), *full, timeout=delay)
 
 
 # Need to explicitly manage loop in case multiple instances of Flowmancer are run.
@@ -80,35 +151,78 @@ def _load_extensions_path(path: Path, package_chain: Optional[List[str]] = None)
         package_chain = [path.name]
 
     for x in pkgutil.iter_modules(path=[path_str]):
-        try:
-            print(f"Loading Module: {'.'.join(package_chain+[x.name])}")
-            importlib.import_module('.'.join(package_chain+[x.name]))
-        except Exception as e:
-            raise ModuleLoadError(f"Error loading '{'.'.join(package_chain+[x.name])}': {e}")
+        module_name = '.'.join(package_chain+[x.name])
+        # Long-running hosts (e.g. the daemon) load the same paths for every job; those already imported are left be.
+        if module_name not in sys.modules:
+            try:
+                print(f"Loading Module: {module_name}")
+                importlib.import_module(module_name)
+            except Exception as e:
+                raise ModuleLoadError(f"Error loading '{module_name}': {e}")
         if x.ispkg:
             _load_extensions_path(path / x.name, package_chain+[x.name])
 
 
+def _load_extension_modules(directories: List[str], packages: List[str]) -> None:
+    # Recursively import any modules found in the following paths in order to trigger the registration of any
+    # decorated classes.
+    for p in ['./tasks', './extensions', './loggers']:
+        try:
+            _load_extensions_path(Path(p))
+        except ExtensionsDirectoryNotFoundError:
+            # Don't error on the absence of dirs that are searched by default.
+            pass
+
+    # Allow for missing dir exceptions for passed-in paths.
+    for p in directories:
+        _load_extensions_path(Path(p))
+
+    for p in packages:
+        importlib.import_module(p)
+
+
 class Flowmancer:
-    def __init__(self, *, test: bool = False, debug: bool = False) -> None:
-        manager = Manager()
+    def __init__(
+        self,
+        *,
+        test: bool = False,
+        debug: bool = False,
+        manager: Optional[SyncManager] = None,
+        shared_semaphore: Optional[asyncio.Semaphore] = None
+    ) -> None:
+        # A long-running host (such as the daemon) may share one `Manager` and one concurrency budget across jobs.
+        # Otherwise, the `Manager` server process is only started once a job is known to need one.
+        self._manager = manager
+        self._shared_semaphore = shared_semaphore
         self._config: ConfigurationDefinition = ConfigurationDefinition()
         self._test = test
         self._debug = debug
-        self._log_event_bus = EventBus[SerializableLogEvent](self._config.name, manager.Queue())
+        self._log_event_bus = EventBus[SerializableLogEvent](self._config.name)
         self._execution_event_bus = EventBus[SerializableExecutionEvent](self._config.name)
-        self._shared_dict: DictProxy[str, Any] = manager.dict()
+        self._shared_dict: Union[Dict[str, Any], DictProxy[str, Any], SharedMemoryDict] = dict()
         self._executors: Dict[str, ExecutorDetails] = dict()
         self._states = ExecutionStateMap()
         self._registered_extensions: Dict[str, Extension] = dict()
+        self._extension_queue_settings: Dict[str, Tuple[int, str]] = dict()
+        self._extension_queues: Dict[str, ExtensionQueue] = dict()
         self._registered_loggers: Dict[str, Logger] = dict()
         self._checkpointer_instance: Checkpointer = FileCheckpointer()
         self._checkpointer_interval_seconds = 10.0
+        self._instrumentation_interval_seconds = 5.0
+        self._checkpoint_write_seconds: List[float] = []
+        self._stats = SchedulerStats()
         self._extensions_interval_seconds = 0.25
         self._loggers_interval_seconds = 0.25
-        self._synchro_interval_seconds = 0.25
+        self._synchro_interval_seconds = 5.0
         self._is_restart = False
         self._jobdef_vars: Dict[str, str] = dict()
+        self._artifact_store: Optional[ArtifactStore] = None
+        self._artifacts_collected: Set[str] = set()
+        self._artifact_downstream: Optional[Dict[str, Set[str]]] = None
+        # Set once loggers have drained the log bus for the last time, which may still forward execution events.
+        self._logs_flushed: Optional[asyncio.Event] = None
+        # Set by the job every time it has taken in state changes, one for each loop that acts on them.
+        self._state_watchers: List[asyncio.Event] = []
 
     def set_jobdef_var(self, key: str, value: str) -> None:
         if not isinstance(key, str):
@@ -170,21 +284,58 @@ class Flowmancer:
                     err.add_error(f'tasks.{n}.parameters.{".".join(ve["loc"])}', ve['msg'])
             except Exception as e:
                 err.add_error(f'tasks.{n}', repr(e))
+            for src in ex.streams_from:
+                if src not in self._executors or src == n:
+                    err.add_error(f'tasks.{n}.streams_from', f"Unknown task '{src}'.")
+                # Records already streamed cannot be replayed, so neither end of a stream may be retried.
+                elif ex.instance.max_attempts > 1 or self._executors[src].instance.max_attempts > 1:
+                    err.add_error(f'tasks.{n}.streams_from', f"Both '{src}' and '{n}' must have `max_attempts` of 1.")
+            if ex.streams_from and ex.stream_capacity < 1:
+                err.add_error(f'tasks.{n}.stream_capacity', 'Must be at least 1.')
+            if ex.streams_from and self._config.remote is not None:
+                err.add_error(f'tasks.{n}.streams_from', 'Streaming is not supported with remote workers.')
         if err.errors:
             raise err
 
     async def _initiate(self) -> int:
         with _create_loop():
-            root_event = asyncio.Event()
-            if self._config.max_concurrency > 0:
-                semaphore = asyncio.Semaphore(self._config.max_concurrency)
-                for i in self._executors.values():
-                    i.instance.semaphore = semaphore
+            return await self._run()
+
+    # Runs the job on the current event loop. Unlike `_initiate`, this may be awaited alongside other jobs.
+    async def _run(self) -> int:
+        root_event = asyncio.Event()
+        self._logs_flushed = asyncio.Event()
+        self._state_watchers = []
+        if self._config.max_concurrency > 0:
+            semaphore = asyncio.Semaphore(self._config.max_concurrency)
+            for i in self._executors.values():
+                i.instance.semaphore = semaphore
+        for i in self._executors.values():
+            i.instance.shared_semaphore = self._shared_semaphore
+            i.instance.min_severity = Severity(i.log_level or self._config.log_level)
+            i.instance.output_capture = OutputCapture(i.output_capture or self._config.output_capture).value
+        self._init_artifacts()
+        self._init_streams()
+        self._init_profiling()
+        self._init_shared_state()
+        dispatcher: Optional[Union[RemoteDispatcher, BatchDispatcher]] = None
+        try:
+            dispatcher = await self._init_dispatcher()
             observer_tasks = self._init_extensions(root_event)
             executor_tasks = self._init_executors(root_event)
             logger_tasks = self._init_loggers(root_event)
             checkpoint_task = self._init_checkpointer(root_event)
-            await asyncio.gather(*observer_tasks, *executor_tasks, *logger_tasks, checkpoint_task)
+            instrumentation_tasks = self._init_instrumentation(root_event)
+            await asyncio.gather(
+                *observer_tasks, *executor_tasks, *logger_tasks, checkpoint_task, *instrumentation_tasks
+            )
+        finally:
+            if dispatcher is not None:
+                await dispatcher.stop()
+            self._release_shared_state()
+            self._release_artifacts()
+            if self._debug:
+                print(f'Scheduler summary for {self._config.name}:\n{self._stats.summary()}')
         return len(self._states[ExecutionState.FAILED]) + len(self._states[ExecutionState.DEFAULTED])
 
     def _validate_checkpoint(self, checkpoint: CheckpointContents) -> None:
@@ -225,6 +376,7 @@ class Flowmancer:
         parser.add_argument('--run-from', action='store', dest='run_from')
         parser.add_argument('--max-concurrency', action='store', type=int, dest='max_concurrency')
         parser.add_argument('--var', action='append', dest='jobdef_vars', default=[])
+        parser.add_argument('--profile', action='append', dest='profile', default=[])
 
         args = parser.parse_args()
         self._debug = args.debug
@@ -241,31 +393,7 @@ class Flowmancer:
 
         if args.restart:
             try:
-                cp = asyncio.run(self._checkpointer_instance.read_checkpoint(self._config.name))
-                self._validate_checkpoint(cp)
-                self._shared_dict.update(cp.shared_dict)
-                esm = ExecutionStateMap.from_simple_dict(cp.states)
-                for name in esm[ExecutionState.FAILED]:
-                    self._executors[name].instance.is_restart = True
-                completed = esm[ExecutionState.COMPLETED].copy()
-                esm[ExecutionState.INIT].update(esm[ExecutionState.FAILED])
-                esm[ExecutionState.INIT].update(esm[ExecutionState.ABORTED])
-                esm[ExecutionState.INIT].update(esm[ExecutionState.RUNNING])
-                esm[ExecutionState.INIT].update(esm[ExecutionState.PENDING])
-                esm[ExecutionState.INIT].update(esm[ExecutionState.DEFAULTED])
-                esm[ExecutionState.INIT].update(esm[ExecutionState.COMPLETED])
-                esm[ExecutionState.FAILED].clear()
-                esm[ExecutionState.ABORTED].clear()
-                esm[ExecutionState.RUNNING].clear()
-                esm[ExecutionState.PENDING].clear()
-                esm[ExecutionState.DEFAULTED].clear()
-                esm[ExecutionState.COMPLETED].clear()
-                self._states = esm
-                self._is_restart = True
-                # Even though completed and don't require to be executed again, these tasks still need to trigger
-                # state change from INIT -> COMPLETED for components watching the Execution Event Bus.
-                for n in completed:
-                    self._executors[n].instance.state = ExecutionState.COMPLETED
+                self._restore_checkpoint(asyncio.run(self._checkpointer_instance.read_checkpoint(self._config.name)))
             except NoCheckpointAvailableError:
                 self._is_restart = False
                 print(f"No checkpoint file found for '{self._config.name}'. Starting new job.")
@@ -273,6 +401,46 @@ class Flowmancer:
         # These override settings from JobsDefinition, if also defined there.
         if args.max_concurrency is not None:
             self._config.max_concurrency = args.max_concurrency
+        for name in args.profile:
+            self.enable_profiling(name)
+
+    def enable_profiling(self, name: str, modes: Optional[List[str]] = None) -> None:
+        if name not in self._executors:
+            raise ValueError(f"Cannot profile unknown task '{name}'.")
+        self._executors[name].instance.profile = list(modes or [m.value for m in ProfileMode])
+
+    def _restore_checkpoint(self, cp: CheckpointContents) -> None:
+        self._validate_checkpoint(cp)
+        self._shared_dict.update(cp.shared_dict)
+        esm = ExecutionStateMap.from_simple_dict(cp.states)
+        for name in esm[ExecutionState.FAILED]:
+            self._executors[name].instance.is_restart = True
+        completed = esm[ExecutionState.COMPLETED].copy()
+        # A task that will run again can only do so alongside the sources it streams from, so run those again too.
+        rerun = [n for n in self._executors if n not in completed]
+        while rerun:
+            for src in self._executors[rerun.pop()].streams_from:
+                if src in completed:
+                    completed.discard(src)
+                    rerun.append(src)
+        esm[ExecutionState.INIT].update(esm[ExecutionState.FAILED])
+        esm[ExecutionState.INIT].update(esm[ExecutionState.ABORTED])
+        esm[ExecutionState.INIT].update(esm[ExecutionState.RUNNING])
+        esm[ExecutionState.INIT].update(esm[ExecutionState.PENDING])
+        esm[ExecutionState.INIT].update(esm[ExecutionState.DEFAULTED])
+        esm[ExecutionState.INIT].update(esm[ExecutionState.COMPLETED])
+        esm[ExecutionState.FAILED].clear()
+        esm[ExecutionState.ABORTED].clear()
+        esm[ExecutionState.RUNNING].clear()
+        esm[ExecutionState.PENDING].clear()
+        esm[ExecutionState.DEFAULTED].clear()
+        esm[ExecutionState.COMPLETED].clear()
+        self._states = esm
+        self._is_restart = True
+        # Even though completed and don't require to be executed again, these tasks still need to trigger
+        # state change from INIT -> COMPLETED for components watching the Execution Event Bus.
+        for n in completed:
+            self._executors[n].instance.state = ExecutionState.COMPLETED
 
     def _is_failed(self) -> bool:
         return bool(
@@ -281,9 +449,177 @@ class Flowmancer:
             or self._states[ExecutionState.ABORTED]
         )
 
+    def _get_manager(self) -> SyncManager:
+        if self._manager is None:
+            self._manager = Manager()
+        return self._manager
+
+    def _runs_processes(self) -> bool:
+        # Whether any task left to run does so in a child process, on its own or in a batch, rather than on the loop.
+        init = self._states[ExecutionState.INIT]
+        return any(
+            not issubclass(dtl.instance.get_task_class(), AsyncTask)
+            for name, dtl in self._executors.items() if name in init
+        )
+
+    def _init_shared_state(self) -> None:
+        # Until now, the log bus and `shared_dict` are plain in-process objects. Only once the job is about to run
+        # local child processes do they need to be swapped for ones that can be shared across processes. Jobs made up
+        # of tasks run on the loop (e.g. commands and sensors), restarts with nothing left to run and remote dispatch,
+        # which relays everything back to this process, need neither.
+        if self._config.remote is not None or not self._runs_processes():
+            return
+        # Bounded, so that a task logging faster than the loggers keep up cannot run the host out of memory.
+        size = max(0, self._config.log_bus_size)
+        self._log_event_bus.overflow = LogOverflowPolicy(self._config.log_overflow).value
+        self._log_event_bus.sample_every = self._config.log_sample_every
+        if self._config.shared_state == SharedStateBackend.MANAGER:
+            manager = self._get_manager()
+            self._log_event_bus.replace_queue(manager.Queue(size), size)
+            self._shared_dict = manager.dict(self._shared_dict)
+        elif self._config.shared_state == SharedStateBackend.SHARED_MEMORY:
+            self._log_event_bus.replace_queue(cast(Any, Queue(size)), size)
+            self._shared_dict = SharedMemoryDict.create(
+                int(self._config.shared_memory_size_mb * 1024 * 1024), initial=dict(self._shared_dict)
+            )
+        else:
+            # Each task receives its own private copy of `shared_dict` and any changes it makes are discarded.
+            self._log_event_bus.replace_queue(cast(Any, Queue(size)), size)
+        for ex in self._executors.values():
+            ex.instance.shared_dict = cast(Dict[str, Any], self._shared_dict)
+
+    def _release_shared_state(self) -> None:
+        if isinstance(self._shared_dict, SharedMemoryDict):
+            # Keep the final contents readable once the segment itself is gone.
+            shm = self._shared_dict
+            self._shared_dict = shm.copy()
+            shm.close()
+            shm.unlink()
+
+    def _init_streams(self) -> None:
+        # Channels are created for every run, since a stream cannot be replayed.
+        for dtl in self._executors.values():
+            dtl.instance.streams = None
+            dtl.instance.uses_slot = True
+        for name, dtl in self._executors.items():
+            # On restart, a task that already completed does not read its sources again.
+            if name not in self._states[ExecutionState.INIT]:
+                continue
+            for src in dtl.streams_from:
+                channel = StreamChannel(dtl.stream_capacity)
+                producer = self._executors[src].instance
+                producer.streams = producer.streams or TaskStreams()
+                producer.streams.outputs[name] = channel
+                dtl.instance.streams = dtl.instance.streams or TaskStreams()
+                dtl.instance.streams.inputs[src] = channel
+                dtl.instance.uses_slot = False
+
+    def _init_profiling(self) -> None:
+        # Profiles are written next to the task logs when they are written to files.
+        directory = os.path.join(DEFAULT_PROFILE_DIRECTORY, self._config.name)
+        if not self._test:
+            for log in self._registered_loggers.values():
+                if isinstance(log, FileLogger):
+                    directory = log.log_dir
+                    break
+        for ex in self._executors.values():
+            ex.instance.profile_directory = os.path.abspath(directory)
+
+    def _init_artifacts(self) -> None:
+        # Artifacts of a failed run are kept so that a restart can pick up where it left off; a new run starts clean.
+        self._artifact_store = ArtifactStore(
+            os.path.abspath(os.path.join(self._config.artifact_directory, self._config.name)), self._config.name
+        )
+        self._artifacts_collected = set()
+        self._artifact_downstream = None
+        if not self._is_restart:
+            self._artifact_store.clear()
+        for ex in self._executors.values():
+            ex.instance.artifact_directory = self._artifact_store.directory
+
+    def _release_artifacts(self) -> None:
+        if self._artifact_store is not None and not self._is_failed():
+            self._artifact_store.clear()
+
+    def _downstream_map(self) -> Dict[str, Set[str]]:
+        # All tasks that directly or transitively depend on each task.
+        children: Dict[str, Set[str]] = {n: set() for n in self._executors}
+        for n, dtl in self._executors.items():
+            for dep in dtl.dependencies:
+                children[dep].add(n)
+        # Visit tasks in dependency order, then fold descendants up from the leaves.
+        order: List[str] = []
+        remaining = {n: len(set(dtl.dependencies)) for n, dtl in self._executors.items()}
+        ready = [n for n, c in remaining.items() if c == 0]
+        while ready:
+            n = ready.pop()
+            order.append(n)
+            for c in children[n]:
+                remaining[c] -= 1
+                if remaining[c] == 0:
+                    ready.append(c)
+        downstream: Dict[str, Set[str]] = {n: set() for n in self._executors}
+        for n in reversed(order):
+            for c in children[n]:
+                downstream[n].add(c)
+                downstream[n].update(downstream[c])
+        return downstream
+
+    def _collect_artifacts(self, completed: str) -> None:
+        # Most jobs never produce an artifact, in which case the directory is never created.
+        if self._artifact_store is None or not os.path.isdir(self._artifact_store.directory):
+            return
+        if self._artifact_downstream is None:
+            self._artifact_downstream = self._downstream_map()
+        done = self._states[ExecutionState.COMPLETED]
+        # The completed task itself, or any task upstream of it, may no longer have anyone left needing its artifacts.
+        for producer, downstream in self._artifact_downstream.items():
+            if producer in self._artifacts_collected or producer not in done:
+                continue
+            if (producer == completed or completed in downstream) and all(d in done for d in downstream):
+                self._artifact_store.delete_produced_by(producer)
+                self._artifacts_collected.add(producer)
+
     # ASYNC INITIALIZATIONS
+    async def _init_dispatcher(self) -> Optional[Union[RemoteDispatcher, BatchDispatcher]]:
+        for ex in self._executors.values():
+            ex.instance.dispatcher = None
+        if self._config.remote is None:
+            return self._init_batches()
+        dispatcher = RemoteDispatcher(
+            host=self._config.remote.host,
+            port=self._config.remote.port,
+            token=self._config.remote.token,
+            heartbeat_interval_seconds=self._config.remote.heartbeat_interval_seconds,
+            heartbeat_timeout_seconds=self._config.remote.heartbeat_timeout_seconds,
+            worker_wait_timeout_seconds=self._config.remote.worker_wait_timeout_seconds,
+            extension_directories=self._config.extension_directories,
+            extension_packages=self._config.extension_packages
+        )
+        await dispatcher.start()
+        for ex in self._executors.values():
+            ex.instance.dispatcher = dispatcher
+        return dispatcher
+
+    def _init_batches(self) -> Optional[BatchDispatcher]:
+        if self._config.batch is None:
+            return None
+        dispatcher = BatchDispatcher(self._config.batch.max_size, self._config.batch.max_wait_seconds)
+        for dtl in self._executors.values():
+            e = dtl.instance
+            # Tasks that run on the loop, stream records, or may have to be killed along with their process group each
+            # need a process of their own, if any.
+            if (
+                not dtl.batch or e.streams is not None or e.timeout_seconds is not None
+                or issubclass(e.get_task_class(), AsyncTask)
+            ):
+                continue
+            e.dispatcher = dispatcher
+        return dispatcher
+
     def _init_checkpointer(self, root_event) -> asyncio.Task:
         async def _write_checkpoint() -> None:
+            started = time.perf_counter()
             await self._checkpointer_instance.write_checkpoint(
                 self._config.name,
                 CheckpointContents(
@@ -292,18 +628,28 @@ class Flowmancer:
                     shared_dict=self._shared_dict.copy()
                 )
             )
+            self._checkpoint_write_seconds.append(time.perf_counter() - started)
 
         async def _pusher() -> None:
-            last_write = 0
+            # Checkpoints are only written once states have changed, and at most every `checkpointer_interval_seconds`.
+            changed = self._watch_states()
+            last_write = 0.0
             await self._checkpointer_instance.on_create()
             if self._is_restart:
                 await self._checkpointer_instance.on_restart()
             while True:
+                await _wait_for_batch(
+                    changed, root_event, last_write, self._checkpointer_interval_seconds, self._synchro_interval_seconds
+                )
                 if root_event.is_set():
                     break
-                if (time.time() - last_write) >= self._checkpointer_interval_seconds:
-                    await _write_checkpoint()
-                await asyncio.sleep(self._synchro_interval_seconds)
+                if not changed.is_set():
+                    continue
+                changed.clear()
+                last_write = time.monotonic()
+                started = time.perf_counter()
+                await _write_checkpoint()
+                self._stats.record(PUSHER_ITERATION_SECONDS, 'checkpointer', time.perf_counter() - started)
 
             if self._is_failed():
                 await _write_checkpoint()
@@ -315,9 +661,56 @@ class Flowmancer:
 
         return asyncio.create_task(_pusher())
 
+    def _watch_states(self) -> asyncio.Event:
+        e = asyncio.Event()
+        self._state_watchers.append(e)
+        return e
+
+    def _init_instrumentation(self, root_event: asyncio.Event) -> List[asyncio.Task]:
+        if self._instrumentation_interval_seconds <= 0:
+            return []
+
+        async def _monitor() -> None:
+            loop = asyncio.get_running_loop()
+            # Lag is sampled much more often than it is published, so that short stalls are not missed.
+            sample_interval = min(0.1, self._instrumentation_interval_seconds)
+            lags: List[float] = []
+            last_dropped: Dict[str, int] = dict()
+            window_start = loop.time()
+            while not root_event.is_set():
+                expected = loop.time() + sample_interval
+                await asyncio.sleep(sample_interval)
+                lags.append(max(0.0, loop.time() - expected))
+                if root_event.is_set() or (loop.time() - window_start) < self._instrumentation_interval_seconds:
+                    continue
+                window = self._stats.take_window()
+                dropped = {n: q.dropped for n, q in self._extension_queues.items()}
+                self._execution_event_bus.put(JobInstrumentation(
+                    loop_lag_seconds_max=max(lags),
+                    loop_lag_seconds_mean=sum(lags) / len(lags),
+                    log_bus_depth=self._log_event_bus.qsize(),
+                    execution_bus_depth=self._execution_event_bus.qsize(),
+                    checkpoint_write_seconds=self._checkpoint_write_seconds,
+                    pusher_iteration_seconds=window.get(PUSHER_ITERATION_SECONDS, dict()),
+                    events_drained_per_cycle=window.get(EVENTS_DRAINED_PER_CYCLE, dict()),
+                    update_seconds=window.get(UPDATE_SECONDS, dict()),
+                    extension_lag_seconds=window.get(EXTENSION_LAG_SECONDS, dict()),
+                    extension_queue_depth={n: len(q) for n, q in self._extension_queues.items()},
+                    extension_events_dropped={n: v - last_dropped.get(n, 0) for n, v in dropped.items()}
+                ))
+                last_dropped = dropped
+                self._checkpoint_write_seconds = []
+                lags = []
+                window_start = loop.time()
+
+        return [asyncio.create_task(_monitor())]
+
     def _init_executors(self, root_event: asyncio.Event) -> List[asyncio.Task]:
+        changed = self._watch_states()
+
         async def _synchro() -> None:
             while not root_event.is_set():
+                changed.clear()
                 if (
                     not self._states[ExecutionState.INIT]
                     and not self._states[ExecutionState.PENDING]
@@ -325,26 +718,84 @@ class Flowmancer:
                 ):
                     root_event.set()
                 else:
-                    await asyncio.sleep(self._synchro_interval_seconds)
+                    await _wait_any(changed.wait(), root_event.wait(), timeout=self._synchro_interval_seconds)
+
+        # Tasks are only started once everything they depend on has finished, so that a job only ever holds coroutines
+        # for the tasks that are ready to go rather than for every task it has.
+        async def _schedule() -> None:
+            init = self._states[ExecutionState.INIT]
+            waiting: Dict[str, int] = dict()
+            dependents: Dict[str, List[str]] = dict()
+            running: Set[asyncio.Task] = set()
+            stopping = False
+
+            def _launch(name: str) -> None:
+                t = asyncio.create_task(self._executors[name].instance.start())
+                running.add(t)
+                t.add_done_callback(functools.partial(_finished, name))
+
+            def _finished(name: str, t: asyncio.Task) -> None:
+                running.discard(t)
+                if stopping:
+                    return
+                for d in dependents.pop(name, []):
+                    waiting[d] -= 1
+                    if not waiting[d]:
+                        del waiting[d]
+                        _launch(d)
+
+            ready = []
+            for name, dtl in self._executors.items():
+                dtl.instance.init_event()
+                if name not in init:
+                    continue
+                # Dependencies that are not about to run have already finished, e.g. when restarting a job.
+                unfinished = [dep for dep in set(dtl.dependencies) if dep in init]
+                for dep in unfinished:
+                    dependents.setdefault(dep, []).append(name)
+                if unfinished:
+                    waiting[name] = len(unfinished)
+                    # Outstanding all the same, as far as anything counting the job's tasks by state is concerned.
+                    dtl.instance.state = ExecutionState.PENDING
+                else:
+                    ready.append(name)
 
-        for ex in self._executors.values():
-            ex.instance.init_event()
+            try:
+                for name in ready:
+                    _launch(name)
+                await root_event.wait()
+                await asyncio.gather(*running)
+            except asyncio.CancelledError:
+                stopping = True
+                for t in running:
+                    t.cancel()
+                await asyncio.gather(*running, return_exceptions=True)
+                # Tasks never started are aborted too, as though they had been cut off waiting on their dependencies.
+                for name in waiting:
+                    self._executors[name].instance.state = ExecutionState.ABORTED
+                raise
 
-        return [asyncio.create_task(_synchro())] + [
-            asyncio.create_task(dtl.instance.start())
-            for name, dtl in self._executors.items()
-            if name in self._states[ExecutionState.INIT]
-        ]
+        return [asyncio.create_task(_synchro()), asyncio.create_task(_schedule())]
 
     def _init_loggers(self, root_event: asyncio.Event) -> List[asyncio.Task]:
         if self._test:
             self._registered_loggers = dict()
 
         async def _write_logs() -> None:
+            drained = 0
             while not self._log_event_bus.empty():
                 m = self._log_event_bus.get()
-                for log in self._registered_loggers.values():
+                drained += 1
+                # Task processes publish their execution events (e.g. profiles) through the log bus, as it is the only
+                # bus shared with them.
+                if isinstance(m, SerializableExecutionEvent):
+                    self._execution_event_bus.put(m)
+                    continue
+                for n, log in self._registered_loggers.items():
+                    started = time.perf_counter()
                     await log.update(m)
+                    self._stats.record(UPDATE_SECONDS, f'logger:{n}', time.perf_counter() - started)
+            self._stats.record(EVENTS_DRAINED_PER_CYCLE, 'log', drained)
 
         async def _pusher() -> None:
             for log in self._registered_loggers.values():
@@ -352,15 +803,32 @@ class Flowmancer:
                 if self._is_restart:
                     await log.on_restart()
 
-            last_trigger = 0
-            while True:
-                if root_event.is_set():
-                    break
-                if (time.time() - last_trigger) >= self._loggers_interval_seconds:
+            wakeup = self._log_event_bus.listen()
+            last = 0.0
+            try:
+                while True:
+                    await _wait_for_batch(
+                        wakeup, root_event, last, self._loggers_interval_seconds, self._synchro_interval_seconds
+                    )
+                    if root_event.is_set():
+                        break
+                    wakeup.clear()
+                    last = time.monotonic()
+                    started = time.perf_counter()
                     await _write_logs()
-                await asyncio.sleep(self._synchro_interval_seconds)
+                    self._stats.record(PUSHER_ITERATION_SECONDS, 'loggers', time.perf_counter() - started)
+                # Keep reading while the relay catches up, as it may be waiting for room.
+                stopped = asyncio.get_running_loop().run_in_executor(None, self._log_event_bus.stop_listening)
+                while not stopped.done():
+                    await _write_logs()
+                    await _wait_any(asyncio.shield(stopped), timeout=0.05)
+                await stopped
+            finally:
+                self._log_event_bus.stop_listening(wait=False)
 
             await _write_logs()
+            if self._logs_flushed is not None:
+                self._logs_flushed.set()
             for log in self._registered_loggers.values():
                 if self._is_failed():
                     await log.on_failure()
@@ -374,38 +842,77 @@ class Flowmancer:
         if self._test:
             self._registered_extensions = dict()
 
+        # The job's own bookkeeping is done as each event is taken off the bus. Extensions are only handed the event
+        # afterwards, through a queue of their own, so that they never hold up the job or each other.
         async def _emit() -> None:
+            drained = 0
             while not self._execution_event_bus.empty():
                 e = self._execution_event_bus.get()
+                drained += 1
                 if self._debug:
                     print(e)
                 if isinstance(e, ExecutionStateTransition):
-                    self._states[e.to_state].add(e.name)
-                    self._states[e.from_state].remove(e.name)
-                for obs in self._registered_extensions.values():
-                    await obs.update(e)
-
-        async def _pusher() -> None:
-            for obs in self._registered_extensions.values():
-                await obs.on_create()
-                if self._is_restart:
-                    await obs.on_restart()
-
-            last_trigger = 0
+                    self._states.transition(e.name, e.to_state)
+                    for w in self._state_watchers:
+                        w.set()
+                    if e.to_state == ExecutionState.COMPLETED:
+                        self._collect_artifacts(e.name)
+                for q in self._extension_queues.values():
+                    q.offer(e)
+            self._stats.record(EVENTS_DRAINED_PER_CYCLE, 'execution', drained)
+
+        async def _consume(n: str, obs: Extension, q: ExtensionQueue) -> None:
+            await obs.on_create()
+            if self._is_restart:
+                await obs.on_restart()
             while True:
-                if root_event.is_set():
+                item = await q.get()
+                if item is None:
                     break
-                if (time.time() - last_trigger) >= self._extensions_interval_seconds:
+                e, queued = item
+                started = time.perf_counter()
+                self._stats.record(EXTENSION_LAG_SECONDS, n, started - queued)
+                await obs.update(e)
+                self._stats.record(UPDATE_SECONDS, f'extension:{n}', time.perf_counter() - started)
+            if self._is_failed():
+                await obs.on_failure()
+            else:
+                await obs.on_success()
+            await obs.on_destroy()
+
+        async def _pusher() -> None:
+            self._extension_queues = {
+                n: ExtensionQueue(*self._extension_queue_settings.get(n, (10000, ExtensionOverflowPolicy.BLOCK.value)))
+                for n in self._registered_extensions.keys()
+            }
+            consumers = [
+                asyncio.create_task(_consume(n, obs, self._extension_queues[n]))
+                for n, obs in self._registered_extensions.items()
+            ]
+
+            wakeup = self._execution_event_bus.listen()
+            last = 0.0
+            try:
+                while True:
+                    await _wait_for_batch(
+                        wakeup, root_event, last, self._extensions_interval_seconds, self._synchro_interval_seconds
+                    )
+                    if root_event.is_set():
+                        break
+                    wakeup.clear()
+                    last = time.monotonic()
+                    started = time.perf_counter()
                     await _emit()
-                await asyncio.sleep(self._synchro_interval_seconds)
+                    self._stats.record(PUSHER_ITERATION_SECONDS, 'extensions', time.perf_counter() - started)
+            finally:
+                self._execution_event_bus.stop_listening()
 
+            if self._logs_flushed is not None:
+                await self._logs_flushed.wait()
             await _emit()
-            for obs in self._registered_extensions.values():
-                if self._is_failed():
-                    await obs.on_failure()
-                else:
-                    await obs.on_success()
-                await obs.on_destroy()
+            for q in self._extension_queues.values():
+                q.close()
+            await asyncio.gather(*consumers)
 
         return [asyncio.create_task(_pusher())]
 
@@ -421,37 +928,63 @@ class Flowmancer:
                     return False
         return True
 
+    async def _await_dependencies(self, name: str) -> bool:
+        for dep_name in self._executors[name].dependencies:
+            d = self._executors[dep_name].instance
+            await d.wait()
+            if d.state in (ExecutionState.FAILED, ExecutionState.DEFAULTED, ExecutionState.ABORTED):
+                return False
+        # Streaming sources need only have started. Should one fail later on, its stream reports the failure.
+        for src_name in self._executors[name].streams_from:
+            d = self._executors[src_name].instance
+            await d.wait_started()
+            if d.state in (ExecutionState.FAILED, ExecutionState.DEFAULTED, ExecutionState.ABORTED):
+                return False
+        return True
+
     def add_executor(
         self,
         name: str,
         task_class: Union[str, Type[Task]],
         deps: Optional[List[str]] = None,
         max_attempts: int = 1,
-        backoff: int = 0,
-        parameters: Dict[str, Any] = dict()
+        backoff: float = 0,
+        parameters: Dict[str, Any] = dict(),
+        streams_from: Optional[List[str]] = None,
+        stream_capacity: int = 1000,
+        profile: Optional[List[str]] = None,
+        log_level: Optional[str] = None,
+        output_capture: Optional[str] = None,
+        timeout_seconds: Optional[float] = None,
+        kill_grace_seconds: float = 5.0,
+        backoff_policy: str = 'fixed',
+        max_backoff_seconds: Optional[float] = None,
+        retry_on: Optional[List[Union[int, str]]] = None,
+        batch: bool = True
     ) -> None:
-        async def await_dependencies() -> bool:
-            for dep_name in self._executors[name].dependencies:
-                d = self._executors[dep_name].instance
-                await d.wait()
-                if d.state in (ExecutionState.FAILED, ExecutionState.DEFAULTED, ExecutionState.ABORTED):
-                    return False
-            return True
-
         e = Executor(
             name=name,
             task_class=task_class,
             log_event_bus=self._log_event_bus,
             execution_event_bus=self._execution_event_bus,
-            shared_dict=self._shared_dict,
-            await_dependencies=await_dependencies,
+            shared_dict=cast(Dict[str, Any], self._shared_dict),
+            await_dependencies=_DependencyWaiter(self, name),
             max_attempts=max_attempts,
             backoff=backoff,
             parameters=parameters,
             depends_on=deps
         )
-
-        self._executors[name] = ExecutorDetails(instance=e, dependencies=(deps or []))
+        e.profile = list(profile or [])
+        e.timeout_seconds = timeout_seconds
+        e.kill_grace_seconds = kill_grace_seconds
+        e.backoff_policy = BackoffPolicy(backoff_policy).value
+        e.max_backoff_seconds = max_backoff_seconds
+        e.retry_on = list(retry_on or [])
+
+        self._executors[name] = ExecutorDetails(
+            instance=e, dependencies=(deps or []), streams_from=(streams_from or []), stream_capacity=stream_capacity,
+            log_level=log_level, output_capture=output_capture, batch=batch
+        )
         self._states[ExecutionState.INIT].add(name)
 
     def load_job_definition(
@@ -473,25 +1006,12 @@ class Flowmancer:
         self._loggers_interval_seconds = jobdef.config.loggers_interval_seconds
         self._extensions_interval_seconds = jobdef.config.extensions_interval_seconds
         self._checkpointer_interval_seconds = jobdef.config.checkpointer_interval_seconds
+        self._instrumentation_interval_seconds = jobdef.config.instrumentation_interval_seconds
 
         self._log_event_bus.job_name = self._config.name
         self._execution_event_bus.job_name = self._config.name
 
-        # Recursively import any modules found in the following paths in order to trigger the registration of any
-        # decorated classes.
-        for p in ['./tasks', './extensions', './loggers']:
-            try:
-                _load_extensions_path(Path(p))
-            except ExtensionsDirectoryNotFoundError:
-                # Don't error on the absence of dirs that are searched by default.
-                pass
-
-        # Allow for missing dir exceptions for passed-in paths.
-        for p in jobdef.config.extension_directories:
-            _load_extensions_path(Path(p))
-
-        for p in jobdef.config.extension_packages:
-            importlib.import_module(p)
+        _load_extension_modules(jobdef.config.extension_directories, jobdef.config.extension_packages)
 
         # Tasks
         for n, t in jobdef.tasks.items():
@@ -501,7 +1021,18 @@ class Flowmancer:
                 deps=t.depends_on,
                 max_attempts=t.max_attempts,
                 backoff=t.backoff,
-                parameters=t.parameters
+                parameters=t.parameters,
+                streams_from=t.streams_from,
+                stream_capacity=t.stream_capacity,
+                profile=[ProfileMode(p).value for p in t.profile],
+                log_level=t.log_level,
+                output_capture=t.output_capture,
+                timeout_seconds=t.timeout_seconds,
+                kill_grace_seconds=t.kill_grace_seconds,
+                backoff_policy=t.backoff_policy,
+                max_backoff_seconds=t.max_backoff_seconds,
+                retry_on=t.retry_on,
+                batch=t.batch
             )
 
         # Checkpointer
@@ -512,6 +1043,7 @@ class Flowmancer:
         # Observers
         for n, e in jobdef.extensions.items():
             self._registered_extensions[n] = _extension_classes[e.variant](**e.parameters)
+            self._extension_queue_settings[n] = (e.queue_size, ExtensionOverflowPolicy(e.overflow).value)
 
         # Loggers
         for n, detl in jobdef.loggers.items():
@@ -531,9 +1063,12 @@ class Flowmancer:
             )
 
         for n, e in self._registered_extensions.items():
+            queue_size, overflow = self._extension_queue_settings.get(n, (10000, ExtensionOverflowPolicy.BLOCK.value))
             j.extensions[n] = ExtensionDefinition(
                 extension=type(e).__name__,
-                parameters=cast(BaseModel, e).model_dump()
+                parameters=cast(BaseModel, e).model_dump(),
+                queue_size=queue_size,
+                overflow=ExtensionOverflowPolicy(overflow)
             )
 
         for n, variant in self._registered_loggers.items():
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+from typing import Dict, List
+
+from .eventbus.execution import SampleSummary
+
+PUSHER_ITERATION_SECONDS = 'pusher_iteration_seconds'
+EVENTS_DRAINED_PER_CYCLE = 'events_drained_per_cycle'
+UPDATE_SECONDS = 'update_seconds'
+EXTENSION_LAG_SECONDS = 'extension_lag_seconds'
+
+
+class _Samples:
+    __slots__ = ('count', 'total', 'max')
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, v: float) -> None:
+        self.count += 1
+        self.total += v
+        if v > self.max:
+            self.max = v
+
+    def summary(self) -> SampleSummary:
+        return SampleSummary(count=self.count, total=self.total, max=self.max)
+
+
+class SchedulerStats:
+    # Measurements the job takes of its own loops, grouped as {metric: {key: samples}}. Each is kept both for the
+    # current sampling window, which is handed out and reset with every `JobInstrumentation` event, and for the whole
+    # run, for the summary printed at the end of a debug run.
+    def __init__(self) -> None:
+        self._window: Dict[str, Dict[str, _Samples]] = dict()
+        self._totals: Dict[str, Dict[str, _Samples]] = dict()
+
+    def record(self, metric: str, key: str, value: float) -> None:
+        for d in (self._window, self._totals):
+            samples = d.setdefault(metric, dict()).get(key)
+            if samples is None:
+                samples = d[metric][key] = _Samples()
+            samples.add(value)
+
+    def take_window(self) -> Dict[str, Dict[str, SampleSummary]]:
+        window, self._window = self._window, dict()
+        return {metric: {k: v.summary() for k, v in samples.items()} for metric, samples in window.items()}
+
+    def summary(self) -> str:
+        lines: List[str] = []
+        for metric in (PUSHER_ITERATION_SECONDS, EVENTS_DRAINED_PER_CYCLE, UPDATE_SECONDS, EXTENSION_LAG_SECONDS):
+            samples = self._totals.get(metric)
+            if not samples:
+                continue
+            lines.append(f'{metric}:')
+            width = max(len(k) for k in samples)
+            # Largest total first, so the slowest loop or plugin is at the top.
+            for k, v in sorted(samples.items(), key=lambda kv: kv[1].total, reverse=True):
+                lines.append(
+                    f'  {k:<{width}}  count={v.count}  total={v.total:.6g}  mean={v.total / v.count:.6g}  '
+                    f'max={v.max:.6g}'
+                )
+        return '\n'.join(lines)
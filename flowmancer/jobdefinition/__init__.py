@@ -1,11 +1,14 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
+from enum import Enum
 from pathlib import Path
 from typing import Any, Callable, Dict, List, Optional, Type, TypeVar, Union
 
 from pydantic import BaseModel, ConfigDict, Field
 
+from ..eventbus.log import LogOverflowPolicy, Severity
+
 _job_definition_classes = dict()
 T = TypeVar('T', bound='SerializableJobDefinition')
 
@@ -28,17 +31,100 @@ class LoggerDefinition(JobDefinitionComponent):
     parameters: Dict[str, Any] = dict()
 
 
+class ProfileMode(str, Enum):
+    # Profile `run` with `cProfile`.
+    CPU = 'cpu'
+    # Trace allocations made during `run` with `tracemalloc`.
+    MEMORY = 'memory'
+
+
+class OutputCapture(str, Enum):
+    # Capture what the task writes to `sys.stdout` and `sys.stderr`.
+    PYTHON = 'python'
+    # Capture everything written to the task process's stdout and stderr file descriptors, including by native code
+    # and child processes.
+    FD = 'fd'
+
+
+class ExtensionOverflowPolicy(str, Enum):
+    # Hold further events back until the extension makes room, so that it sees every event.
+    BLOCK = 'block'
+    # Discard the oldest queued event.
+    DROP_OLDEST = 'drop_oldest'
+    # Replace the queued event of the same type for the same task, if any, or else discard the oldest queued event.
+    COALESCE = 'coalesce'
+
+
+class BackoffPolicy(str, Enum):
+    # Wait `backoff` seconds between every attempt.
+    FIXED = 'fixed'
+    # Wait `backoff` seconds after the first attempt, doubling after each one after that.
+    EXPONENTIAL = 'exponential'
+    # Wait a random time between `backoff` seconds and three times the previous wait.
+    DECORRELATED_JITTER = 'decorrelated_jitter'
+
+
 class TaskDefinition(JobDefinitionComponent):
     variant: str = Field(alias='task')
     depends_on: List[str] = Field(alias='dependencies', default_factory=list)
+    # Tasks whose records this task reads while they run. This task starts as soon as they are running.
+    streams_from: List[str] = Field(default_factory=list)
+    stream_capacity: int = 1000
+    profile: List[ProfileMode] = Field(default_factory=list)
     max_attempts: int = 1
-    backoff: int = 0
+    backoff: float = 0
+    backoff_policy: BackoffPolicy = BackoffPolicy.FIXED
+    # Longest wait between attempts, whatever the policy.
+    max_backoff_seconds: Optional[float] = None
+    # Only failures caused by these are retried: names of exception types, with or without their module, and exit
+    # codes. Every failure is retried if none are given.
+    retry_on: List[Union[int, str]] = Field(default_factory=list)
+    # Attempts running for longer than this are stopped, and count as failed.
+    timeout_seconds: Optional[float] = Field(default=None, gt=0)
+    # Seconds between asking a timed out attempt to stop and killing it, along with any processes it started.
+    kill_grace_seconds: float = 5.0
     parameters: Dict[str, Any] = dict()
+    # Overrides the job's `log_level` for this task.
+    log_level: Optional[Severity] = None
+    # Overrides the job's `output_capture` for this task.
+    output_capture: Optional[OutputCapture] = None
+    # Set to false to never run the task in a batch, should the job have `batch` configured.
+    batch: bool = True
 
 
 class ExtensionDefinition(JobDefinitionComponent):
     variant: str = Field(alias='extension')
     parameters: Dict[str, Any] = dict()
+    # Events waiting to be handled by the extension, beyond which `overflow` applies.
+    queue_size: int = 10000
+    overflow: ExtensionOverflowPolicy = ExtensionOverflowPolicy.BLOCK
+
+
+class RemoteDefinition(JobDefinitionComponent):
+    host: str = '127.0.0.1'
+    port: int = 7676
+    token: Optional[str] = None
+    heartbeat_interval_seconds: float = 5.0
+    heartbeat_timeout_seconds: float = 15.0
+    # How long a task waits for a worker with a free slot before failing. None waits indefinitely.
+    worker_wait_timeout_seconds: Optional[float] = 300.0
+
+
+class BatchDefinition(JobDefinitionComponent):
+    # Most tasks run one after another in a single process.
+    max_size: int = Field(default=50, gt=0)
+    # How long a ready task may wait for others to be batched with.
+    max_wait_seconds: float = 0.01
+
+
+class SharedStateBackend(str, Enum):
+    # Tasks share one `shared_dict` hosted by a `multiprocessing.Manager` server process.
+    MANAGER = 'manager'
+    # No `Manager` is started. Each task gets a private copy of `shared_dict`; changes are not seen by other tasks.
+    ISOLATED = 'isolated'
+    # No `Manager` is started. Tasks share one `shared_dict` stored in a `multiprocessing.shared_memory` segment, with
+    # reads served from a per-process cache.
+    SHARED_MEMORY = 'shared_memory'
 
 
 class ConfigurationDefinition(JobDefinitionComponent):
@@ -46,10 +132,23 @@ class ConfigurationDefinition(JobDefinitionComponent):
     max_concurrency: int = 0
     extension_directories: List[str] = []
     extension_packages: List[str] = []
-    synchro_interval_seconds: float = 0.25
+    synchro_interval_seconds: float = 5.0
     loggers_interval_seconds: float = 0.25
     extensions_interval_seconds: float = 0.25
     checkpointer_interval_seconds: float = 10.0
+    instrumentation_interval_seconds: float = 5.0
+    remote: Optional[RemoteDefinition] = None
+    batch: Optional[BatchDefinition] = None
+    shared_state: SharedStateBackend = SharedStateBackend.MANAGER
+    shared_memory_size_mb: float = 16.0
+    # Most log messages held between tasks and loggers at once, or 0 for no limit.
+    log_bus_size: int = 10000
+    log_overflow: LogOverflowPolicy = LogOverflowPolicy.BLOCK
+    log_sample_every: int = 10
+    # Messages less severe than this are discarded by the task itself, before being sent anywhere.
+    log_level: Severity = Severity.DEBUG
+    output_capture: OutputCapture = OutputCapture.PYTHON
+    artifact_directory: str = './.flowmancer/artifacts'
 
 
 class CheckpointerDefinition(JobDefinitionComponent):
@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import cProfile
+import os
+import pstats
+import tracemalloc
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+
+from .eventbus import EventBus
+from .eventbus.execution import AllocationSite, ProfiledFunction, TaskProfile
+from .jobdefinition import ProfileMode
+
+DEFAULT_PROFILE_DIRECTORY = './.flowmancer/profiles'
+_TOP_N = 20
+
+
+def _top_functions(profiler: cProfile.Profile) -> List[ProfiledFunction]:
+    stats = pstats.Stats(profiler)
+    rows = sorted(stats.stats.items(), key=lambda i: i[1][3], reverse=True)[:_TOP_N]  # type: ignore
+    return [
+        ProfiledFunction(
+            function=f'{filename}:{lineno}({function})',
+            calls=nc,
+            total_seconds=tt,
+            cumulative_seconds=ct
+        )
+        for (filename, lineno, function), (_, nc, tt, ct, _) in rows
+    ]
+
+
+@contextmanager
+def profiled(
+    task_name: str,
+    modes: List[str],
+    directory: str,
+    bus: Optional[EventBus]
+) -> Iterator[None]:
+    # Wraps a task's `run` in the requested profilers. Output files are named after the task and overwritten on each
+    # attempt, so that the latest attempt is always the one on disk.
+    summary = TaskProfile(name=task_name)
+    profiler = cProfile.Profile() if ProfileMode.CPU.value in modes else None
+    trace_memory = ProfileMode.MEMORY.value in modes and not tracemalloc.is_tracing()
+    if trace_memory:
+        tracemalloc.start()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        os.makedirs(directory, exist_ok=True)
+        if profiler is not None:
+            summary.profile_path = os.path.abspath(os.path.join(directory, f'{task_name}.prof'))
+            profiler.dump_stats(summary.profile_path)
+            summary.top_functions = _top_functions(profiler)
+        if trace_memory:
+            snapshot = tracemalloc.take_snapshot()
+            summary.peak_traced_memory_bytes = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            summary.snapshot_path = os.path.abspath(os.path.join(directory, f'{task_name}.tracemalloc'))
+            snapshot.dump(summary.snapshot_path)
+            summary.top_allocations = [
+                AllocationSite(location=str(s.traceback), size_bytes=s.size, count=s.count)
+                for s in snapshot.statistics('lineno')[:_TOP_N]
+            ]
+        if bus is not None:
+            bus.put(summary)
@@ -0,0 +1,6 @@
+# noqa: F401
+from .coordinator import RemoteDispatcher
+from .protocol import WorkerLostError, WorkerRejectedError
+from .worker import WorkerAgent
+
+__all__ = ['RemoteDispatcher', 'WorkerAgent', 'WorkerLostError', 'WorkerRejectedError']
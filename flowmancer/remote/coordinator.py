@@ -0,0 +1,299 @@
+from __future__ import annotations
+
+import asyncio
+import hmac
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+from uuid import uuid4
+
+from ..eventbus import SerializableEvent
+from ..eventbus.log import LogEndEvent, LogStartEvent, LogWriter, LogWriteEvent, Severity
+from ..executor import Dispatcher, Executor, ProcessResult
+from .protocol import (
+    STREAM_LIMIT,
+    Connection,
+    MessageType,
+    NoWorkerAvailableError,
+    ProtocolError,
+    WorkerLostError,
+    is_json_serializable,
+)
+
+
+def _token_matches(given: Any, token: str) -> bool:
+    # Compared in constant time, so that the token cannot be guessed a character at a time.
+    return isinstance(given, str) and hmac.compare_digest(given.encode('utf-8'), token.encode('utf-8'))
+
+
+def _fail(executor: Executor, result: ProcessResult, error: Exception, retryable: bool) -> None:
+    writer = LogWriter(executor.name, executor.log_event_bus)
+    writer.emit_log_write_event(str(error), Severity.CRITICAL)
+    writer.close()
+    result.fail(error)
+    result.retryable = result.retryable and retryable
+
+
+class _Assignment:
+    __slots__ = ('executor', 'future', 'log_open')
+
+    def __init__(self, executor: Executor, future: asyncio.Future) -> None:
+        self.executor = executor
+        self.future = future
+        self.log_open = False
+
+
+class _WorkerHandle:
+    __slots__ = ('id', 'conn', 'slots', 'last_seen', 'assignments')
+
+    def __init__(self, worker_id: str, conn: Connection, slots: int) -> None:
+        self.id = worker_id
+        self.conn = conn
+        self.slots = slots
+        self.last_seen = time.monotonic()
+        self.assignments: Dict[str, _Assignment] = dict()
+
+    @property
+    def free_slots(self) -> int:
+        return self.slots - len(self.assignments)
+
+
+class RemoteDispatcher(Dispatcher):
+    def __init__(
+        self,
+        host: str = '127.0.0.1',
+        port: int = 7676,
+        token: Optional[str] = None,
+        heartbeat_interval_seconds: float = 5.0,
+        heartbeat_timeout_seconds: float = 15.0,
+        worker_wait_timeout_seconds: Optional[float] = 300.0,
+        extension_directories: Optional[List[str]] = None,
+        extension_packages: Optional[List[str]] = None
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.token = token
+        self.heartbeat_interval_seconds = heartbeat_interval_seconds
+        self.heartbeat_timeout_seconds = heartbeat_timeout_seconds
+        # How long a task waits for a worker with a free slot before failing. None waits indefinitely.
+        self.worker_wait_timeout_seconds = worker_wait_timeout_seconds
+        self.extension_directories = extension_directories or []
+        self.extension_packages = extension_packages or []
+        self._workers: Dict[str, _WorkerHandle] = dict()
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._monitor: Optional[asyncio.Task] = None
+        self._available: Optional[asyncio.Event] = None
+        self._handlers: Set[asyncio.Task] = set()
+
+    async def start(self) -> None:
+        self._available = asyncio.Event()
+        self._server = await asyncio.start_server(self._handle_worker, self.host, self.port, limit=STREAM_LIMIT)
+        # Resolve the actual port in case an ephemeral one (0) was requested.
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._monitor = asyncio.create_task(self._monitor_heartbeats())
+        print(f'Accepting remote workers on {self.host}:{self.port}')
+
+    async def stop(self) -> None:
+        if self._monitor is not None:
+            self._monitor.cancel()
+            await asyncio.gather(self._monitor, return_exceptions=True)
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        for w in list(self._workers.values()):
+            w.conn.close()
+            self._drop_worker(w)
+        # Closed connections end their handlers, which are waited on rather than left for the loop to cancel.
+        if self._handlers:
+            await asyncio.gather(*self._handlers, return_exceptions=True)
+
+    @property
+    def workers(self) -> List[str]:
+        return list(self._workers.keys())
+
+    async def _monitor_heartbeats(self) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat_interval_seconds)
+            now = time.monotonic()
+            for w in list(self._workers.values()):
+                if (now - w.last_seen) > self.heartbeat_timeout_seconds:
+                    print(f"Remote worker '{w.id}' missed its heartbeat deadline and is considered lost.")
+                    w.conn.close()
+                    self._drop_worker(w)
+
+    async def _handle_worker(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        conn = Connection(reader, writer)
+        handle: Optional[_WorkerHandle] = None
+        task = asyncio.current_task()
+        if task is not None:
+            self._handlers.add(task)
+        try:
+            hello = await conn.receive()
+            if not hello or hello['type'] != MessageType.HELLO.value:
+                raise ProtocolError(f'Expected `hello` from {conn.peer}.')
+            if self.token is not None and not _token_matches(hello.get('token'), self.token):
+                await conn.send(MessageType.REJECT, reason='Invalid token.')
+                return
+            worker_id = hello.get('worker_id') or uuid4().hex
+            if worker_id in self._workers:
+                await conn.send(MessageType.REJECT, reason=f"Worker ID '{worker_id}' is already connected.")
+                return
+
+            handle = _WorkerHandle(worker_id, conn, max(1, int(hello.get('slots', 1))))
+            await conn.send(
+                MessageType.WELCOME,
+                heartbeat_interval_seconds=self.heartbeat_interval_seconds,
+                extension_directories=self.extension_directories,
+                extension_packages=self.extension_packages
+            )
+            self._workers[handle.id] = handle
+            self._notify_available()
+            print(f"Remote worker '{handle.id}' connected from {conn.peer} with {handle.slots} slot(s).")
+
+            while True:
+                msg = await conn.receive()
+                if msg is None:
+                    break
+                handle.last_seen = time.monotonic()
+                self._handle_message(handle, msg)
+        except (ConnectionError, ProtocolError) as e:
+            print(f'Remote worker connection error: {e}')
+        except asyncio.CancelledError:
+            # e.g. the loop shutting down. asyncio reports any handler that ends cancelled, so end as if closed.
+            pass
+        finally:
+            conn.close()
+            if handle is not None:
+                self._drop_worker(handle)
+            if task is not None:
+                self._handlers.discard(task)
+
+    def _handle_message(self, handle: _WorkerHandle, msg: Dict[str, Any]) -> None:
+        t = msg['type']
+        if t == MessageType.HEARTBEAT.value:
+            return
+        a = handle.assignments.get(msg.get('id', ''))
+        if a is None:
+            # Late messages for assignments that were aborted or already reassigned.
+            return
+        if t == MessageType.LOG.value:
+            e = SerializableEvent.deserialize(msg['event'])
+            if isinstance(e, LogStartEvent):
+                a.log_open = True
+            elif isinstance(e, LogEndEvent):
+                a.log_open = False
+            if a.executor.log_event_bus is not None:
+                a.executor.log_event_bus.put(e)
+        elif t == MessageType.RESULT.value and not a.future.done():
+            a.future.set_result((
+                bool(msg['is_failed']),
+                bool(msg.get('retryable', True)),
+                dict(msg['updates']),
+                list(msg['deleted'])
+            ))
+
+    def _drop_worker(self, handle: _WorkerHandle) -> None:
+        if self._workers.get(handle.id) is not handle:
+            return
+        del self._workers[handle.id]
+        for a in handle.assignments.values():
+            # Close out any partially written log so the retried attempt is able to open it again.
+            if a.log_open and a.executor.log_event_bus is not None:
+                a.executor.log_event_bus.put(LogWriteEvent(
+                    name=a.executor.name,
+                    severity=Severity.WARNING,
+                    message=f"Remote worker '{handle.id}' was lost. Reassigning task."
+                ))
+                a.executor.log_event_bus.put(LogEndEvent(name=a.executor.name))
+                a.log_open = False
+            if not a.future.done():
+                a.future.set_exception(WorkerLostError(handle.id))
+        handle.assignments.clear()
+        print(f"Remote worker '{handle.id}' disconnected.")
+
+    def _notify_available(self) -> None:
+        if self._available is not None:
+            self._available.set()
+
+    async def _acquire_worker(self) -> _WorkerHandle:
+        loop = asyncio.get_running_loop()
+        timeout = self.worker_wait_timeout_seconds
+        deadline = loop.time() + timeout if timeout is not None else None
+        while True:
+            candidates = [w for w in self._workers.values() if w.free_slots > 0]
+            if candidates:
+                return max(candidates, key=lambda w: w.free_slots)
+            assert self._available is not None, 'RemoteDispatcher must be started before dispatching.'
+            self._available.clear()
+            try:
+                await asyncio.wait_for(
+                    self._available.wait(), max(0.0, deadline - loop.time()) if deadline is not None else None
+                )
+            except asyncio.TimeoutError:
+                raise NoWorkerAvailableError(
+                    f'No remote worker with a free slot became available within {timeout} seconds '
+                    f'(listening on {self.host}:{self.port}, {len(self._workers)} worker(s) connected).'
+                )
+
+    async def run(self, executor: Executor, result: ProcessResult) -> None:
+        loop = asyncio.get_running_loop()
+        parameters = executor.parameters or dict()
+        snapshot = dict(executor.shared_dict or dict())
+        unsendable = [f'parameters.{k}' for k, v in parameters.items() if not is_json_serializable({k: v})]
+        unsendable += [f'shared_dict.{k}' for k, v in snapshot.items() if not is_json_serializable({k: v})]
+        if unsendable:
+            # Retrying would meet the same values again.
+            _fail(executor, result, TypeError(
+                f"Values sent to remote workers must be JSON serializable: {', '.join(unsendable)}."
+            ), retryable=False)
+            return
+        while True:
+            try:
+                worker = await self._acquire_worker()
+            except NoWorkerAvailableError as e:
+                _fail(executor, result, e, retryable=True)
+                return
+            assignment_id = uuid4().hex
+            assignment = _Assignment(executor, loop.create_future())
+            worker.assignments[assignment_id] = assignment
+            try:
+                await worker.conn.send(
+                    MessageType.DISPATCH,
+                    id=assignment_id,
+                    name=executor.name,
+                    variant=executor.get_task_class().__name__,
+                    parameters=parameters,
+                    shared_dict=snapshot,
+                    is_restart=executor.is_restart,
+                    depends_on=executor.depends_on or [],
+                    profile=executor.profile,
+                    min_severity=executor.min_severity.value,
+                    output_capture=executor.output_capture,
+                    retry_on=executor.retry_on or []
+                )
+                outcome: Tuple[bool, bool, Dict[str, Any], List[str]] = await assignment.future
+            except ConnectionError:
+                worker.assignments.pop(assignment_id, None)
+                worker.conn.close()
+                self._drop_worker(worker)
+                continue
+            except WorkerLostError:
+                # Losing a worker does not count against `max_attempts`; simply place the task elsewhere.
+                continue
+            except asyncio.CancelledError:
+                try:
+                    await worker.conn.send(MessageType.ABORT, id=assignment_id)
+                except ConnectionError:
+                    pass
+                raise
+            finally:
+                worker.assignments.pop(assignment_id, None)
+                self._notify_available()
+
+            is_failed, retryable, updates, deleted = outcome
+            if executor.shared_dict is not None:
+                executor.shared_dict.update(updates)
+                for k in deleted:
+                    executor.shared_dict.pop(k, None)
+            result.is_failed = is_failed
+            result.retryable = retryable
+            return
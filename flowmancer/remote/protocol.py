@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from enum import Enum
+from typing import Any, Dict, Optional
+
+# Messages may carry `shared_dict` snapshots and tracebacks, which easily exceed asyncio's 64 KiB default.
+STREAM_LIMIT = 64 * 1024 * 1024
+
+
+class ProtocolError(Exception):
+    pass
+
+
+class WorkerLostError(Exception):
+    pass
+
+
+class WorkerRejectedError(Exception):
+    pass
+
+
+class NoWorkerAvailableError(Exception):
+    pass
+
+
+class MessageType(str, Enum):
+    HELLO = 'hello'
+    WELCOME = 'welcome'
+    REJECT = 'reject'
+    DISPATCH = 'dispatch'
+    ABORT = 'abort'
+    LOG = 'log'
+    RESULT = 'result'
+    HEARTBEAT = 'heartbeat'
+
+
+# Task parameters and `shared_dict` values are sent as JSON rather than pickled, so that a peer is never able to run
+# code of its choosing by way of what it sends.
+def is_json_serializable(o: Any) -> bool:
+    try:
+        json.dumps(o)
+    except (TypeError, ValueError):
+        return False
+    return True
+
+
+# Every message is a single line of JSON: an object with a `type` key holding a `MessageType` value, with all other
+# keys making up the body of the message.
+class Connection:
+    __slots__ = ('_reader', '_writer', '_write_lock')
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._reader = reader
+        self._writer = writer
+        # Several coroutines (heartbeats, log forwarding, results) share one writer; `drain` must not be awaited
+        # concurrently.
+        self._write_lock = asyncio.Lock()
+
+    @property
+    def peer(self) -> str:
+        peer = self._writer.get_extra_info('peername')
+        return f'{peer[0]}:{peer[1]}' if peer else 'unknown'
+
+    async def send(self, t: Enum, **body: Any) -> None:
+        data = (json.dumps({'type': t.value, **body}) + '\n').encode('utf-8')
+        async with self._write_lock:
+            self._writer.write(data)
+            await self._writer.drain()
+
+    async def receive(self) -> Optional[Dict[str, Any]]:
+        line = await self._reader.readline()
+        if not line:
+            return None
+        try:
+            msg = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ProtocolError(f'Malformed message from {self.peer}: {e}')
+        if not isinstance(msg, dict) or 'type' not in msg:
+            raise ProtocolError(f'Message from {self.peer} is missing its `type`.')
+        return msg
+
+    def close(self) -> None:
+        self._writer.close()
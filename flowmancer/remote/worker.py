@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import socket
+from functools import partial
+from multiprocessing import Manager, Process
+from multiprocessing.managers import SyncManager
+from typing import Any, Dict, List, Optional
+from uuid import uuid4
+
+from ..artifacts import UnavailableArtifactStore
+from ..eventbus import EventBus
+from ..eventbus.log import LogWriter, SerializableLogEvent, Severity
+from ..executor import ProcessResult, exec_task_lifecycle
+from ..task import _task_classes
+from .protocol import STREAM_LIMIT, Connection, MessageType, WorkerRejectedError, is_json_serializable
+
+
+def _discard(running: Dict[str, asyncio.Task], assignment_id: str, _: asyncio.Task) -> None:
+    running.pop(assignment_id, None)
+
+
+def _has_changed(a: Any, b: Any) -> bool:
+    try:
+        return bool(a != b)
+    except Exception:
+        # Some values (e.g. arrays) do not support a plain truth value for comparison; assume they have changed.
+        return True
+
+
+class WorkerAgent:
+    def __init__(
+        self,
+        host: str = '127.0.0.1',
+        port: int = 7676,
+        *,
+        worker_id: Optional[str] = None,
+        slots: Optional[int] = None,
+        token: Optional[str] = None,
+        reconnect_interval_seconds: float = 5.0,
+        log_poll_interval_seconds: float = 0.1,
+        extension_directories: Optional[List[str]] = None,
+        extension_packages: Optional[List[str]] = None,
+        once: bool = False
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.worker_id = worker_id or f'{socket.gethostname()}-{os.getpid()}-{uuid4().hex[:8]}'
+        self.slots = slots or os.cpu_count() or 1
+        self.token = token
+        self.reconnect_interval_seconds = reconnect_interval_seconds
+        self.log_poll_interval_seconds = log_poll_interval_seconds
+        self.extension_directories = extension_directories or []
+        self.extension_packages = extension_packages or []
+        self.once = once
+        self._procs: Dict[str, Process] = dict()
+
+    async def run(self) -> None:
+        manager = Manager()
+        try:
+            while True:
+                try:
+                    await self._serve(manager)
+                except (ConnectionError, OSError) as e:
+                    print(f'Unable to reach coordinator at {self.host}:{self.port}: {e}')
+                if self.once:
+                    break
+                await asyncio.sleep(self.reconnect_interval_seconds)
+        finally:
+            manager.shutdown()
+
+    def _load_task_modules(self, directories: List[str], packages: List[str]) -> None:
+        # Imported here since the `flowmancer` module itself depends on this package.
+        from ..flowmancer import _load_extension_modules
+        _load_extension_modules(self.extension_directories + directories, self.extension_packages + packages)
+
+    async def _serve(self, manager: SyncManager) -> None:
+        reader, writer = await asyncio.open_connection(self.host, self.port, limit=STREAM_LIMIT)
+        conn = Connection(reader, writer)
+        running: Dict[str, asyncio.Task] = dict()
+        heartbeat: Optional[asyncio.Task] = None
+        try:
+            await conn.send(MessageType.HELLO, worker_id=self.worker_id, slots=self.slots, token=self.token)
+            welcome = await conn.receive()
+            if welcome is None:
+                raise ConnectionError('Coordinator closed the connection during handshake.')
+            if welcome['type'] == MessageType.REJECT.value:
+                raise WorkerRejectedError(welcome.get('reason', 'unknown'))
+            self._load_task_modules(welcome.get('extension_directories', []), welcome.get('extension_packages', []))
+            print(f"Worker '{self.worker_id}' connected to coordinator at {self.host}:{self.port}.")
+            heartbeat = asyncio.create_task(self._heartbeat(conn, float(welcome['heartbeat_interval_seconds'])))
+
+            while True:
+                msg = await conn.receive()
+                if msg is None:
+                    break
+                if msg['type'] == MessageType.DISPATCH.value:
+                    t = asyncio.create_task(self._execute(conn, manager, msg))
+                    running[msg['id']] = t
+                    t.add_done_callback(partial(_discard, running, msg['id']))
+                elif msg['type'] == MessageType.ABORT.value and msg['id'] in self._procs:
+                    # Sends SIGTERM, which triggers the task's `on_abort` lifecycle method.
+                    self._procs[msg['id']].terminate()
+        finally:
+            if heartbeat is not None:
+                heartbeat.cancel()
+            for i in list(running.keys()):
+                if i in self._procs:
+                    self._procs[i].terminate()
+            await asyncio.gather(*running.values(), return_exceptions=True)
+            conn.close()
+
+    async def _heartbeat(self, conn: Connection, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            await conn.send(MessageType.HEARTBEAT)
+
+    async def _forward_logs(self, conn: Connection, assignment_id: str, bus: EventBus[SerializableLogEvent]) -> None:
+        while not bus.empty():
+            await conn.send(MessageType.LOG, id=assignment_id, event=bus.get().serialize())
+
+    async def _execute(self, conn: Connection, manager: SyncManager, msg: Dict[str, Any]) -> None:
+        assignment_id = msg['id']
+        name = msg['name']
+        snapshot: Dict[str, Any] = dict(msg['shared_dict'])
+        bus = EventBus[SerializableLogEvent]('flowmancer', manager.Queue())
+        shared_dict = manager.dict(snapshot)
+        # Decides, within the task's process, whether a failure may be retried.
+        result = ProcessResult(msg.get('retry_on'))
+
+        task_class = _task_classes.get(msg['variant'])
+        if task_class is None:
+            writer = LogWriter(name, bus)
+            writer.emit_log_write_event(
+                f"Task class '{msg['variant']}' is not registered on worker '{self.worker_id}'.", Severity.CRITICAL
+            )
+            writer.close()
+            result.is_failed = True
+        else:
+            proc = Process(
+                target=exec_task_lifecycle,
+                args=(
+                    name,
+                    task_class,
+                    dict(msg['parameters']),
+                    bus,
+                    result,
+                    shared_dict,
+                    msg['is_restart'],
+                    msg['depends_on'],
+                    # The job's artifact directory is not one the worker can reach.
+                    UnavailableArtifactStore('Artifacts are not available to tasks run by remote workers.', name),
+                    None,
+                    msg.get('profile'),
+                    None,
+                    Severity(msg.get('min_severity', Severity.DEBUG.value)),
+                    msg.get('output_capture', 'python')
+                ),
+                daemon=False
+            )
+            self._procs[assignment_id] = proc
+            try:
+                proc.start()
+                join = asyncio.get_running_loop().run_in_executor(None, proc.join)
+                while not join.done():
+                    await self._forward_logs(conn, assignment_id, bus)
+                    await asyncio.wait([join], timeout=self.log_poll_interval_seconds)
+            finally:
+                del self._procs[assignment_id]
+            # As with local processes, e.g. the task called `sys.exit` or the process was killed.
+            if proc.exitcode:
+                result.fail(proc.exitcode)
+
+        await self._forward_logs(conn, assignment_id, bus)
+        final = shared_dict.copy()
+        updates = {k: v for k, v in final.items() if k not in snapshot or _has_changed(snapshot[k], v)}
+        unsendable = [k for k, v in updates.items() if not is_json_serializable({k: v})]
+        if unsendable:
+            # Only JSON is sent back to the job; the task fails rather than have its changes quietly go missing.
+            writer = LogWriter(name, bus)
+            writer.emit_log_write_event(
+                'Values set in `shared_dict` by remote tasks must be JSON serializable: '
+                f"{', '.join(map(str, unsendable))}.",
+                Severity.CRITICAL
+            )
+            writer.close()
+            await self._forward_logs(conn, assignment_id, bus)
+            result.is_failed = True
+            for k in unsendable:
+                del updates[k]
+        await conn.send(
+            MessageType.RESULT,
+            id=assignment_id,
+            is_failed=result.is_failed,
+            retryable=result.retryable,
+            updates=updates,
+            deleted=[k for k in snapshot if k not in final]
+        )
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import sys
+import time
+from typing import Dict, Optional
+
+from .eventbus.execution import TaskResourceUsage
+
+try:
+    import resource
+except ImportError:  # pragma: no cover
+    # Not available on Windows.
+    resource = None  # type: ignore
+
+# `ru_maxrss` is reported in bytes on macOS, but in kilobytes everywhere else.
+_MAXRSS_UNIT = 1 if sys.platform == 'darwin' else 1024
+
+
+def _read_proc_io() -> Dict[str, int]:
+    try:
+        with open('/proc/self/io', 'r') as f:
+            return {k.strip(): int(v) for k, v in (line.split(':', 1) for line in f if ':' in line)}
+    except (OSError, ValueError):
+        return dict()
+
+
+def _since(now: Optional[int], before: Optional[int]) -> Optional[int]:
+    return now - before if now is not None and before is not None else now
+
+
+def collect_resource_usage(
+    task_name: str, started: float, since: Optional[TaskResourceUsage] = None, shared_process: bool = False
+) -> Optional[TaskResourceUsage]:
+    # Usage of the process so far or, given an earlier reading in `since`, what was used after it was taken.
+    if resource is None:
+        return None
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    io = _read_proc_io()
+    usage = TaskResourceUsage(
+        name=task_name,
+        wall_seconds=time.monotonic() - started,
+        user_cpu_seconds=own.ru_utime + children.ru_utime,
+        system_cpu_seconds=own.ru_stime + children.ru_stime,
+        max_rss_bytes=max(own.ru_maxrss, children.ru_maxrss) * _MAXRSS_UNIT,
+        voluntary_context_switches=own.ru_nvcsw + children.ru_nvcsw,
+        involuntary_context_switches=own.ru_nivcsw + children.ru_nivcsw,
+        read_bytes=io.get('read_bytes'),
+        write_bytes=io.get('write_bytes'),
+        shared_process=shared_process
+    )
+    if since is None:
+        return usage
+    # Peak RSS is a high-water mark and cannot be taken apart the same way; see `shared_process`.
+    return usage.model_copy(update=dict(
+        user_cpu_seconds=usage.user_cpu_seconds - since.user_cpu_seconds,
+        system_cpu_seconds=usage.system_cpu_seconds - since.system_cpu_seconds,
+        voluntary_context_switches=usage.voluntary_context_switches - since.voluntary_context_switches,
+        involuntary_context_switches=usage.involuntary_context_switches - since.involuntary_context_switches,
+        read_bytes=_since(usage.read_bytes, since.read_bytes),
+        write_bytes=_since(usage.write_bytes, since.write_bytes)
+    ))
@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+import random
+from typing import Optional, Sequence, Union
+
+# Either the name of an exception type, on its own or qualified with its module, or an exit code.
+RetryOn = Union[str, int]
+
+
+def backoff_seconds(policy: str, base: float, attempt: int, previous: float, cap: Optional[float] = None) -> float:
+    # Seconds to wait after the given failed `attempt` (counting from 1), for a `BackoffPolicy`. `previous` is what was
+    # waited after the attempt before, if any.
+    if policy == 'exponential':
+        delay = base * 2.0 ** (attempt - 1)
+    elif policy == 'decorrelated_jitter':
+        # Each wait is drawn from between `base` and three times the one before, so that tasks that failed together
+        # soon stop retrying together.
+        delay = random.uniform(base, max(base, (previous or base) * 3))
+    else:
+        delay = base
+    return min(delay, cap) if cap is not None else delay
+
+
+def is_retryable(cause: Union[BaseException, int], retry_on: Sequence[RetryOn]) -> bool:
+    # With nothing to go by, every failure is retried.
+    if not retry_on:
+        return True
+    if isinstance(cause, int):
+        return cause in retry_on
+    # e.g. the exit code of a failed command.
+    code = getattr(cause, 'returncode', None)
+    if isinstance(code, int) and code in retry_on:
+        return True
+    names = set()
+    for c in type(cause).__mro__:
+        names.add(c.__name__)
+        names.add(f'{c.__module__}.{c.__qualname__}')
+    return any(isinstance(r, str) and r in names for r in retry_on)
@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import pickle
+import struct
+import sys
+import time
+from multiprocessing import Lock, shared_memory
+from typing import Any, Dict, Iterator, MutableMapping, Optional, Tuple
+
+# Segment layout:
+#   header: generation (odd while compacting), end offset of committed entries, last assigned version
+#   entries: total length (incl. padding), op, committed flag, version, key length, key bytes, pickled value bytes
+_HEADER = struct.Struct('<QQQ')
+_HEADER_SIZE = 32
+_ENTRY = struct.Struct('<IBBQI')
+_OP_SET = 1
+_OP_DELETE = 2
+_ALIGN = 8
+
+# Values of these types can safely be handed out from the read cache as-is. Anything else is unpickled on each read so
+# that mutating a value that was read does not silently diverge from what is stored, mirroring `Manager` semantics.
+_IMMUTABLE_TYPES = (str, bytes, int, float, bool, complex, type(None), frozenset)
+
+
+class SharedMemoryFullError(MemoryError):
+    pass
+
+
+def _padded(n: int) -> int:
+    return (n + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+class SharedMemoryDict(MutableMapping[str, Any]):
+    # A `Dict[str, Any]` shared between processes through a single `multiprocessing.shared_memory` segment, used as an
+    # append-only log of key versions. Each process keeps its own cache of values and only looks at entries appended
+    # since its last read, so reading an unchanged key costs a header check rather than a round trip to a `Manager`.
+    # Writes hold a lock only for the copy into the segment. When the segment fills up, the writer compacts it down
+    # to the latest version of each key; readers notice the generation change and rebuild their cache.
+
+    def __init__(self, shm: shared_memory.SharedMemory, lock: Any, owner: bool = False) -> None:
+        self._shm = shm
+        self._lock = lock
+        self._owner = owner
+        self._reset_cache()
+
+    @classmethod
+    def create(cls, size: int, initial: Optional[Dict[str, Any]] = None) -> SharedMemoryDict:
+        shm = shared_memory.SharedMemory(create=True, size=_HEADER_SIZE + size)
+        d = cls(shm, Lock(), owner=True)
+        _HEADER.pack_into(d._buf, 0, 0, _HEADER_SIZE, 0)
+        if initial:
+            d.update(initial)
+        return d
+
+    @property
+    def _buf(self) -> memoryview:
+        buf = self._shm.buf
+        assert buf is not None, 'SharedMemoryDict has been closed.'
+        return buf
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def _reset_cache(self) -> None:
+        self._generation = -1
+        self._offset = _HEADER_SIZE
+        self._versions: Dict[str, int] = dict()
+        self._raw: Dict[str, bytes] = dict()
+        self._values: Dict[str, Any] = dict()
+
+    # Pickling support for start methods other than `fork`, where the object is sent to the child process.
+    def __getstate__(self) -> Tuple[str, Any]:
+        return self._shm.name, self._lock
+
+    def __setstate__(self, state: Tuple[str, Any]) -> None:
+        name, self._lock = state
+        if sys.version_info >= (3, 13):
+            # Only the creating process may unlink the segment.
+            self._shm = shared_memory.SharedMemory(name=name, track=False)
+        else:
+            # Child processes share the creator's resource tracker, so registering the segment again is harmless.
+            self._shm = shared_memory.SharedMemory(name=name)
+        self._owner = False
+        self._reset_cache()
+
+    def _read_entries(self, start: int, end: int) -> Tuple[int, Dict[str, Tuple[int, int, bytes]]]:
+        buf = self._buf
+        found: Dict[str, Tuple[int, int, bytes]] = dict()
+        pos = start
+        while pos < end:
+            total, op, committed, version, key_len = _ENTRY.unpack_from(buf, pos)
+            if not committed or total == 0:
+                break
+            body = pos + _ENTRY.size
+            key = bytes(buf[body:body + key_len]).decode('utf-8')
+            found[key] = (op, version, bytes(buf[body + key_len:pos + total]) if op == _OP_SET else b'')
+            pos += total
+        return pos, found
+
+    def _sync(self) -> None:
+        while True:
+            generation, end, _ = _HEADER.unpack_from(self._buf, 0)
+            if generation == self._generation and end == self._offset:
+                return
+            if generation % 2:
+                # Another process is compacting the segment.
+                time.sleep(0)
+                continue
+            start = self._offset if generation == self._generation else _HEADER_SIZE
+            try:
+                pos, found = self._read_entries(start, end)
+            except Exception:
+                pos, found = start, dict()
+            if _HEADER.unpack_from(self._buf, 0)[0] != generation:
+                continue
+            if generation != self._generation:
+                self._reset_cache()
+                self._generation = generation
+            for key, (op, version, raw) in found.items():
+                self._values.pop(key, None)
+                if op == _OP_SET:
+                    self._versions[key] = version
+                    self._raw[key] = raw
+                else:
+                    self._versions.pop(key, None)
+                    self._raw.pop(key, None)
+            self._offset = pos
+            return
+
+    def _append(self, key: str, op: int, raw: bytes) -> None:
+        key_bytes = key.encode('utf-8')
+        total = _padded(_ENTRY.size + len(key_bytes) + len(raw))
+        buf = self._buf
+        with self._lock:
+            generation, end, version = _HEADER.unpack_from(buf, 0)
+            if end + total > len(buf):
+                generation, end = self._compact(generation)
+                if end + total > len(buf):
+                    raise SharedMemoryFullError(
+                        f'Shared memory segment of {len(buf)} bytes is too small to store key: {key}'
+                    )
+            version += 1
+            body = end + _ENTRY.size
+            buf[body:body + len(key_bytes)] = key_bytes
+            buf[body + len(key_bytes):body + len(key_bytes) + len(raw)] = raw
+            _ENTRY.pack_into(buf, end, total, op, 1, version, len(key_bytes))
+            _HEADER.pack_into(buf, 0, generation, end + total, version)
+
+    def _compact(self, generation: int) -> Tuple[int, int]:
+        # Must be called with the lock held.
+        buf = self._buf
+        _, end, version = _HEADER.unpack_from(buf, 0)
+        _, found = self._read_entries(_HEADER_SIZE, end)
+        _HEADER.pack_into(buf, 0, generation + 1, end, version)
+        pos = _HEADER_SIZE
+        for key, (op, key_version, raw) in found.items():
+            if op != _OP_SET:
+                continue
+            key_bytes = key.encode('utf-8')
+            total = _padded(_ENTRY.size + len(key_bytes) + len(raw))
+            body = pos + _ENTRY.size
+            buf[body:body + len(key_bytes)] = key_bytes
+            buf[body + len(key_bytes):body + len(key_bytes) + len(raw)] = raw
+            _ENTRY.pack_into(buf, pos, total, op, 1, key_version, len(key_bytes))
+            pos += total
+        _HEADER.pack_into(buf, 0, generation + 2, pos, version)
+        return generation + 2, pos
+
+    def version(self, key: str) -> int:
+        self._sync()
+        return self._versions[key]
+
+    def __getitem__(self, key: str) -> Any:
+        self._sync()
+        if key in self._values:
+            return self._values[key]
+        value = pickle.loads(self._raw[key])
+        if isinstance(value, _IMMUTABLE_TYPES):
+            self._values[key] = value
+        return value
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if not isinstance(key, str):
+            raise TypeError(f'str expected for `key`, not {type(key)}')
+        self._append(key, _OP_SET, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def __delitem__(self, key: str) -> None:
+        self._sync()
+        if key not in self._raw:
+            raise KeyError(key)
+        self._append(key, _OP_DELETE, b'')
+
+    def __contains__(self, key: object) -> bool:
+        self._sync()
+        return key in self._raw
+
+    def __iter__(self) -> Iterator[str]:
+        self._sync()
+        return iter(list(self._raw.keys()))
+
+    def __len__(self) -> int:
+        self._sync()
+        return len(self._raw)
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}({self.copy()!r})'
+
+    def copy(self) -> Dict[str, Any]:
+        self._sync()
+        return {k: self[k] for k in list(self._raw.keys())}
+
+    def close(self) -> None:
+        self._values.clear()
+        self._shm.close()
+
+    def unlink(self) -> None:
+        if self._owner:
+            self._shm.unlink()
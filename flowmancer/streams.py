@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import queue
+from multiprocessing import Queue, Value
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Records are sent across the pipe in small batches, as pickling and writing each one separately dominates the cost of
+# streaming small records.
+_MAX_BATCH_SIZE = 64
+_POLL_INTERVAL_SECONDS = 0.1
+
+_DATA = 'data'
+_END = 'end'
+_ERROR = 'error'
+
+
+class StreamClosedError(Exception):
+    pass
+
+
+class UpstreamStreamError(Exception):
+    pass
+
+
+class StreamChannel:
+    # A bounded, single-producer single-consumer channel between two tasks that run at the same time. At most
+    # `capacity` records (give or take one batch on either end) are in flight, after which the writer blocks until the
+    # reader catches up. The reader closing its end unblocks the writer with a `StreamClosedError`.
+    def __init__(self, capacity: int = 1000) -> None:
+        self.batch_size = max(1, min(_MAX_BATCH_SIZE, capacity))
+        self._queue: Queue = Queue(maxsize=max(1, capacity // self.batch_size))
+        self._reader_closed = Value('b', 0)
+        # Set by the job once the writer's process has exited, so a reader is not left waiting forever on a writer
+        # that died without ending the stream.
+        self._writer_exited = Value('b', 0)
+
+    @property
+    def reader_closed(self) -> bool:
+        return bool(self._reader_closed.value)  # type: ignore
+
+    def close_reader(self) -> None:
+        self._reader_closed.value = 1  # type: ignore
+
+    def mark_writer_exited(self) -> None:
+        self._writer_exited.value = 1  # type: ignore
+
+    def drain(self) -> None:
+        # Run by the job once the reader's process has exited. A writer cannot exit while records it has sent are still
+        # stuck in the pipe, so discard them until it is gone.
+        self.close_reader()
+        while True:
+            try:
+                self._queue.get(timeout=_POLL_INTERVAL_SECONDS)
+            except queue.Empty:
+                if self._writer_exited.value:  # type: ignore
+                    return
+
+    def send(self, kind: str, payload: Any = None) -> None:
+        while True:
+            if self.reader_closed:
+                raise StreamClosedError('Downstream task has stopped reading from the stream.')
+            try:
+                self._queue.put((kind, payload), timeout=_POLL_INTERVAL_SECONDS)
+                return
+            except queue.Full:
+                continue
+
+    def receive(self) -> Tuple[str, Any]:
+        while True:
+            try:
+                return self._queue.get(timeout=_POLL_INTERVAL_SECONDS)
+            except queue.Empty:
+                if self._writer_exited.value:  # type: ignore
+                    # Anything the writer sent before exiting has been flushed to the pipe by now; check once more.
+                    try:
+                        return self._queue.get(timeout=_POLL_INTERVAL_SECONDS)
+                    except queue.Empty:
+                        return _ERROR, 'Upstream task exited without ending the stream.'
+
+
+class TaskStreams:
+    # Available to tasks as `self.streams`. A task writes records to every task that `streams_from` it and reads the
+    # records of each task it `streams_from` by name.
+    def __init__(
+        self,
+        inputs: Optional[Dict[str, StreamChannel]] = None,
+        outputs: Optional[Dict[str, StreamChannel]] = None
+    ) -> None:
+        self.inputs = inputs or dict()
+        self.outputs = outputs or dict()
+        self._buffer: List[Any] = []
+        self._ended = False
+
+    @property
+    def sources(self) -> List[str]:
+        return list(self.inputs.keys())
+
+    def _open_outputs(self) -> List[StreamChannel]:
+        return [c for c in self.outputs.values() if not c.reader_closed]
+
+    def _flush(self) -> None:
+        if not self._buffer:
+            return
+        batch, self._buffer = self._buffer, []
+        open_outputs = self._open_outputs()
+        if not open_outputs:
+            raise StreamClosedError('All downstream tasks have stopped reading from the stream.')
+        for c in open_outputs:
+            try:
+                c.send(_DATA, batch)
+            except StreamClosedError:
+                pass
+
+    def write(self, record: Any) -> None:
+        # Records written by a task without any streaming consumers are discarded.
+        if not self.outputs:
+            return
+        if self._ended:
+            raise StreamClosedError('Stream has already been ended.')
+        self._buffer.append(record)
+        if len(self._buffer) >= min(c.batch_size for c in self.outputs.values()):
+            self._flush()
+
+    def read(self, source: Optional[str] = None) -> Iterator[Any]:
+        if source is None:
+            if len(self.inputs) != 1:
+                raise ValueError(f'A source must be given when streaming from several tasks: {self.sources}')
+            source = self.sources[0]
+        if source not in self.inputs:
+            raise KeyError(f"Task does not stream from '{source}'.")
+        channel = self.inputs[source]
+        while True:
+            kind, payload = channel.receive()
+            if kind == _DATA:
+                yield from payload
+            elif kind == _END:
+                return
+            else:
+                raise UpstreamStreamError(f"Stream from '{source}' failed: {payload}")
+
+    def end(self, error: Optional[str] = None) -> None:
+        # Called once the task's lifecycle is over: signals end-of-stream (or the failure) downstream and releases the
+        # upstream writers of any stream that was not read to the end.
+        if not self._ended:
+            self._ended = True
+            try:
+                if error is None:
+                    self._flush()
+            except StreamClosedError:
+                pass
+            self._buffer = []
+            for c in self._open_outputs():
+                try:
+                    c.send(_END if error is None else _ERROR, error)
+                except StreamClosedError:
+                    pass
+        for c in self.inputs.values():
+            c.close_reader()
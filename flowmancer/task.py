@@ -1,13 +1,16 @@
 from __future__ import annotations
 
+import asyncio
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List, TypeVar
+from typing import Any, ClassVar, Dict, List, TypeVar
 
 from pydantic import BaseModel, ConfigDict, Field, SkipValidation
 from uuid import uuid4
 
+from .artifacts import ArtifactStore
 from .eventbus.log import LogWriter, TaskLogWriterWrapper
 from .lifecycle import Lifecycle
+from .streams import TaskStreams
 
 _task_classes = dict()
 T = TypeVar('T', bound='Task')
@@ -34,8 +37,26 @@ class Task(ABC, BaseModel, Lifecycle):
     logger: SkipValidation[TaskLogWriterWrapper] = Field(
         default=TaskLogWriterWrapper(LogWriter('Task', None)), frozen=True
     )
+    artifacts: SkipValidation[ArtifactStore] = Field(default_factory=ArtifactStore, frozen=True)
+    streams: SkipValidation[TaskStreams] = Field(default_factory=TaskStreams, frozen=True)
     metadata: TaskMetadata = Field(default_factory=lambda: TaskMetadata(name='unnamed', variant='unknown'), frozen=True)
+    # Whether the task takes a `max_concurrency` slot while it runs locally. Only tasks that do nothing but wait, on the
+    # job's own event loop, should do without.
+    takes_slot: ClassVar[bool] = True
 
     @abstractmethod
     def run(self) -> None:
         pass
+
+
+class AsyncTask(Task):
+    # Run as a coroutine on the job's own event loop, rather than in a process of its own, when run locally. Meant for
+    # tasks that spend their time waiting, e.g. on commands or over the network: anything blocking holds up the whole
+    # job, lifecycle methods included. Log through `self.logger.log_async`, which never blocks the loop. Elsewhere,
+    # e.g. on a remote worker, it is run in a process like any other task.
+    @abstractmethod
+    async def run_async(self) -> None:
+        pass
+
+    def run(self) -> None:
+        asyncio.run(self.run_async())
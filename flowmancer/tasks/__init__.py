@@ -0,0 +1,6 @@
+# noqa: F401
+# Ensure implementations are registered
+from .command import CommandTask
+from .sensor import FileSensor, Sensor, SQLiteRowSensor
+
+__all__ = ['CommandTask', 'FileSensor', 'Sensor', 'SQLiteRowSensor']
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import asyncio
+import os
+from typing import Dict, List, Optional, cast
+
+from pydantic import Field
+
+from ..capture import READ_SIZE, LineBuffer
+from ..eventbus.log import Severity
+from ..exceptions import CommandFailedError, CommandTimeoutError
+from ..task import AsyncTask, task
+
+
+@task
+class CommandTask(AsyncTask):
+    # Runs a command straight from the job's event loop, with no Python process of its own. What it writes to stdout is
+    # logged as INFO and to stderr as ERROR. The task fails should the command exit with anything but 0 or run for
+    # longer than `timeout_seconds`. Should the task be aborted or time out, the command is sent SIGTERM, followed by
+    # SIGKILL if it has not exited within `kill_grace_seconds`.
+    argv: List[str] = Field(min_length=1)
+    # Added to the job's own environment, overriding any variables of the same name.
+    env: Dict[str, str] = Field(default_factory=dict)
+    cwd: Optional[str] = None
+    timeout_seconds: Optional[float] = None
+    kill_grace_seconds: float = 5.0
+
+    async def _forward(self, stream: Optional[asyncio.StreamReader], severity: Severity) -> None:
+        if stream is None:
+            return
+        lines = LineBuffer()
+        while True:
+            chunk = await stream.read(READ_SIZE)
+            if not chunk:
+                break
+            message = lines.feed(chunk)
+            if message is not None:
+                await self.logger.log_async(severity, message)
+        message = lines.flush()
+        if message is not None:
+            await self.logger.log_async(severity, message)
+
+    async def _communicate(self, proc: asyncio.subprocess.Process) -> None:
+        await asyncio.gather(
+            self._forward(proc.stdout, Severity.INFO), self._forward(proc.stderr, Severity.ERROR), proc.wait()
+        )
+
+    async def _stop(self, proc: asyncio.subprocess.Process) -> None:
+        try:
+            proc.terminate()
+            try:
+                await asyncio.wait_for(proc.wait(), self.kill_grace_seconds)
+            except asyncio.TimeoutError:
+                proc.kill()
+                await proc.wait()
+        except ProcessLookupError:
+            # Already exited.
+            pass
+
+    async def run_async(self) -> None:
+        proc = await asyncio.create_subprocess_exec(
+            *self.argv,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            cwd=self.cwd,
+            env={**os.environ, **self.env} if self.env else None
+        )
+        try:
+            await asyncio.wait_for(self._communicate(proc), self.timeout_seconds)
+        except asyncio.TimeoutError:
+            raise CommandTimeoutError(f'Command did not finish within {self.timeout_seconds} seconds: {self.argv[0]}')
+        finally:
+            if proc.returncode is None:
+                await self._stop(proc)
+        code = cast(int, proc.returncode)
+        if code != 0:
+            raise CommandFailedError(f'Command exited with code {code}: {self.argv[0]}', code)
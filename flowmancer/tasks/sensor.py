@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import asyncio
+import glob
+import sqlite3
+import time
+from abc import abstractmethod
+from contextlib import closing
+from pathlib import Path
+from typing import Any, ClassVar, List, Optional
+
+from pydantic import Field
+
+from ..exceptions import SensorTimeoutError
+from ..task import AsyncTask, task
+
+
+class Sensor(AsyncTask):
+    # Waits for a condition, checked by `poke`, to hold. Pokes are spaced `poke_interval_seconds` apart to begin with,
+    # the spacing growing by `backoff_factor` after each unsuccessful poke up to `max_poke_interval_seconds`. The sensor
+    # fails should the condition not hold within `timeout_seconds`. Sensors wait on the job's own event loop and take no
+    # `max_concurrency` slot, so waiting on them never holds up tasks that have actual work to do.
+    takes_slot: ClassVar[bool] = False
+    poke_interval_seconds: float = Field(default=5.0, gt=0)
+    backoff_factor: float = Field(default=2.0, ge=1)
+    max_poke_interval_seconds: float = 300.0
+    timeout_seconds: Optional[float] = None
+
+    # Returns whether the condition holds. Must not block; blocking checks belong in `run_in_executor`.
+    @abstractmethod
+    async def poke(self) -> bool:
+        pass
+
+    async def run_async(self) -> None:
+        started = time.monotonic()
+        interval = self.poke_interval_seconds
+        pokes = 0
+        while True:
+            pokes += 1
+            if await self.poke():
+                await self.logger.log_async(
+                    'INFO', 'Condition met after %d poke(s) and %.1f seconds.', pokes, time.monotonic() - started
+                )
+                return
+            wait = interval
+            if self.timeout_seconds is not None:
+                remaining = self.timeout_seconds - (time.monotonic() - started)
+                if remaining <= 0:
+                    raise SensorTimeoutError(
+                        f'Condition not met within {self.timeout_seconds} seconds, after {pokes} poke(s).'
+                    )
+                # Poke one last time right as the timeout runs out.
+                wait = min(wait, remaining)
+            await self.logger.log_async('DEBUG', 'Condition not met; poking again in %.1f seconds.', wait)
+            await asyncio.sleep(wait)
+            interval = min(interval * self.backoff_factor, self.max_poke_interval_seconds)
+
+
+@task
+class FileSensor(Sensor):
+    # Waits for at least `min_count` files matching `path`, which may be a glob pattern (`**` included), to exist.
+    path: str
+    min_count: int = 1
+
+    def _count(self) -> int:
+        if any(c in self.path for c in '*?['):
+            return len(glob.glob(self.path, recursive=True))
+        return int(Path(self.path).exists())
+
+    async def poke(self) -> bool:
+        return await asyncio.get_running_loop().run_in_executor(None, self._count) >= self.min_count
+
+
+@task
+class SQLiteRowSensor(Sensor):
+    # Waits for `query` against the SQLite `database` to return at least one row.
+    database: str
+    query: str
+    parameters: List[Any] = Field(default_factory=list)
+
+    def _has_row(self) -> bool:
+        # Connections cannot be shared between threads, so each poke opens its own. The database is never written to.
+        try:
+            with closing(sqlite3.connect(f'{Path(self.database).resolve().as_uri()}?mode=ro', uri=True)) as conn:
+                return conn.execute(self.query, self.parameters).fetchone() is not None
+        except sqlite3.OperationalError as e:
+            # Neither the database nor the table need exist yet.
+            if 'unable to open database' in str(e) or 'no such table' in str(e):
+                return False
+            raise
+
+    async def poke(self) -> bool:
+        return await asyncio.get_running_loop().run_in_executor(None, self._has_row)
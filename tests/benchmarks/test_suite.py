@@ -0,0 +1,50 @@
+import json
+
+from flowmancer.benchmarks.dags import chain, critical_path_length, diamond, wide
+from flowmancer.benchmarks.suite import bench_checkpoint, bench_graph_setup, bench_memory, compare, run_job
+from flowmancer.cli import main
+
+
+def test_dag_shapes():
+    assert critical_path_length(wide(10)) == 2
+    assert critical_path_length(chain(10)) == 10
+    d = diamond(19, width=8)
+    assert len(d) == 19 and d['t9'] == [f't{i}' for i in range(1, 9)] and d['t10'] == ['t9']
+    assert critical_path_length(d) == 5
+
+
+def test_run_job():
+    assert run_job(diamond(6, width=2)) > 0
+
+
+def test_graph_setup_and_checkpoint():
+    assert set(bench_graph_setup(20).keys()) >= {'graph_setup.wide_20.add_seconds_per_task'}
+    results = bench_checkpoint([10], repeats=1)
+    assert results['checkpoint.dict_10.bytes'] > 0
+    assert results['checkpoint.manager_10.write_seconds'] > 0
+
+
+def test_memory():
+    results = bench_memory(50)
+    assert results['memory.chain_50.job_bytes_per_task'] > 0
+    assert results['memory.chain_50.scheduling_bytes_per_task'] > 0
+
+
+def test_compare():
+    baseline = {'results': {'a.write_seconds': 1.0, 'b.lines_per_second': 100.0, 'c.bytes': 10, 'only_before': 1.0}}
+    current = {'results': {'a.write_seconds': 1.5, 'b.lines_per_second': 200.0, 'c.bytes': 10}}
+    rows, regressions = compare(baseline, current, threshold=0.25)
+    assert [r['metric'] for r in rows] == ['a.write_seconds', 'b.lines_per_second', 'c.bytes']
+    assert regressions == ['a.write_seconds']
+
+
+def test_cli_compare(tmp_path, capsys):
+    out = tmp_path / 'results.json'
+    assert main(['benchmark', '-b', 'checkpoint', '-o', str(out)]) == 0
+    results = json.loads(out.read_text())
+    assert 'checkpoint.dict_1000.write_seconds' in results['results']
+    results['results'] = {'checkpoint.dict_0.bytes': 1}
+    baseline = tmp_path / 'baseline.json'
+    baseline.write_text(json.dumps(results))
+    assert main(['benchmark', '-b', 'checkpoint', '--compare', str(baseline)]) == 1
+    assert 'REGRESSED' in capsys.readouterr().out
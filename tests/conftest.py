@@ -5,6 +5,12 @@ import pytest
 from flowmancer.task import Task, task
 
 
+@pytest.fixture(autouse=True)
+def _in_tmp_path(tmp_path, monkeypatch):
+    # Jobs write checkpoints, logs and artifacts relative to the working directory, which must not be the repo's own.
+    monkeypatch.chdir(tmp_path)
+
+
 @pytest.fixture(scope='session')
 def manager():
     return Manager()
@@ -0,0 +1,60 @@
+import asyncio
+from multiprocessing import Process, Queue
+from typing import Any, cast
+
+import pytest
+
+from flowmancer.eventbus import _STOP_RELAY, EventBus
+from flowmancer.eventbus.log import LogWriteEvent, SerializableLogEvent, Severity
+
+
+def _publish(bus: EventBus[SerializableLogEvent]) -> None:
+    bus.put(LogWriteEvent(name='child', severity=Severity.INFO, message='from child'))
+
+
+@pytest.mark.asyncio
+async def test_listen_wakes_on_put():
+    bus = EventBus[SerializableLogEvent]('job')
+    wakeup = bus.listen()
+    assert not wakeup.is_set()
+    bus.put(LogWriteEvent(name='a', severity=Severity.INFO, message='one'))
+    bus.put(LogWriteEvent(name='a', severity=Severity.INFO, message='two'))
+    await asyncio.wait_for(wakeup.wait(), timeout=1)
+    wakeup.clear()
+    assert [bus.get().message for _ in range(2)] == ['one', 'two'] and bus.empty()
+    bus.stop_listening()
+
+
+@pytest.mark.asyncio
+async def test_listen_relays_other_processes():
+    bus = EventBus[SerializableLogEvent]('job', cast(Any, Queue()))
+    wakeup = bus.listen()
+    p = Process(target=_publish, args=(bus,))
+    p.start()
+    await asyncio.wait_for(wakeup.wait(), timeout=10)
+    p.join()
+    bus.put(LogWriteEvent(name='parent', severity=Severity.INFO, message='from parent'))
+    await asyncio.get_running_loop().run_in_executor(None, bus.stop_listening)
+    messages = []
+    while not bus.empty():
+        messages.append(bus.get().message)
+    assert messages == ['from child', 'from parent']
+
+
+@pytest.mark.asyncio
+async def test_stop_listening_leaves_no_sentinel_behind():
+    q: Any = Queue()
+    bus = EventBus[SerializableLogEvent]('job', q)
+    bus.listen()
+    relay = bus._relay
+    assert relay is not None
+    # The relay has gone away on its own, e.g. along with the queue's `Manager`.
+    q.put(_STOP_RELAY)
+    relay.join(10)
+    bus.stop_listening(wait=False)
+    bus.put(LogWriteEvent(name='a', severity=Severity.INFO, message='one'))
+    assert bus.get().message == 'one'
+    # Even a stop that does get left behind is never handed to readers.
+    q.put(_STOP_RELAY)
+    bus.put(LogWriteEvent(name='a', severity=Severity.INFO, message='two'))
+    assert bus.get().message == 'two'
@@ -0,0 +1,31 @@
+import pytest
+
+from flowmancer.eventbus.execution import ExecutionState, ExecutionStateMap
+
+
+def test_state_map_sets():
+    m = ExecutionStateMap()
+    m[ExecutionState.INIT].update(['a', 'b', 'c'])
+    assert m[ExecutionState.INIT] == {'a', 'b', 'c'} and len(m[ExecutionState.INIT]) == 3
+    assert 'a' in m['_'] and not m[ExecutionState.RUNNING]
+    # A task is only ever in one state.
+    m[ExecutionState.RUNNING].add('a')
+    assert 'a' not in m[ExecutionState.INIT] and m.count(ExecutionState.INIT) == 2
+    m.transition('b', ExecutionState.COMPLETED)
+    assert m.state_of('b') == ExecutionState.COMPLETED and m.state_of('x') is None
+    with pytest.raises(KeyError):
+        m[ExecutionState.FAILED].remove('c')
+    m[ExecutionState.INIT].remove('c')
+    assert m.state_of('c') is None and not m[ExecutionState.INIT]
+    m[ExecutionState.INIT].update(m[ExecutionState.RUNNING])
+    assert m[ExecutionState.INIT] == {'a'} and not m[ExecutionState.RUNNING]
+
+
+def test_state_map_simple_dict():
+    m = ExecutionStateMap.from_simple_dict({'C': {'a', 'b'}, 'F': {'c'}, 'P': set()})
+    assert m.to_simple_dict() == {'C': {'a', 'b'}, 'F': {'c'}}
+    completed = m[ExecutionState.COMPLETED].copy()
+    m[ExecutionState.COMPLETED].clear()
+    assert completed == {'a', 'b'} and m.count(ExecutionState.COMPLETED) == 0
+    m[ExecutionState.PENDING] = {'c'}
+    assert m.to_simple_dict() == {'P': {'c'}}
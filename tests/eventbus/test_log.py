@@ -1,8 +1,20 @@
+import threading
 from datetime import datetime
-from typing import cast
+from queue import Queue
+from typing import Any, List, cast
+
+import pytest
 
 from flowmancer.eventbus import EventBus, SerializableEvent
-from flowmancer.eventbus.log import LogEndEvent, LogStartEvent, LogWriteEvent, LogWriter, SerializableLogEvent, Severity
+from flowmancer.eventbus.log import (
+    LogEndEvent,
+    LogStartEvent,
+    LogWriteEvent,
+    LogWriter,
+    SerializableLogEvent,
+    Severity,
+    TaskLogWriterWrapper,
+)
 
 
 def test_enum_is_preserved():
@@ -61,3 +73,67 @@ def test_job_name_injected_on_get():
     assert bus.get().job_name == 'custom-job-name'
     assert bus.get().job_name == 'custom-job-name'
     assert bus.get().job_name == 'custom-job-name'
+
+
+def test_log_writer_overflow():
+    bus = EventBus[SerializableLogEvent]('job', capacity=3)
+    bus.overflow = 'drop_debug'
+    w = LogWriter('a', bus)
+    for m in ('one', 'two', 'three'):
+        w.emit_log_write_event(m, Severity.DEBUG)
+    assert w.dropped == 1 and w.blocked == 0
+    while not bus.empty():
+        bus.get()
+    bus.overflow = 'sample'
+    bus.sample_every = 3
+    assert [w._droppable(Severity.INFO) for _ in range(6)] == [False, True, True, False, True, True]
+
+
+@pytest.mark.asyncio
+async def test_shared_bus_is_written_off_the_loop():
+    class SharedQueue:
+        # Stands in for a Manager-proxied queue, each call on which is a round trip to another process.
+        def __init__(self) -> None:
+            self.q: Queue[str] = Queue()
+            self.threads: List[int] = []
+
+        def put_nowait(self, m: str) -> None:
+            self.threads.append(threading.get_ident())
+            self.q.put_nowait(m)
+
+        def __getattr__(self, name: str) -> Any:
+            return getattr(self.q, name)
+
+    q = SharedQueue()
+    bus = EventBus[SerializableLogEvent]('job', cast(Any, q))
+    assert bus.is_shared
+    w = LogWriter('a', bus)
+    for m in ('one', 'two', 'three'):
+        await w.emit_log_write_event_async(m, Severity.INFO)
+    assert q.threads and threading.get_ident() not in q.threads
+    w.close()
+    events = []
+    while not bus.empty():
+        events.append(bus.get())
+    assert [e.message for e in events if isinstance(e, LogWriteEvent)] == ['one', 'two', 'three']
+    assert w._executor is None
+
+
+def test_min_severity_filters_before_formatting():
+    class Costly:
+        formatted = 0
+
+        def __str__(self) -> str:
+            Costly.formatted += 1
+            return 'costly'
+
+    bus = EventBus[SerializableLogEvent]('job')
+    logger = TaskLogWriterWrapper(LogWriter('a', bus, Severity.WARNING))
+    assert not logger.is_enabled_for(Severity.INFO) and logger.is_enabled_for('ERROR')
+    logger.debug('value: %s', Costly())
+    logger.info('value: %s', Costly())
+    logger.warning('value: %s', Costly())
+    assert Costly.formatted == 1
+    assert isinstance(bus.get(), LogStartEvent)
+    e = cast(LogWriteEvent, bus.get())
+    assert e.severity == Severity.WARNING and e.message == 'value: costly' and bus.empty()
@@ -0,0 +1,67 @@
+import asyncio
+
+import pytest
+
+from flowmancer.eventbus.execution import ExecutionState, ExecutionStateTransition, JobInstrumentation
+from flowmancer.extensions.dispatch import ExtensionQueue
+
+
+def _transition(name: str, to_state: ExecutionState) -> ExecutionStateTransition:
+    return ExecutionStateTransition(name=name, from_state=ExecutionState.INIT, to_state=to_state)
+
+
+async def _drain(q: ExtensionQueue):
+    q.close()
+    out = []
+    while True:
+        item = await q.get()
+        if item is None:
+            return out
+        out.append(item[0])
+
+
+@pytest.mark.asyncio
+async def test_drop_oldest():
+    q = ExtensionQueue(2, 'drop_oldest')
+    for name in ('a', 'b', 'c'):
+        await q.put(_transition(name, ExecutionState.PENDING))
+    assert q.dropped == 1
+    assert [e.name for e in await _drain(q)] == ['b', 'c']
+
+
+@pytest.mark.asyncio
+async def test_coalesce():
+    q = ExtensionQueue(2, 'coalesce')
+    await q.put(_transition('a', ExecutionState.PENDING))
+    await q.put(JobInstrumentation(loop_lag_seconds_max=1, loop_lag_seconds_mean=1))
+    # Replaces the queued transition of `a` in place.
+    await q.put(_transition('a', ExecutionState.RUNNING))
+    # Nothing of the same kind is queued for `b`, so the oldest event is discarded.
+    await q.put(_transition('b', ExecutionState.PENDING))
+    assert q.dropped == 2
+    events = await _drain(q)
+    assert isinstance(events[0], JobInstrumentation)
+    assert (events[1].name, events[1].to_state) == ('b', ExecutionState.PENDING)
+
+
+@pytest.mark.asyncio
+async def test_block():
+    q = ExtensionQueue(1, 'block')
+    await q.put(_transition('a', ExecutionState.PENDING))
+    put = asyncio.create_task(q.put(_transition('b', ExecutionState.PENDING)))
+    await asyncio.sleep(0.05)
+    assert not put.done()
+    item = await q.get()
+    assert item is not None and item[0].name == 'a'
+    await asyncio.wait_for(put, 1)
+    assert q.dropped == 0
+    assert [e.name for e in await _drain(q)] == ['b']
+
+
+@pytest.mark.asyncio
+async def test_block_offer_holds_back():
+    q = ExtensionQueue(1, 'block')
+    for name in ('a', 'b', 'c'):
+        q.offer(_transition(name, ExecutionState.PENDING))
+    assert len(q) == 3 and q.dropped == 0
+    assert [e.name for e in await _drain(q)] == ['a', 'b', 'c']
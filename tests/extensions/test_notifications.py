@@ -0,0 +1,203 @@
+import asyncio
+import json
+import socketserver
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List
+
+import pytest
+
+from flowmancer.extensions.notifications.email import EmailNotification
+from flowmancer.extensions.notifications.notification import Notification
+from flowmancer.extensions.notifications.pushover import PushoverNotification
+from flowmancer.extensions.notifications.slack import SlackWebhookNotification
+
+
+class _StubHttpServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, statuses: List[int]) -> None:
+        super().__init__(('127.0.0.1', 0), _StubHttpHandler)
+        # Status to respond with for each request in turn; 200 once exhausted.
+        self.statuses = statuses
+        self.bodies: List[bytes] = []
+        self.connections = set()
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self.server_address[1]}/hook'
+
+
+class _StubHttpHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server: _StubHttpServer
+
+    def do_POST(self) -> None:
+        self.server.connections.add(self.client_address)
+        self.server.bodies.append(self.rfile.read(int(self.headers['Content-Length'])))
+        status = self.server.statuses.pop(0) if self.server.statuses else 200
+        self.send_response(status)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'ok')
+
+    def log_message(self, *_) -> None:
+        pass
+
+
+class _StubSmtpHandler(socketserver.StreamRequestHandler):
+    def _reply(self, line: str) -> None:
+        self.wfile.write(f'{line}\r\n'.encode())
+
+    def handle(self) -> None:
+        self.server.connections += 1  # type: ignore
+        self._reply('220 stub')
+        while True:
+            line = self.rfile.readline().decode().strip()
+            cmd = line.split(' ')[0].upper()
+            if not line or cmd == 'QUIT':
+                self._reply('221 bye')
+                return
+            if cmd == 'DATA':
+                self._reply('354 go ahead')
+                data = []
+                while True:
+                    d = self.rfile.readline().decode()
+                    if d.strip() == '.':
+                        break
+                    data.append(d)
+                self.server.messages.append(''.join(data))  # type: ignore
+            self._reply('250 ok')
+
+
+class _StubSmtpServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+
+    def __init__(self) -> None:
+        super().__init__(('127.0.0.1', 0), _StubSmtpHandler)
+        self.messages: List[str] = []
+        self.connections = 0
+
+
+def _serve(server):
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+@pytest.fixture
+def http_server():
+    server = _serve(_StubHttpServer([]))
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def smtp_server():
+    server = _serve(_StubSmtpServer())
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+async def _run_job(n: Notification, success: bool = True) -> None:
+    await n.on_create()
+    if success:
+        await n.on_success()
+    else:
+        await n.on_failure()
+    await n.on_destroy()
+
+
+@pytest.mark.asyncio
+async def test_slack_digest(http_server):
+    n = SlackWebhookNotification(webhook=http_server.url, digest_window_seconds=0.2)
+    await _run_job(n)
+    # The start and end of a short job arrive together as one digest.
+    assert len(http_server.bodies) == 1
+    body = json.loads(http_server.bodies[0])
+    assert body['text'] == 'Flowmancer Job Notification: STARTING (+1 more)'
+    assert 'SUCCESS' in body['attachments'][0]['text']
+
+
+@pytest.mark.asyncio
+async def test_pushover_retry_and_pooling(http_server):
+    http_server.statuses = [503, 500]
+    n = PushoverNotification(
+        app_token='t', user_key='u', api_url=http_server.url, digest_window_seconds=0, retry_backoff_seconds=0.01
+    )
+    await n.on_create()
+    await asyncio.sleep(0.3)
+    await n.on_failure()
+    await n.on_destroy()
+    # Two failed attempts, then the start and failure notifications over the one pooled connection.
+    assert len(http_server.bodies) == 4
+    assert b'title=Flowmancer+Job+Notification%3A+FAILURE' in http_server.bodies[-1]
+    assert len(http_server.connections) == 1
+
+
+@pytest.mark.asyncio
+async def test_rejected_notification_is_not_retried(http_server, capsys):
+    http_server.statuses = [403]
+    n = SlackWebhookNotification(webhook=http_server.url, notify_on_success=False, retry_backoff_seconds=0.01)
+    await _run_job(n)
+    assert len(http_server.bodies) == 1
+    assert 'rejected' in capsys.readouterr().out
+
+
+@pytest.mark.asyncio
+async def test_failed_delivery_does_not_block(capsys):
+    n = SlackWebhookNotification(
+        webhook='http://127.0.0.1:9/unreachable', max_retries=1, retry_backoff_seconds=0.01, timeout_seconds=0.5
+    )
+    await n.on_create()
+    # Handing over a notification never waits on its delivery.
+    started = asyncio.get_running_loop().time()
+    await n.on_success()
+    assert asyncio.get_running_loop().time() - started < 0.05
+    await n.on_destroy()
+    assert 'failed after 2 attempts' in capsys.readouterr().out
+
+
+@pytest.mark.asyncio
+async def test_email_reuses_connection(smtp_server):
+    n = EmailNotification(
+        recipient='ops@example.com',
+        smtp_host='127.0.0.1',
+        smtp_port=smtp_server.server_address[1],
+        sender_user='flowmancer',
+        sender_host='example.com',
+        digest_window_seconds=0
+    )
+    await n.on_create()
+    await asyncio.sleep(0.3)
+    await n.on_success()
+    await n.on_destroy()
+    assert len(smtp_server.messages) == 2
+    assert 'Subject: Flowmancer Job Notification: SUCCESS' in smtp_server.messages[1]
+    assert smtp_server.connections == 1
+
+
+class _Unimplemented(Notification):
+    pass
+
+
+class _NotYetImplemented(Notification):
+    calls: int = 0
+
+    def deliver(self, title: str, msg: str) -> None:
+        self.calls += 1
+        raise NotImplementedError('coming soon')
+
+
+def test_notification_must_implement_delivery():
+    with pytest.raises(TypeError, match='deliver'):
+        _Unimplemented()
+
+
+@pytest.mark.asyncio
+async def test_not_implemented_is_not_retried(capsys):
+    n = _NotYetImplemented(notify_on_success=False, digest_window_seconds=0, retry_backoff_seconds=0.01)
+    await _run_job(n)
+    assert n.calls == 1
+    assert 'not implemented' in capsys.readouterr().out
@@ -0,0 +1,61 @@
+import asyncio
+
+import pytest
+
+from flowmancer.eventbus.execution import ExecutionState, ExecutionStateTransition
+from flowmancer.extensions.progressbar import RichProgressBar
+
+_S = 1_000_000_000
+
+
+async def _transition(
+    pb: RichProgressBar, name: str, from_state: ExecutionState, to_state: ExecutionState, at_seconds: float
+) -> None:
+    await pb.update(ExecutionStateTransition(
+        name=name, from_state=from_state, to_state=to_state, monotonic_ns=int(at_seconds * _S)
+    ))
+
+
+@pytest.mark.asyncio
+async def test_progressbar_eta():
+    pb = RichProgressBar(headless=True, summary_interval_seconds=60)
+    await pb.on_create()
+    for i in range(6):
+        await _transition(pb, f't{i}', ExecutionState.INIT, ExecutionState.PENDING, 0)
+    # Two at a time, each taking 10 seconds.
+    for i in range(2):
+        await _transition(pb, f't{i}', ExecutionState.PENDING, ExecutionState.RUNNING, 0)
+    for i in range(2):
+        await _transition(pb, f't{i}', ExecutionState.RUNNING, ExecutionState.COMPLETED, 10)
+    assert pb.eta_seconds() == pytest.approx(4 * 10 / 2)
+    await pb.on_destroy()
+
+
+@pytest.mark.asyncio
+async def test_progressbar_headless(capsys):
+    pb = RichProgressBar(headless=True)
+    await pb.on_create()
+    await asyncio.sleep(0.01)
+    await _transition(pb, 'a', ExecutionState.INIT, ExecutionState.PENDING, 0)
+    await _transition(pb, 'a', ExecutionState.PENDING, ExecutionState.RUNNING, 0)
+    await _transition(pb, 'a', ExecutionState.RUNNING, ExecutionState.FAILED, 1)
+    await pb.on_destroy()
+    lines = capsys.readouterr().out.strip().splitlines()
+    # One summary as it starts and a final one as it ends.
+    assert len(lines) == 2
+    assert lines[-1].startswith('[RichProgressBar] Pending: 0 - Running: 0 - Completed: 0 - Failed: 1 (Elapsed: 0:00')
+    assert 'tasks/min' in lines[-1]
+
+
+@pytest.mark.asyncio
+async def test_progressbar_constant_state():
+    pb = RichProgressBar(headless=True, summary_interval_seconds=60)
+    await pb.on_create()
+    for i in range(10000):
+        await _transition(pb, f't{i}', ExecutionState.INIT, ExecutionState.PENDING, 0)
+        await _transition(pb, f't{i}', ExecutionState.PENDING, ExecutionState.RUNNING, i)
+        await _transition(pb, f't{i}', ExecutionState.RUNNING, ExecutionState.COMPLETED, i + 1)
+    assert not pb._state.running_since
+    assert pb._state.runs_finished == 10000
+    assert 'Completed: 10000' in pb.describe(pb._state.start_time + 1)
+    await pb.on_destroy()
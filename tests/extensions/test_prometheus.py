@@ -0,0 +1,79 @@
+import os
+
+import pytest
+
+from flowmancer.eventbus.execution import (
+    ExecutionState,
+    ExecutionStateTransition,
+    JobInstrumentation,
+    SampleSummary,
+    TaskResourceUsage,
+)
+from flowmancer.extensions.prometheus import PrometheusTextfileExporter
+
+
+def _transition(name: str, from_state: ExecutionState, to_state: ExecutionState) -> ExecutionStateTransition:
+    return ExecutionStateTransition(name=name, from_state=from_state, to_state=to_state, job_name='my-job')
+
+
+async def _run_task(ext: PrometheusTextfileExporter, name: str, retries: int = 0) -> None:
+    await ext.update(_transition(name, ExecutionState.INIT, ExecutionState.PENDING))
+    for _ in range(retries):
+        await ext.update(_transition(name, ExecutionState.PENDING, ExecutionState.RUNNING))
+        await ext.update(_transition(name, ExecutionState.RUNNING, ExecutionState.PENDING))
+    await ext.update(_transition(name, ExecutionState.PENDING, ExecutionState.RUNNING))
+    await ext.update(_transition(name, ExecutionState.RUNNING, ExecutionState.COMPLETED))
+
+
+@pytest.mark.asyncio
+async def test_prometheus_textfile(tmp_path):
+    ext = PrometheusTextfileExporter(directory=str(tmp_path), interval_seconds=60)
+    await ext.on_create()
+    await _run_task(ext, 'a', retries=2)
+    await ext.update(TaskResourceUsage(
+        name='a',
+        wall_seconds=1.0,
+        user_cpu_seconds=0.5,
+        system_cpu_seconds=0.25,
+        max_rss_bytes=1024,
+        voluntary_context_switches=1,
+        involuntary_context_switches=1,
+        job_name='my-job'
+    ))
+    await ext.update(JobInstrumentation(
+        loop_lag_seconds_max=0.02,
+        loop_lag_seconds_mean=0.01,
+        log_bus_depth=3,
+        checkpoint_write_seconds=[0.002, 0.004],
+        update_seconds={'extension:progress-bar': SampleSummary(count=3, total=0.25, max=0.125)},
+        job_name='my-job'
+    ))
+    await ext.on_destroy()
+
+    path = os.path.join(str(tmp_path), 'my-job.prom')
+    assert os.listdir(str(tmp_path)) == ['my-job.prom']
+    with open(path) as f:
+        content = f.read()
+    assert 'flowmancer_tasks{job="my-job",state="completed"} 1' in content
+    assert 'flowmancer_task_retries_total{job="my-job",task="a"} 2' in content
+    assert 'flowmancer_task_duration_seconds_count{job="my-job",task="a"} 3' in content
+    assert 'flowmancer_task_cpu_seconds_total{job="my-job",task="a"} 0.75' in content
+    assert 'flowmancer_task_max_rss_bytes{job="my-job",task="a"} 1024' in content
+    assert 'flowmancer_checkpoint_write_seconds_count{job="my-job"} 2' in content
+    assert 'flowmancer_log_bus_depth{job="my-job"} 3' in content
+    assert 'flowmancer_update_seconds_total{job="my-job",plugin="extension:progress-bar"} 0.25' in content
+    assert 'flowmancer_execution_bus_depth' not in content
+
+
+@pytest.mark.asyncio
+async def test_prometheus_task_label_cardinality(tmp_path):
+    ext = PrometheusTextfileExporter(directory=str(tmp_path), max_task_labels=2)
+    await ext.on_create()
+    for name in ('a', 'b', 'c', 'd'):
+        await _run_task(ext, name)
+    content = ext.render()
+    await ext.on_destroy()
+    assert 'flowmancer_tasks{job="my-job",state="completed"} 4' in content
+    assert 'flowmancer_task_duration_seconds_count{job="my-job",task="a"} 1' in content
+    assert 'flowmancer_task_duration_seconds_count{job="my-job",task="other"} 2' in content
+    assert 'task="c"' not in content
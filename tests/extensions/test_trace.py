@@ -0,0 +1,78 @@
+import json
+import os
+
+import pytest
+
+from flowmancer.eventbus.execution import ExecutionState, ExecutionStateTransition, TaskRetry
+from flowmancer.extensions.trace import ChromeTraceExporter
+
+_MS = 1_000_000
+
+
+def _transition(
+    name: str, from_state: ExecutionState, to_state: ExecutionState, at_ms: int
+) -> ExecutionStateTransition:
+    return ExecutionStateTransition(
+        name=name, from_state=from_state, to_state=to_state, job_name='my-job', monotonic_ns=at_ms * _MS
+    )
+
+
+def _spans(trace, pid=None):
+    return [e for e in trace['traceEvents'] if e['ph'] == 'X' and (pid is None or e['pid'] == pid)]
+
+
+@pytest.mark.asyncio
+async def test_trace_slots(tmp_path):
+    ext = ChromeTraceExporter(directory=str(tmp_path))
+    await ext.on_create()
+    # a and b overlap, c starts once a is done and should reuse its slot.
+    for name in ('a', 'b', 'c'):
+        await ext.update(_transition(name, ExecutionState.INIT, ExecutionState.PENDING, 0))
+    await ext.update(_transition('a', ExecutionState.PENDING, ExecutionState.RUNNING, 1))
+    await ext.update(_transition('b', ExecutionState.PENDING, ExecutionState.RUNNING, 2))
+    await ext.update(_transition('a', ExecutionState.RUNNING, ExecutionState.COMPLETED, 10))
+    await ext.update(_transition('c', ExecutionState.PENDING, ExecutionState.RUNNING, 11))
+    await ext.update(_transition('b', ExecutionState.RUNNING, ExecutionState.FAILED, 20))
+    await ext.update(_transition('c', ExecutionState.RUNNING, ExecutionState.COMPLETED, 30))
+    await ext.on_destroy()
+
+    assert os.listdir(str(tmp_path)) == ['my-job.trace.json']
+    with open(os.path.join(str(tmp_path), 'my-job.trace.json')) as f:
+        trace = json.load(f)
+    running = {e['name']: e for e in _spans(trace, pid=1)}
+    assert running['a']['tid'] == 1 and running['a']['ts'] == 1000.0 and running['a']['dur'] == 9000.0
+    assert running['b']['tid'] == 2 and running['b']['args']['state'] == 'failed'
+    assert running['c']['tid'] == 1
+    assert {e['name'] for e in _spans(trace, pid=2)} == {'a', 'b', 'c'}
+    threads = {(e['pid'], e['tid']) for e in trace['traceEvents'] if e['name'] == 'thread_name'}
+    assert {(1, 1), (1, 2)} <= threads
+
+
+@pytest.mark.asyncio
+async def test_trace_retry_and_unfinished(tmp_path):
+    ext = ChromeTraceExporter(directory=str(tmp_path))
+    await ext.on_create()
+    await ext.update(_transition('a', ExecutionState.INIT, ExecutionState.PENDING, 0))
+    await ext.update(_transition('a', ExecutionState.PENDING, ExecutionState.RUNNING, 1))
+    await ext.update(_transition('a', ExecutionState.RUNNING, ExecutionState.PENDING, 5))
+    await ext.update(TaskRetry(name='a', attempt=1, backoff_seconds=0.002, job_name='my-job', monotonic_ns=5 * _MS))
+    await ext.update(_transition('a', ExecutionState.PENDING, ExecutionState.RUNNING, 8))
+    await ext.update(_transition('b', ExecutionState.INIT, ExecutionState.PENDING, 9))
+    await ext.update(_transition('b', ExecutionState.PENDING, ExecutionState.DEFAULTED, 9))
+    await ext.on_destroy()
+
+    trace = ext.render()
+    attempts = sorted((e for e in _spans(trace, pid=1)), key=lambda e: e['ts'])
+    assert [e['args']['attempt'] for e in attempts] == [1, 2]
+    assert attempts[0]['args']['state'] == 'failed'
+    assert attempts[1]['args']['state'] == 'unfinished'
+    backoff = [e for e in _spans(trace) if e['cat'] == 'backoff']
+    assert len(backoff) == 1 and backoff[0]['ts'] == 5000.0 and backoff[0]['dur'] == 2000.0
+    assert [e['name'] for e in trace['traceEvents'] if e['ph'] == 'i'] == ['b defaulted']
+
+
+def test_event_timestamps_taken_on_creation():
+    first = TaskRetry(name='a', attempt=1, backoff_seconds=0)
+    second = TaskRetry(name='a', attempt=1, backoff_seconds=0)
+    assert second.monotonic_ns > first.monotonic_ns
+    assert second.timestamp >= first.timestamp
@@ -0,0 +1,237 @@
+import asyncio
+import socket
+import sys
+
+import pytest
+
+from flowmancer.eventbus import EventBus
+from flowmancer.eventbus.execution import ExecutionState, SerializableExecutionEvent
+from flowmancer.eventbus.log import LogWriteEvent, SerializableLogEvent
+from flowmancer.executor import Executor
+from flowmancer.flowmancer import Flowmancer
+from flowmancer.jobdefinition import RemoteDefinition
+from flowmancer.remote import RemoteDispatcher, WorkerAgent
+from flowmancer.remote.protocol import Connection, MessageType
+from flowmancer.task import Task, task
+
+
+@task
+class RemoteExitTask(Task):
+    def run(self) -> None:
+        self.shared_dict['runs'] = self.shared_dict.get('runs', 0) + 1
+        sys.exit(3)
+
+
+@task
+class RemoteArtifactTask(Task):
+    def run(self) -> None:
+        self.artifacts.put('data', b'abc')
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+async def _run_with_workers(coro, port: int, count: int):
+    agents = [
+        asyncio.create_task(WorkerAgent('127.0.0.1', port, slots=2, reconnect_interval_seconds=0.1).run())
+        for _ in range(count)
+    ]
+    try:
+        return await coro
+    finally:
+        for a in agents:
+            a.cancel()
+        await asyncio.gather(*agents, return_exceptions=True)
+
+
+@pytest.mark.asyncio
+async def test_remote_job_success(success_task_cls):
+    port = _free_port()
+    f = Flowmancer(test=True)
+    f._config.remote = RemoteDefinition(port=port)
+    f.add_executor(name='a', task_class=success_task_cls)
+    f.add_executor(name='b', task_class=success_task_cls)
+    f.add_executor(name='c', task_class=success_task_cls, deps=['a', 'b'])
+    retcode = await _run_with_workers(f._initiate(), port, 2)
+    assert retcode == 0
+    assert len(f._states[ExecutionState.COMPLETED]) == 3
+    assert f._shared_dict['myvar'] == 'success'
+
+
+@pytest.mark.asyncio
+async def test_remote_job_failure_retries(fail_task_cls):
+    port = _free_port()
+    f = Flowmancer(test=True)
+    f._config.remote = RemoteDefinition(port=port)
+    f.add_executor(name='a', task_class=fail_task_cls, max_attempts=2)
+    retcode = await _run_with_workers(f._initiate(), port, 1)
+    assert retcode == 1
+    assert f._executors['a'].instance.state == ExecutionState.FAILED
+    assert f._shared_dict['fail_counter'] == 2
+
+
+@pytest.mark.asyncio
+async def test_remote_logs_are_streamed(manager):
+    dispatcher = RemoteDispatcher(port=0)
+    await dispatcher.start()
+    log_bus = EventBus[SerializableLogEvent]('flowmancer', manager.Queue())
+    ex = Executor('Test', 'WriteAllLogTypes', log_bus, EventBus[SerializableExecutionEvent]('flowmancer'))
+    ex.dispatcher = dispatcher
+    ex.init_event()
+    try:
+        await _run_with_workers(ex.start(), dispatcher.port, 1)
+    finally:
+        await dispatcher.stop()
+    messages = []
+    while not log_bus.empty():
+        e = log_bus.get()
+        if isinstance(e, LogWriteEvent):
+            messages.append(e.message)
+    assert ex.state == ExecutionState.FAILED
+    assert messages[:6] == ['stdout', 'info', 'debug', 'warning', 'error', 'critical']
+
+
+@pytest.mark.asyncio
+async def test_lost_worker_is_reassigned(success_task_cls):
+    dispatcher = RemoteDispatcher(port=0)
+    await dispatcher.start()
+    shared_dict = dict()
+    ex = Executor('Test', success_task_cls, None, None, shared_dict=shared_dict)
+    ex.dispatcher = dispatcher
+    ex.init_event()
+
+    # A misbehaving worker that accepts the dispatch and then drops off the network.
+    reader, writer = await asyncio.open_connection('127.0.0.1', dispatcher.port)
+    conn = Connection(reader, writer)
+    await conn.send(MessageType.HELLO, worker_id='flaky', slots=1)
+    await conn.receive()
+    start = asyncio.create_task(ex.start())
+    msg = await conn.receive()
+    assert msg is not None and msg['type'] == MessageType.DISPATCH.value
+    conn.close()
+
+    try:
+        await _run_with_workers(start, dispatcher.port, 1)
+    finally:
+        await dispatcher.stop()
+    assert ex.state == ExecutionState.COMPLETED
+    assert shared_dict['myvar'] == 'success'
+
+
+@pytest.mark.asyncio
+async def test_invalid_token_is_rejected():
+    dispatcher = RemoteDispatcher(port=0, token='secret')
+    await dispatcher.start()
+    try:
+        reader, writer = await asyncio.open_connection('127.0.0.1', dispatcher.port)
+        conn = Connection(reader, writer)
+        await conn.send(MessageType.HELLO, worker_id='intruder', slots=1, token='wrong')
+        msg = await conn.receive()
+        conn.close()
+    finally:
+        await dispatcher.stop()
+    assert msg is not None and msg['type'] == MessageType.REJECT.value
+    assert not dispatcher.workers
+
+
+@pytest.mark.asyncio
+async def test_no_worker_times_out(success_task_cls):
+    dispatcher = RemoteDispatcher(port=0, worker_wait_timeout_seconds=0.1)
+    await dispatcher.start()
+    ex = Executor('Test', success_task_cls, None, None)
+    ex.dispatcher = dispatcher
+    ex.init_event()
+    try:
+        await asyncio.wait_for(ex.start(), 5)
+    finally:
+        await dispatcher.stop()
+    assert ex.state == ExecutionState.FAILED
+
+
+@pytest.mark.asyncio
+async def test_unserializable_parameters_fail_without_dispatch(manager, success_task_cls):
+    dispatcher = RemoteDispatcher(port=0, worker_wait_timeout_seconds=0.1)
+    await dispatcher.start()
+    log_bus = EventBus[SerializableLogEvent]('flowmancer', manager.Queue())
+    ex = Executor('Test', success_task_cls, log_bus, None, parameters={'when': object()}, max_attempts=3)
+    ex.dispatcher = dispatcher
+    ex.init_event()
+    try:
+        await asyncio.wait_for(ex.start(), 5)
+    finally:
+        await dispatcher.stop()
+    messages = []
+    while not log_bus.empty():
+        e = log_bus.get()
+        if isinstance(e, LogWriteEvent):
+            messages.append(e.message)
+    assert ex.state == ExecutionState.FAILED
+    # Not retried, as the parameters would be no more serializable the next time around.
+    assert messages == ['Values sent to remote workers must be JSON serializable: parameters.when.']
+
+
+@pytest.mark.asyncio
+async def test_remote_tasks_have_no_artifacts(manager):
+    dispatcher = RemoteDispatcher(port=0)
+    await dispatcher.start()
+    log_bus = EventBus[SerializableLogEvent]('flowmancer', manager.Queue())
+    ex = Executor('Test', 'RemoteArtifactTask', log_bus, None)
+    # A coordinator-side path, which must not be used by the worker.
+    ex.artifact_directory = '/nonexistent/artifacts'
+    ex.dispatcher = dispatcher
+    ex.init_event()
+    try:
+        await _run_with_workers(ex.start(), dispatcher.port, 1)
+    finally:
+        await dispatcher.stop()
+    messages = []
+    while not log_bus.empty():
+        e = log_bus.get()
+        if isinstance(e, LogWriteEvent):
+            messages.append(e.message)
+    assert ex.state == ExecutionState.FAILED
+    assert any('ArtifactsUnavailableError' in m for m in messages)
+
+
+@pytest.mark.asyncio
+async def test_remote_exit_code_fails_task():
+    port = _free_port()
+    f = Flowmancer(test=True)
+    f._config.remote = RemoteDefinition(port=port)
+    f.add_executor(name='a', task_class='RemoteExitTask', max_attempts=3, retry_on=[3])
+    retcode = await _run_with_workers(f._initiate(), port, 1)
+    assert retcode == 1
+    assert f._executors['a'].instance.state == ExecutionState.FAILED
+    # Exit code 3 is covered by `retry_on`, so every attempt is made.
+    assert f._shared_dict['runs'] == 3
+
+
+@pytest.mark.asyncio
+async def test_remote_failure_outside_retry_on_is_not_retried():
+    port = _free_port()
+    f = Flowmancer(test=True)
+    f._config.remote = RemoteDefinition(port=port)
+    f.add_executor(name='a', task_class='RemoteExitTask', max_attempts=3, retry_on=[4])
+    retcode = await _run_with_workers(f._initiate(), port, 1)
+    assert retcode == 1
+    assert f._shared_dict['runs'] == 1
+
+
+@pytest.mark.asyncio
+async def test_stop_ends_worker_connections_cleanly():
+    errors = []
+    asyncio.get_running_loop().set_exception_handler(lambda _, ctx: errors.append(ctx))
+    dispatcher = RemoteDispatcher(port=0)
+    await dispatcher.start()
+    reader, writer = await asyncio.open_connection('127.0.0.1', dispatcher.port)
+    conn = Connection(reader, writer)
+    await conn.send(MessageType.HELLO, worker_id='idle', slots=1)
+    await conn.receive()
+    await dispatcher.stop()
+    conn.close()
+    # Connection handlers are done with by the time `stop` returns, rather than left to be cancelled with the loop.
+    assert not dispatcher._handlers
+    assert not errors
@@ -0,0 +1,126 @@
+import asyncio
+import sys
+import time
+from typing import List, Tuple
+
+import pytest
+
+from flowmancer.eventbus import EventBus
+from flowmancer.eventbus.execution import ExecutionState, SerializableExecutionEvent, TaskRetry
+from flowmancer.eventbus.log import LogEndEvent, LogWriteEvent, SerializableLogEvent, Severity
+from flowmancer.executor import Executor
+from flowmancer.flowmancer import Flowmancer
+from flowmancer.jobdefinition import JobDefinition, TaskDefinition
+from flowmancer.loggers.logger import Logger
+from flowmancer.tasks import CommandTask
+
+
+def _logs(bus: EventBus[SerializableLogEvent]) -> List[Tuple[str, str]]:
+    lines = []
+    while not bus.empty():
+        m = bus.get()
+        if isinstance(m, LogWriteEvent):
+            lines.extend((line, m.severity) for line in m.message.split('\n'))
+    return lines
+
+
+@pytest.mark.asyncio
+async def test_command_output_is_logged():
+    bus = EventBus[SerializableLogEvent]('flowmancer')
+    code = 'import sys; print("out 1"); print("out 2"); print("err", file=sys.stderr)'
+    ex = Executor('cmd', CommandTask, bus, parameters={'argv': [sys.executable, '-c', code]})
+    ex.init_event()
+    await ex.start()
+    assert ex.state == ExecutionState.COMPLETED
+    # Run on the loop itself rather than in a process of its own.
+    assert ex.proc is None
+    lines = _logs(bus)
+    assert ('out 1', Severity.INFO) in lines and ('out 2', Severity.INFO) in lines
+    assert ('err', Severity.ERROR) in lines
+
+
+@pytest.mark.asyncio
+async def test_command_env_and_cwd(tmp_path):
+    bus = EventBus[SerializableLogEvent]('flowmancer')
+    code = 'import os; print(os.environ["GREETING"]); print(os.getcwd())'
+    ex = Executor('cmd', CommandTask, bus, parameters={
+        'argv': [sys.executable, '-c', code], 'env': {'GREETING': 'hello'}, 'cwd': str(tmp_path)
+    })
+    ex.init_event()
+    await ex.start()
+    lines = _logs(bus)
+    assert ('hello', Severity.INFO) in lines and (str(tmp_path), Severity.INFO) in lines
+
+
+@pytest.mark.asyncio
+async def test_command_exit_code_fails_and_retries():
+    bus = EventBus[SerializableExecutionEvent]('flowmancer')
+    ex = Executor(
+        'cmd', CommandTask, None, bus, max_attempts=2, parameters={'argv': [sys.executable, '-c', 'exit(3)']}
+    )
+    ex.init_event()
+    await ex.start()
+    assert ex.state == ExecutionState.FAILED
+    retries = []
+    while not bus.empty():
+        e = bus.get()
+        if isinstance(e, TaskRetry):
+            retries.append(e.attempt)
+    assert retries == [1]
+
+
+@pytest.mark.asyncio
+async def test_command_timeout():
+    log_bus = EventBus[SerializableLogEvent]('flowmancer')
+    ex = Executor('cmd', CommandTask, log_bus, parameters={
+        'argv': [sys.executable, '-c', 'import time; time.sleep(30)'], 'timeout_seconds': 0.5
+    })
+    ex.init_event()
+    started = time.monotonic()
+    await ex.start()
+    assert ex.state == ExecutionState.FAILED and time.monotonic() - started < 10
+    assert any('CommandTimeoutError' in line for line, _ in _logs(log_bus))
+
+
+@pytest.mark.asyncio
+async def test_command_abort():
+    log_bus = EventBus[SerializableLogEvent]('flowmancer')
+    ex = Executor('cmd', CommandTask, log_bus, parameters={
+        'argv': [sys.executable, '-c', 'import time; time.sleep(30)']
+    })
+    ex.init_event()
+    t = asyncio.create_task(ex.start())
+    await ex.wait_started()
+    await asyncio.sleep(0.2)
+    started = time.monotonic()
+    t.cancel()
+    await asyncio.gather(t, return_exceptions=True)
+    assert ex.state == ExecutionState.ABORTED and time.monotonic() - started < 5
+    ended = []
+    while not log_bus.empty():
+        ended.append(isinstance(log_bus.get(), LogEndEvent))
+    assert ended[-1]
+
+
+@pytest.mark.asyncio
+async def test_command_job_with_full_log_bus(tmp_path, monkeypatch):
+    class Recorder(Logger):
+        lines: List[str] = []
+
+        async def update(self, m: SerializableLogEvent) -> None:
+            if isinstance(m, LogWriteEvent):
+                self.lines.extend(m.message.split('\n'))
+
+    monkeypatch.chdir(tmp_path)
+    f = Flowmancer()
+    code = 'import time\nfor i in range(2000):\n    print(i, flush=True)\n    if not i % 100:\n        time.sleep(0.01)'
+    j = JobDefinition(tasks={
+        'cmd': TaskDefinition(task='CommandTask', parameters={'argv': [sys.executable, '-c', code]})
+    })
+    j.config.log_bus_size = 2
+    f.load_job_definition(j, '.')
+    recorder = Recorder()
+    f._registered_loggers = {'recorder': recorder}
+    f._registered_extensions = dict()
+    assert await asyncio.wait_for(f._initiate(), 60) == 0
+    assert [line for line in recorder.lines if line.isdigit()] == [str(i) for i in range(2000)]
@@ -0,0 +1,104 @@
+import asyncio
+import sqlite3
+import time
+from contextlib import closing
+from typing import Dict, List
+
+import pytest
+
+from flowmancer.eventbus import EventBus
+from flowmancer.eventbus.execution import ExecutionState
+from flowmancer.eventbus.log import LogWriteEvent, SerializableLogEvent
+from flowmancer.executor import Executor
+from flowmancer.tasks import FileSensor, Sensor, SQLiteRowSensor
+from flowmancer.task import task
+
+
+@task
+class CountingSensor(Sensor):
+    succeed_after: int = 3
+
+    async def poke(self) -> bool:
+        pokes = self.shared_dict.setdefault('pokes', [])
+        pokes.append(time.monotonic())
+        return len(pokes) >= self.succeed_after
+
+
+@pytest.mark.asyncio
+async def test_sensor_backoff():
+    shared: Dict[str, List[float]] = dict()
+    ex = Executor('s', CountingSensor, shared_dict=shared, parameters={
+        'succeed_after': 4, 'poke_interval_seconds': 0.05, 'backoff_factor': 2,
+        'max_poke_interval_seconds': 0.15
+    })
+    ex.init_event()
+    await ex.start()
+    pokes = shared['pokes']
+    assert ex.state == ExecutionState.COMPLETED and len(pokes) == 4
+    gaps = [b - a for a, b in zip(pokes, pokes[1:])]
+    # 0.05, then 0.1, then capped at 0.15.
+    assert gaps[0] < gaps[1] < gaps[2] and gaps[2] < 0.5
+
+
+@pytest.mark.asyncio
+async def test_sensor_timeout():
+    log_bus = EventBus[SerializableLogEvent]('flowmancer')
+    ex = Executor('s', CountingSensor, log_bus, parameters={
+        'succeed_after': 1000, 'poke_interval_seconds': 0.05, 'timeout_seconds': 0.3
+    })
+    ex.init_event()
+    started = time.monotonic()
+    await ex.start()
+    assert ex.state == ExecutionState.FAILED and time.monotonic() - started < 2
+    messages = []
+    while not log_bus.empty():
+        m = log_bus.get()
+        if isinstance(m, LogWriteEvent):
+            messages.append(m.message)
+    assert any('SensorTimeoutError' in m for m in messages)
+
+
+@pytest.mark.asyncio
+async def test_file_sensor_takes_no_slot(tmp_path):
+    # With a single slot, a sensor holding it would keep the task it waits on from ever running.
+    semaphore = asyncio.Semaphore(1)
+    sensor = Executor('s', FileSensor, semaphore=semaphore, parameters={
+        'path': str(tmp_path / 'out' / '*.csv'), 'poke_interval_seconds': 0.05
+    })
+    writer = Executor('w', 'CommandTask', semaphore=semaphore, parameters={
+        'argv': ['sh', '-c', f'sleep 0.2; mkdir -p {tmp_path}/out; touch {tmp_path}/out/a.csv']
+    })
+    for e in (sensor, writer):
+        e.init_event()
+    sensing = asyncio.create_task(sensor.start())
+    await asyncio.sleep(0.1)
+    await asyncio.wait_for(asyncio.gather(writer.start(), sensing), 10)
+    assert sensor.state == ExecutionState.COMPLETED and writer.state == ExecutionState.COMPLETED
+
+
+@pytest.mark.asyncio
+async def test_file_sensor_min_count(tmp_path):
+    for n in ('a', 'b'):
+        (tmp_path / f'{n}.csv').touch()
+    sensor = FileSensor(path=str(tmp_path / '*.csv'), min_count=3)
+    assert not await sensor.poke()
+    (tmp_path / 'c.csv').touch()
+    assert await sensor.poke()
+    assert await FileSensor(path=str(tmp_path / 'a.csv')).poke()
+
+
+@pytest.mark.asyncio
+async def test_sqlite_row_sensor(tmp_path):
+    db = str(tmp_path / 'markers.db')
+    sensor = SQLiteRowSensor(database=db, query='SELECT 1 FROM markers WHERE day = ?', parameters=['2024-01-01'])
+    # Neither the database nor the table exist yet.
+    assert not await sensor.poke()
+    with closing(sqlite3.connect(db)) as conn:
+        conn.execute('CREATE TABLE markers (day TEXT)')
+        conn.commit()
+        assert not await sensor.poke()
+        conn.execute("INSERT INTO markers VALUES ('2024-01-01')")
+        conn.commit()
+    assert await sensor.poke()
+    with pytest.raises(sqlite3.OperationalError):
+        await SQLiteRowSensor(database=db, query='SELEKT').poke()
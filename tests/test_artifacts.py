@@ -0,0 +1,119 @@
+import array
+import os
+
+import pytest
+
+from flowmancer.artifacts import ArtifactChecksumError, ArtifactExistsError, ArtifactNotFoundError, ArtifactStore
+from flowmancer.eventbus.execution import ExecutionState
+from flowmancer.flowmancer import Flowmancer
+from flowmancer.task import Task, task
+
+
+@task
+class ArtifactProducerTask(Task):
+    def run(self) -> None:
+        self.artifacts.put('numbers', array.array('d', [1.5, 2.5, 3.0]))
+
+
+@task
+class ArtifactConsumerTask(Task):
+    def run(self) -> None:
+        view = self.artifacts.get('numbers', verify=True)
+        self.shared_dict['total'] = sum(view)
+        self.shared_dict['remaining'] = os.path.exists(os.path.join(self.artifacts.directory, 'numbers.bin'))
+
+
+@pytest.fixture
+def store(tmp_path):
+    s = ArtifactStore(str(tmp_path / 'artifacts'), 'producer')
+    yield s
+    s.close()
+
+
+def test_put_get_roundtrip(store):
+    m = store.put('payload', b'hello world')
+    assert m.size == 11
+    assert m.producer == 'producer'
+    assert bytes(store.get('payload', verify=True)) == b'hello world'
+    assert store.names() == ['payload']
+
+
+def test_get_restores_format_and_shape(store):
+    data = memoryview(array.array('i', range(6))).cast('B').cast('i', [2, 3])
+    store.put('matrix', data, dtype='int32')
+    m = store.manifest('matrix')
+    assert (m.format, m.shape, m.dtype) == ('i', [2, 3], 'int32')
+    view = store.get('matrix')
+    assert view.shape == (2, 3)
+    assert view.tolist() == [[0, 1, 2], [3, 4, 5]]
+    assert view.readonly
+
+
+def test_empty_artifact(store):
+    store.put('empty', b'')
+    assert bytes(store.get('empty')) == b''
+
+
+def test_missing_and_invalid_names(store):
+    with pytest.raises(ArtifactNotFoundError):
+        store.get('missing')
+    with pytest.raises(ValueError):
+        store.put('../escape', b'x')
+
+
+def test_other_producer_cannot_overwrite(store):
+    store.put('shared', b'a')
+    other = ArtifactStore(store.directory, 'other')
+    with pytest.raises(ArtifactExistsError):
+        other.put('shared', b'b')
+
+
+def test_checksum_mismatch(store):
+    store.put('payload', b'abc')
+    with open(os.path.join(store.directory, 'payload.bin'), 'wb') as f:
+        f.write(b'abd')
+    with pytest.raises(ArtifactChecksumError):
+        store.get('payload', verify=True)
+
+
+def test_delete_produced_by(store):
+    store.put('a', b'1')
+    ArtifactStore(store.directory, 'other').put('b', b'2')
+    assert store.delete_produced_by('producer') == ['a']
+    assert store.names() == ['b']
+
+
+def test_artifacts_handed_downstream_and_collected(tmp_path):
+    f = Flowmancer(test=True)
+    f._config.artifact_directory = str(tmp_path)
+    f.add_executor(name='producer', task_class=ArtifactProducerTask)
+    f.add_executor(name='consumer', task_class=ArtifactConsumerTask, deps=['producer'])
+    retcode = f.start()
+    assert retcode == 0
+    assert len(f._states[ExecutionState.COMPLETED]) == 2
+    assert f._shared_dict['total'] == 7.0
+    assert f._shared_dict['remaining'] is True
+    assert not os.path.exists(os.path.join(str(tmp_path), f._config.name))
+
+
+def test_artifacts_kept_when_consumer_fails(tmp_path, fail_task_cls):
+    f = Flowmancer(test=True)
+    f._config.artifact_directory = str(tmp_path)
+    f.add_executor(name='producer', task_class=ArtifactProducerTask)
+    f.add_executor(name='consumer', task_class=fail_task_cls, deps=['producer'])
+    retcode = f.start()
+    assert retcode == 1
+    assert ArtifactStore(os.path.join(str(tmp_path), f._config.name)).names() == ['numbers']
+
+
+def test_artifacts_collected_once_downstream_completes(tmp_path, fail_task_cls):
+    f = Flowmancer(test=True)
+    f._config.artifact_directory = str(tmp_path)
+    f.add_executor(name='producer', task_class=ArtifactProducerTask)
+    f.add_executor(name='consumer', task_class=ArtifactConsumerTask, deps=['producer'])
+    # Fails the job, which otherwise keeps the artifact directory around for a restart.
+    f.add_executor(name='unrelated', task_class=fail_task_cls)
+    retcode = f.start()
+    assert retcode == 1
+    assert f._shared_dict['total'] == 7.0
+    assert ArtifactStore(os.path.join(str(tmp_path), f._config.name)).names() == []
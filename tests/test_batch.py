@@ -0,0 +1,159 @@
+import asyncio
+import os
+import time
+from typing import Dict, List
+
+import pytest
+
+from flowmancer.batch import BatchDispatcher
+from flowmancer.eventbus import EventBus
+from flowmancer.eventbus.execution import ExecutionState, TaskResourceUsage
+from flowmancer.eventbus.log import LogWriteEvent, SerializableLogEvent
+from flowmancer.executor import Executor
+from flowmancer.flowmancer import Flowmancer
+from flowmancer.jobdefinition import BatchDefinition, JobDefinition, TaskDefinition
+from flowmancer.loggers.logger import Logger
+from flowmancer.task import Task, task
+
+
+@task
+class PidTask(Task):
+    outcome: str = 'succeed'
+
+    def run(self) -> None:
+        self.shared_dict[self.metadata.name] = os.getpid()
+        print(f'running {self.metadata.name}')
+        if self.outcome == 'raise':
+            raise RuntimeError('failed')
+        if self.outcome == 'exit':
+            os._exit(3)
+
+
+def _job(tasks: Dict[str, TaskDefinition], max_size: int) -> Flowmancer:
+    f = Flowmancer()
+    j = JobDefinition(tasks=tasks)
+    j.config.batch = BatchDefinition(max_size=max_size, max_wait_seconds=0.05)
+    f.load_job_definition(j, '.')
+    f._registered_extensions = dict()
+    return f
+
+
+@pytest.mark.asyncio
+async def test_tasks_share_processes(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    f = _job({f't{i}': TaskDefinition(task='PidTask') for i in range(20)}, max_size=10)
+    f._registered_loggers = dict()
+    assert await f._initiate() == 0
+    assert len(f._states[ExecutionState.COMPLETED]) == 20
+    pids = {f._shared_dict[f't{i}'] for i in range(20)}
+    assert len(pids) <= 4
+
+
+@pytest.mark.asyncio
+async def test_batched_tasks_are_isolated(tmp_path, monkeypatch):
+    class Recorder(Logger):
+        seen: List[LogWriteEvent] = []
+
+        async def update(self, m: SerializableLogEvent) -> None:
+            if isinstance(m, LogWriteEvent):
+                self.seen.append(m)
+
+    monkeypatch.chdir(tmp_path)
+    f = _job({
+        'a': TaskDefinition(task='PidTask'),
+        'b': TaskDefinition(task='PidTask', parameters={'outcome': 'raise'}),
+        'c': TaskDefinition(task='PidTask', parameters={'outcome': 'exit'}),
+        'd': TaskDefinition(task='PidTask'),
+        'e': TaskDefinition(task='PidTask', batch=False),
+    }, max_size=10)
+    recorder = Recorder()
+    f._registered_loggers = {'recorder': recorder}
+    assert await f._initiate() == 2
+    assert set(f._states[ExecutionState.FAILED]) == {'b', 'c'}
+    assert set(f._states[ExecutionState.COMPLETED]) == {'a', 'd', 'e'}
+    pids = dict(f._shared_dict)
+    assert pids['a'] == pids['b'] == pids['c']
+    # Run by another process once the one it was batched in died.
+    assert pids['d'] != pids['c']
+    assert pids['e'] not in (pids['a'], pids['d'])
+    # Each task logs under its own name.
+    for name in 'abcde':
+        assert any(m.name == name and m.message == f'running {name}' for m in recorder.seen)
+    assert any(m.name == 'b' and 'RuntimeError' in m.message for m in recorder.seen)
+
+
+@task
+class SlowTask(Task):
+    def run(self) -> None:
+        self.shared_dict[self.metadata.name] = 'started'
+        time.sleep(0.5)
+
+    def on_abort(self) -> None:
+        self.shared_dict[self.metadata.name] = 'aborted'
+
+
+@pytest.mark.asyncio
+async def test_cancelled_batch_skips_remaining_tasks(manager):
+    shared = manager.dict()
+    dispatcher = BatchDispatcher(max_size=3, max_wait_seconds=0.01)
+    executors = [Executor(n, SlowTask, shared_dict=shared, dispatcher=dispatcher) for n in 'abc']
+    running = []
+    for e in executors:
+        e.init_event()
+        running.append(asyncio.create_task(e.start()))
+    await asyncio.sleep(0.3)
+    for t in running:
+        t.cancel()
+    await asyncio.gather(*running, return_exceptions=True)
+    await asyncio.wait_for(dispatcher.stop(), 10)
+    assert all(e.state == ExecutionState.ABORTED for e in executors)
+    assert dict(shared) == {'a': 'aborted'}
+
+
+@pytest.mark.asyncio
+async def test_batched_tasks_run_when_started(manager):
+    shared = manager.dict()
+    dispatcher = BatchDispatcher(max_size=3, max_wait_seconds=0.01)
+    executors = [Executor(n, SlowTask, shared_dict=shared, dispatcher=dispatcher) for n in 'abc']
+    for e in executors:
+        e.init_event()
+    running = asyncio.gather(*(e.start() for e in executors))
+    await asyncio.sleep(0.3)
+    # Only the task the batch's process has got to is running; the others are still waiting for their turn.
+    assert [e.state for e in executors] == [ExecutionState.RUNNING, ExecutionState.PENDING, ExecutionState.PENDING]
+    await asyncio.wait_for(running, 10)
+    await dispatcher.stop()
+    assert all(e.state == ExecutionState.COMPLETED for e in executors)
+
+
+@task
+class SpinTask(Task):
+    seconds: float = 0.0
+
+    def run(self) -> None:
+        until = time.process_time() + self.seconds
+        while time.process_time() < until:
+            pass
+
+
+@pytest.mark.asyncio
+async def test_batched_resource_usage_is_per_task(manager):
+    bus = EventBus[SerializableLogEvent]('flowmancer', manager.Queue())
+    dispatcher = BatchDispatcher(max_size=2, max_wait_seconds=0.05)
+    executors = [
+        Executor('busy', SpinTask, bus, parameters={'seconds': 0.5}, dispatcher=dispatcher),
+        Executor('idle', SpinTask, bus, dispatcher=dispatcher)
+    ]
+    for e in executors:
+        e.init_event()
+    await asyncio.wait_for(asyncio.gather(*(e.start() for e in executors)), 10)
+    await dispatcher.stop()
+    usage = dict()
+    while not bus.empty():
+        e = bus.get()
+        if isinstance(e, TaskResourceUsage):
+            usage[e.name] = e
+    assert usage['busy'].user_cpu_seconds + usage['busy'].system_cpu_seconds >= 0.4
+    # None of the CPU time of the task before it in the same process is counted against it.
+    assert usage['idle'].user_cpu_seconds + usage['idle'].system_cpu_seconds < 0.2
+    assert not usage['busy'].shared_process and usage['idle'].shared_process
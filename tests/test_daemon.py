@@ -0,0 +1,76 @@
+import asyncio
+from pathlib import Path
+from typing import Any, Dict
+
+import pytest
+import yaml
+
+from flowmancer.daemon import FlowmancerDaemon, JobRejectedError, submit_job
+
+
+def _write_jobdef(d: Path, name: str, tasks: Dict[str, Any], **config: Any) -> str:
+    p = d / f'{name}.yaml'
+    p.write_text(yaml.safe_dump({
+        'config': {'name': name, **config},
+        'tasks': tasks,
+        'loggers': {},
+        'extensions': {},
+        'checkpointer': {'checkpointer': 'FileCheckpointer', 'parameters': {'checkpoint_dir': str(d / 'checkpoints')}}
+    }))
+    return str(p)
+
+
+@pytest.mark.asyncio
+async def test_daemon_runs_concurrent_jobs(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    sock = str(tmp_path / 'daemon.sock')
+    daemon = FlowmancerDaemon(sock, max_concurrency=2, app_root_dir=str(tmp_path))
+    await daemon.start()
+    try:
+        ok = _write_jobdef(tmp_path, 'ok', {
+            'a': {'task': 'SuccessTask'},
+            'b': {'task': 'SuccessTask', 'dependencies': ['a']}
+        })
+        bad = _write_jobdef(tmp_path, 'bad', {
+            'a': {'task': 'FailTask'},
+            'b': {'task': 'SuccessTask', 'dependencies': ['a']}
+        })
+        results = await asyncio.gather(submit_job(ok, socket_path=sock), submit_job(bad, socket_path=sock))
+    finally:
+        await daemon.stop()
+    assert results == [0, 2]
+    assert not daemon.running_jobs
+
+
+@pytest.mark.asyncio
+async def test_daemon_rejects_invalid_job(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    sock = str(tmp_path / 'daemon.sock')
+    daemon = FlowmancerDaemon(sock, app_root_dir=str(tmp_path))
+    await daemon.start()
+    try:
+        jobdef = _write_jobdef(tmp_path, 'invalid', {'a': {'task': 'SuccessTask', 'parameters': {'bad': 'fail'}}})
+        with pytest.raises(JobRejectedError):
+            await submit_job(jobdef, socket_path=sock)
+    finally:
+        await daemon.stop()
+
+
+@pytest.mark.asyncio
+async def test_daemon_loads_modules_once(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    ext = tmp_path / 'daemon_once_ext'
+    ext.mkdir()
+    (ext / '__init__.py').write_text('')
+    (ext / 'extra.py').write_text('')
+    sock = str(tmp_path / 'daemon.sock')
+    daemon = FlowmancerDaemon(sock, app_root_dir=str(tmp_path))
+    await daemon.start()
+    try:
+        for name in ('first', 'second'):
+            jobdef = _write_jobdef(tmp_path, name, {'a': {'task': 'SuccessTask'}}, extension_directories=[str(ext)])
+            assert await submit_job(jobdef, socket_path=sock) == 0
+    finally:
+        await daemon.stop()
+    assert capsys.readouterr().out.count('Loading Module: daemon_once_ext.extra') == 1
@@ -1,13 +1,24 @@
+import asyncio
+import os
+import subprocess
+import sys
+import time
 from multiprocessing import Process
 from typing import Any, Dict, List, Tuple, cast
 
 import pytest
 
 from flowmancer.eventbus import EventBus
-from flowmancer.eventbus.execution import ExecutionState, ExecutionStateTransition, SerializableExecutionEvent
+from flowmancer.eventbus.execution import (
+    ExecutionState,
+    ExecutionStateTransition,
+    SerializableExecutionEvent,
+    TaskRetry,
+    TaskTimeout,
+)
 from flowmancer.eventbus.log import LogWriteEvent, SerializableLogEvent, Severity
 from flowmancer.executor import Executor, ProcessResult, exec_task_lifecycle
-from flowmancer.task import _task_classes
+from flowmancer.task import Task, _task_classes, task
 
 
 @pytest.mark.parametrize('c, is_failed', [
@@ -96,10 +107,16 @@ async def test_executor_start_execution_event_bus(c: str, expected: List[Tuple[s
     ex.init_event()
     await ex.start()
     bus_contents = []
+    retries = []
     while not bus.empty():
-        t = cast(ExecutionStateTransition, bus.get())
+        e = bus.get()
+        if isinstance(e, TaskRetry):
+            retries.append(e.attempt)
+            continue
+        t = cast(ExecutionStateTransition, e)
         bus_contents.append((t.from_state, t.to_state))
     assert(bus_contents == expected)
+    assert(retries == ([1] if c == 'FailTask' else []))
 
 
 @pytest.mark.asyncio
@@ -189,3 +206,134 @@ def test_task_log_wrapper_stdout(manager):
         Severity.CRITICAL.value,
         Severity.ERROR.value
     ])
+
+
+@task
+class HangingTask(Task):
+    pid_file: str = ''
+
+    def run(self) -> None:
+        if self.pid_file:
+            child = subprocess.Popen(['sleep', '60'])
+            with open(self.pid_file, 'w') as f:
+                f.write(str(child.pid))
+        while True:
+            time.sleep(0.05)
+
+    def on_abort(self) -> None:
+        print('aborting')
+
+
+def _is_running(pid: int) -> bool:
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            return f.read().rsplit(')', 1)[1].split()[0] != 'Z'
+    except FileNotFoundError:
+        return False
+
+
+@pytest.mark.skipif(not hasattr(os, 'killpg'), reason='Process groups are POSIX only.')
+@pytest.mark.asyncio
+async def test_executor_timeout_kills_process_group(tmp_path, manager):
+    pid_file = tmp_path / 'pid'
+    log_bus = EventBus[SerializableLogEvent]('flowmancer', manager.Queue())
+    bus = EventBus[SerializableExecutionEvent]('flowmancer')
+    ex = Executor('Test', HangingTask, log_bus, bus, max_attempts=2, parameters={'pid_file': str(pid_file)})
+    ex.timeout_seconds = 0.5
+    ex.kill_grace_seconds = 0.5
+    ex.init_event()
+    started = time.monotonic()
+    await asyncio.wait_for(ex.start(), 30)
+    assert ex.state == ExecutionState.FAILED and time.monotonic() - started < 10
+    timeouts, retries = [], []
+    while not bus.empty():
+        e = bus.get()
+        if isinstance(e, TaskTimeout):
+            timeouts.append(e.attempt)
+        elif isinstance(e, TaskRetry):
+            retries.append(e.attempt)
+    assert timeouts == [1, 2] and retries == [1]
+    # The command started by the task was killed along with it.
+    if sys.platform.startswith('linux'):
+        assert not _is_running(int(pid_file.read_text()))
+    messages = []
+    while not log_bus.empty():
+        m = log_bus.get()
+        if isinstance(m, LogWriteEvent):
+            messages.append(m.message)
+    assert 'aborting' in messages
+
+
+@pytest.mark.asyncio
+async def test_executor_timeout_cancels_async_task():
+    bus = EventBus[SerializableExecutionEvent]('flowmancer')
+    ex = Executor('Test', 'CommandTask', None, bus, parameters={'argv': ['sleep', '60']})
+    ex.timeout_seconds = 0.3
+    ex.init_event()
+    await asyncio.wait_for(ex.start(), 10)
+    assert ex.state == ExecutionState.FAILED
+    events = []
+    while not bus.empty():
+        events.append(bus.get())
+    assert any(isinstance(e, TaskTimeout) and e.timeout_seconds == 0.3 for e in events)
+
+
+@pytest.mark.parametrize('retry_on, attempts', [
+    ([], 3),
+    (['RuntimeError'], 3),
+    (['ConnectionError'], 1),
+])
+@pytest.mark.asyncio
+async def test_executor_retry_on(retry_on: List[str], attempts: int, manager):
+    shared = manager.dict()
+    ex = Executor('Test', 'FailTask', None, None, shared_dict=shared, max_attempts=3)
+    ex.retry_on = retry_on
+    ex.init_event()
+    await ex.start()
+    assert ex.state == ExecutionState.FAILED and shared['fail_counter'] == attempts
+
+
+@task
+class ExitTask(Task):
+    code: int = 0
+
+    def run(self) -> None:
+        sys.exit(self.code)
+
+
+@pytest.mark.parametrize('code, retry_on, state, retries', [
+    (0, [], ExecutionState.COMPLETED, []),
+    (3, [], ExecutionState.FAILED, [1]),
+    (3, [4], ExecutionState.FAILED, []),
+    (4, [4], ExecutionState.FAILED, [1]),
+])
+@pytest.mark.asyncio
+async def test_executor_exit_code(code: int, retry_on: List[int], state: ExecutionState, retries: List[int]):
+    bus = EventBus[SerializableExecutionEvent]('flowmancer')
+    ex = Executor('Test', ExitTask, None, bus, max_attempts=2, parameters={'code': code})
+    ex.retry_on = list(retry_on)
+    ex.init_event()
+    await ex.start()
+    assert ex.state == state
+    seen = []
+    while not bus.empty():
+        e = bus.get()
+        if isinstance(e, TaskRetry):
+            seen.append(e.attempt)
+    assert seen == retries
+
+
+@pytest.mark.asyncio
+async def test_executor_exponential_backoff():
+    bus = EventBus[SerializableExecutionEvent]('flowmancer')
+    ex = Executor('Test', 'FailTask', None, bus, max_attempts=4, backoff=0.01)
+    ex.backoff_policy = 'exponential'
+    ex.max_backoff_seconds = 0.03
+    ex.init_event()
+    await ex.start()
+    delays = []
+    while not bus.empty():
+        e = bus.get()
+        if isinstance(e, TaskRetry):
+            delays.append(e.backoff_seconds)
+    assert delays == [0.01, 0.02, 0.03]
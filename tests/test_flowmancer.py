@@ -1,13 +1,35 @@
 import asyncio
+import os
+import subprocess
+import sys
 from datetime import datetime
+from typing import Dict, List
 
 import pytest
 
-from flowmancer.eventbus.execution import ExecutionState, ExecutionStateTransition
-from flowmancer.eventbus.log import LogWriteEvent, Severity
+from flowmancer.checkpointer import CheckpointContents, Checkpointer, NoCheckpointAvailableError
+from flowmancer.eventbus.execution import (
+    ExecutionState,
+    ExecutionStateTransition,
+    JobInstrumentation,
+    SerializableExecutionEvent,
+    TaskLogBackpressure,
+)
+from flowmancer.eventbus.log import LogWriteEvent, SerializableLogEvent, Severity
 from flowmancer.exceptions import NoTasksLoadedError, TaskValidationError
+from flowmancer.executor import Executor
+from flowmancer.extensions.extension import Extension
+from flowmancer.extensions.progressbar import RichProgressBar
 from flowmancer.flowmancer import Flowmancer
-from flowmancer.jobdefinition import JobDefinition, TaskDefinition
+from flowmancer.loggers.logger import Logger
+from flowmancer.jobdefinition import (
+    JobDefinition,
+    LogOverflowPolicy,
+    OutputCapture,
+    SharedStateBackend,
+    TaskDefinition,
+)
+from flowmancer.task import AsyncTask, Task, task
 
 
 # ADD EXECUTOR TESTS
@@ -83,6 +105,36 @@ async def test_synchro_ends():
     await asyncio.gather(*tasks)
 
 
+@pytest.mark.asyncio
+async def test_only_ready_tasks_start(test_task_cls, monkeypatch):
+    started = []
+    start = Executor.start
+
+    def _start(self: Executor):
+        started.append(self.name)
+        return start(self)
+
+    monkeypatch.setattr(Executor, 'start', _start)
+    root_event = asyncio.Event()
+    f = Flowmancer(test=True)
+    f.add_executor(name='a', task_class=test_task_cls)
+    f.add_executor(name='b', task_class=test_task_cls, deps=['a'])
+    f.add_executor(name='c', task_class=test_task_cls, deps=['b'])
+    for dtl in f._executors.values():
+        # Holds every task back from actually running.
+        dtl.instance.semaphore = asyncio.Semaphore(0)
+    tasks = f._init_executors(root_event)
+    await asyncio.sleep(0.01)
+    states = {n: dtl.instance.state for n, dtl in f._executors.items()}
+    # Those waiting on others count as pending, but are not started until they are ready.
+    assert states == {'a': ExecutionState.PENDING, 'b': ExecutionState.PENDING, 'c': ExecutionState.PENDING}
+    assert started == ['a']
+    for t in tasks:
+        t.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    assert all(dtl.instance.state == ExecutionState.ABORTED for dtl in f._executors.values())
+
+
 @pytest.mark.asyncio
 async def test_log_pusher_ends_root_event():
     root_event = asyncio.Event()
@@ -237,3 +289,322 @@ def test_jobdef_empty_tasks():
     f.load_job_definition(j, '.')
     with pytest.raises(NoTasksLoadedError):
         f.start(raise_exception_on_failure=True)
+
+
+# SHARED STATE
+def test_manager_not_started_on_init(success_task_cls):
+    f = Flowmancer(test=True)
+    f.add_executor(name='a', task_class=success_task_cls)
+    assert f._manager is None
+    assert isinstance(f._shared_dict, dict)
+
+
+def test_manager_started_on_run(success_task_cls):
+    f = Flowmancer(test=True)
+    f.add_executor(name='a', task_class=success_task_cls)
+    retcode = f.start()
+    assert retcode == 0
+    assert f._manager is not None
+    assert f._shared_dict['myvar'] == 'success'
+
+
+def test_isolated_shared_state_run(success_task_cls):
+    f = Flowmancer(test=True)
+    f._config.shared_state = SharedStateBackend.ISOLATED
+    f.add_executor(name='a', task_class=success_task_cls)
+    f.add_executor(name='b', task_class=success_task_cls, deps=['a'])
+    retcode = f.start()
+    assert retcode == 0
+    assert f._manager is None
+    assert len(f._states[ExecutionState.COMPLETED]) == 2
+    assert 'myvar' not in f._shared_dict
+
+
+def test_shared_memory_shared_state_run(success_task_cls):
+    f = Flowmancer(test=True)
+    f._config.shared_state = SharedStateBackend.SHARED_MEMORY
+    f.add_executor(name='a', task_class=success_task_cls)
+    retcode = f.start()
+    assert retcode == 0
+    assert f._manager is None
+    # The segment is released after the run, leaving a plain copy of its final contents behind.
+    assert isinstance(f._shared_dict, dict)
+    assert f._shared_dict['myvar'] == 'success'
+
+
+@task
+class LoopOnlyTask(AsyncTask):
+    async def run_async(self) -> None:
+        self.shared_dict[self.metadata.name] = 'done'
+
+
+def test_manager_not_started_without_processes(success_task_cls):
+    f = Flowmancer(test=True)
+    f.add_executor(name='a', task_class='LoopOnlyTask')
+    f.add_executor(name='b', task_class='LoopOnlyTask', deps=['a'])
+    assert f.start() == 0
+    # Every task ran on the loop, so nothing had to be shared with other processes.
+    assert f._manager is None
+    assert f._shared_dict == {'a': 'done', 'b': 'done'}
+
+
+# INSTRUMENTATION
+@pytest.mark.asyncio
+async def test_instrumentation_samples():
+    root_event = asyncio.Event()
+    f = Flowmancer(test=True)
+    f._instrumentation_interval_seconds = 0.05
+    f._checkpoint_write_seconds = [0.01]
+    f._stats.record('update_seconds', 'logger:file', 0.5)
+    tasks = f._init_instrumentation(root_event)
+    await asyncio.sleep(0.3)
+    root_event.set()
+    await asyncio.gather(*tasks)
+    samples = []
+    while not f._execution_event_bus.empty():
+        samples.append(f._execution_event_bus.get())
+    assert samples
+    assert all(isinstance(s, JobInstrumentation) for s in samples)
+    assert samples[0].checkpoint_write_seconds == [0.01]
+    assert samples[0].update_seconds['logger:file'].total == 0.5
+    assert all(not s.update_seconds for s in samples[1:])
+    assert samples[0].loop_lag_seconds_max >= samples[0].loop_lag_seconds_mean >= 0
+
+
+@pytest.mark.asyncio
+async def test_instrumentation_update_timings():
+    class SlowExtension(Extension):
+        async def update(self, _: SerializableExecutionEvent) -> None:
+            await asyncio.sleep(0.01)
+
+    root_event = asyncio.Event()
+    f = Flowmancer()
+    f._registered_extensions['slow'] = SlowExtension()
+    f._states[ExecutionState.INIT].add('a')
+    f._execution_event_bus.put(ExecutionStateTransition(
+        name='a', from_state=ExecutionState.INIT, to_state=ExecutionState.PENDING
+    ))
+    f._execution_event_bus.put(ExecutionStateTransition(
+        name='a', from_state=ExecutionState.PENDING, to_state=ExecutionState.RUNNING
+    ))
+    tasks = f._init_extensions(root_event)
+    root_event.set()
+    await asyncio.gather(*tasks)
+    window = f._stats.take_window()
+    assert window['update_seconds']['extension:slow'].count == 2
+    assert window['update_seconds']['extension:slow'].max >= 0.01
+    assert window['events_drained_per_cycle']['execution'].total == 2
+    assert 'extension:slow' in f._stats.summary()
+    assert f._stats.take_window() == dict()
+
+
+@pytest.mark.asyncio
+async def test_slow_extension_does_not_delay_states():
+    release = asyncio.Event()
+    seen = []
+
+    class StuckExtension(Extension):
+        async def update(self, e: SerializableExecutionEvent) -> None:
+            seen.append(e)
+            await release.wait()
+
+    root_event = asyncio.Event()
+    f = Flowmancer()
+    f._registered_extensions['stuck'] = StuckExtension()
+    f._extension_queue_settings['stuck'] = (1, 'drop_oldest')
+    f._states[ExecutionState.INIT].update({'a', 'b', 'c'})
+    tasks = f._init_extensions(root_event)
+    for names in (['a'], ['b', 'c']):
+        for n in names:
+            f._execution_event_bus.put(ExecutionStateTransition(
+                name=n, from_state=ExecutionState.INIT, to_state=ExecutionState.PENDING
+            ))
+        await asyncio.sleep(0.4)
+    assert f._states[ExecutionState.PENDING] == {'a', 'b', 'c'}
+    assert f._extension_queues['stuck'].dropped == 1
+    release.set()
+    root_event.set()
+    await asyncio.gather(*tasks)
+    assert [e.name for e in seen] == ['a', 'c']
+
+
+@pytest.mark.asyncio
+async def test_checkpoint_written_only_on_state_changes():
+    class CountingCheckpointer(Checkpointer):
+        writes: int = 0
+
+        async def write_checkpoint(self, name: str, content: CheckpointContents) -> None:
+            self.writes += 1
+
+        async def read_checkpoint(self, name: str) -> CheckpointContents:
+            raise NoCheckpointAvailableError()
+
+        async def clear_checkpoint(self, name: str) -> None:
+            pass
+
+    root_event = asyncio.Event()
+    f = Flowmancer(test=True)
+    cp = CountingCheckpointer()
+    f._checkpointer_instance = cp
+    f._checkpointer_interval_seconds = 0.1
+    f._states[ExecutionState.INIT].add('a')
+    tasks = f._init_extensions(root_event) + [f._init_checkpointer(root_event)]
+    await asyncio.sleep(0.3)
+    assert cp.writes == 0
+    f._execution_event_bus.put(ExecutionStateTransition(
+        name='a', from_state=ExecutionState.INIT, to_state=ExecutionState.PENDING
+    ))
+    await asyncio.sleep(0.3)
+    assert cp.writes == 1 and 'a' in f._states[ExecutionState.PENDING]
+    root_event.set()
+    await asyncio.gather(*tasks)
+
+
+@task
+class SpamLogTask(Task):
+    def run(self) -> None:
+        for i in range(200):
+            self.logger.debug(f'debug {i}')
+        self.logger.info('done')
+
+
+@pytest.mark.asyncio
+async def test_full_log_bus_drops_debug(tmp_path, monkeypatch):
+    events = []
+
+    class Recorder(Extension):
+        async def update(self, e: SerializableExecutionEvent) -> None:
+            events.append(e)
+
+    monkeypatch.chdir(tmp_path)
+    f = Flowmancer()
+    f._config.log_bus_size = 2
+    f._config.log_overflow = LogOverflowPolicy.DROP_DEBUG
+    f._registered_loggers = dict()
+    f._registered_extensions['recorder'] = Recorder()
+    f.add_executor(name='spam', task_class='SpamLogTask')
+    assert await f._initiate() == 0
+    backpressure = [e for e in events if isinstance(e, TaskLogBackpressure)]
+    assert len(backpressure) == 1 and backpressure[0].name == 'spam' and backpressure[0].dropped > 0
+
+
+@pytest.mark.asyncio
+async def test_log_level_per_task(tmp_path, monkeypatch):
+    class Recorder(Logger):
+        seen: Dict[str, List[str]] = dict()
+
+        async def update(self, m: SerializableLogEvent) -> None:
+            if isinstance(m, LogWriteEvent):
+                self.seen.setdefault(m.name, []).append(m.message)
+
+    monkeypatch.chdir(tmp_path)
+    f = Flowmancer()
+    j = JobDefinition(tasks={
+        'quiet': TaskDefinition(task='WriteAllLogTypes'),
+        'loud': TaskDefinition(task='WriteAllLogTypes', log_level='DEBUG')
+    })
+    j.config.log_level = Severity.WARNING
+    f.load_job_definition(j, '.')
+    recorder = Recorder()
+    f._registered_loggers = {'recorder': recorder}
+    f._registered_extensions = dict()
+    # Both tasks raise once they have logged.
+    assert await f._initiate() == 2
+    assert [m for m in recorder.seen['quiet'] if m in ('info', 'debug', 'warning', 'error')] == ['warning', 'error']
+    assert 'debug' in recorder.seen['loud'] and 'info' in recorder.seen['loud']
+
+
+@task
+class NativeOutputTask(Task):
+    def run(self) -> None:
+        print('from print')
+        os.write(1, b'from os.write\nsecond line\n')
+        os.write(2, b'from stderr\n')
+        subprocess.run([sys.executable, '-c', 'print("from subprocess")'], check=True)
+
+
+@pytest.mark.asyncio
+async def test_fd_output_capture(tmp_path, monkeypatch):
+    class Recorder(Logger):
+        seen: List[LogWriteEvent] = []
+
+        async def update(self, m: SerializableLogEvent) -> None:
+            if isinstance(m, LogWriteEvent):
+                self.seen.append(m)
+
+    monkeypatch.chdir(tmp_path)
+    f = Flowmancer()
+    j = JobDefinition(tasks={'native': TaskDefinition(task='NativeOutputTask')})
+    j.config.output_capture = OutputCapture.FD
+    f.load_job_definition(j, '.')
+    recorder = Recorder()
+    f._registered_loggers = {'recorder': recorder}
+    f._registered_extensions = dict()
+    assert await f._initiate() == 0
+    lines = [(line, m.severity) for m in recorder.seen for line in m.message.split('\n')]
+    assert ('from print', Severity.INFO) in lines
+    assert ('from os.write', Severity.INFO) in lines and ('second line', Severity.INFO) in lines
+    assert ('from stderr', Severity.ERROR) in lines
+    assert ('from subprocess', Severity.INFO) in lines
+
+
+def test_instrumentation_disabled():
+    f = Flowmancer(test=True)
+    f._instrumentation_interval_seconds = 0
+    assert f._init_instrumentation(asyncio.Event()) == []
+
+
+@pytest.mark.asyncio
+async def test_progress_counts_tasks_waiting_on_dependencies(tmp_path, monkeypatch, success_task_cls):
+    totals = []
+
+    class CountingProgressBar(RichProgressBar):
+        async def update(self, e: SerializableExecutionEvent) -> None:
+            await super().update(e)
+            pending, running, completed, failed = self._counts()
+            if isinstance(e, ExecutionStateTransition) and ExecutionState(e.to_state) == ExecutionState.RUNNING:
+                totals.append((pending, running, completed + failed))
+
+    monkeypatch.chdir(tmp_path)
+    f = Flowmancer()
+    f._registered_loggers = dict()
+    f._registered_extensions = {'progress': CountingProgressBar(headless=True, summary_interval_seconds=60)}
+    for i in range(8):
+        f.add_executor(name=f't{i}', task_class=success_task_cls, deps=[f't{i - 1}'] if i else [])
+    assert await f._initiate() == 0
+    # Tasks still waiting on those before them in the chain are counted as pending throughout.
+    assert totals == [(7 - i, 1, i) for i in range(8)]
+
+
+@pytest.mark.asyncio
+async def test_blocked_extension_does_not_stall_job(tmp_path, monkeypatch, success_task_cls):
+    release = asyncio.Event()
+    seen = []
+
+    class StuckExtension(Extension):
+        async def update(self, e: SerializableExecutionEvent) -> None:
+            await release.wait()
+            seen.append(e)
+
+    monkeypatch.chdir(tmp_path)
+    f = Flowmancer()
+    f._registered_loggers = dict()
+    f._registered_extensions = {'stuck': StuckExtension()}
+    # The default `block` policy, with room for a single event.
+    f._extension_queue_settings['stuck'] = (1, 'block')
+    for i in range(5):
+        f.add_executor(name=f't{i}', task_class=success_task_cls, deps=[f't{i - 1}'] if i else [])
+    job = asyncio.create_task(f._initiate())
+
+    async def _all_completed() -> None:
+        while len(f._states[ExecutionState.COMPLETED]) < 5:
+            await asyncio.sleep(0.01)
+
+    # The job keeps track of its tasks while the extension has yet to handle a single event.
+    await asyncio.wait_for(_all_completed(), 10)
+    assert not seen
+    release.set()
+    assert await asyncio.wait_for(job, 10) == 0
+    transitions = [e for e in seen if isinstance(e, ExecutionStateTransition)]
+    # Nothing was discarded on its account either.
+    assert len(transitions) == 15
@@ -0,0 +1,76 @@
+import os
+import pstats
+import tracemalloc
+from typing import cast
+
+import pytest
+
+from flowmancer.eventbus import EventBus
+from flowmancer.eventbus.execution import TaskProfile
+from flowmancer.executor import ProcessResult, exec_task_lifecycle
+from flowmancer.flowmancer import Flowmancer
+from flowmancer.jobdefinition import JobDefinition, TaskDefinition
+from flowmancer.task import Task, task
+
+
+@task
+class AllocatingTask(Task):
+    def run(self) -> None:
+        self.shared_dict['size'] = len([str(i) for i in range(20000)])
+
+
+def _profile_events(bus: EventBus):
+    events = []
+    while not bus.empty():
+        e = bus.get()
+        if isinstance(e, TaskProfile):
+            events.append(e)
+    return events
+
+
+def test_profile_cpu_and_memory(tmp_path):
+    bus = EventBus('flowmancer')
+    result = ProcessResult()
+    exec_task_lifecycle(
+        'alloc', AllocatingTask, None, bus, result, dict(), profile=['cpu', 'memory'], profile_directory=str(tmp_path)
+    )
+    assert not result.is_failed
+    events = _profile_events(bus)
+    assert len(events) == 1
+    e = cast(TaskProfile, events[0])
+    assert e.name == 'alloc'
+    assert e.profile_path == str(tmp_path / 'alloc.prof')
+    assert any('run' in f.function for f in e.top_functions)
+    pstats.Stats(e.profile_path)
+    assert e.snapshot_path is not None and os.path.exists(e.snapshot_path)
+    assert e.peak_traced_memory_bytes and e.peak_traced_memory_bytes > 0
+    assert e.top_allocations
+    assert not tracemalloc.is_tracing()
+
+
+def test_profile_cpu_only(tmp_path):
+    bus = EventBus('flowmancer')
+    exec_task_lifecycle(
+        'alloc', AllocatingTask, None, bus, ProcessResult(), dict(), profile=['cpu'], profile_directory=str(tmp_path)
+    )
+    e = _profile_events(bus)[0]
+    assert e.snapshot_path is None and e.peak_traced_memory_bytes is None
+    assert os.listdir(tmp_path) == ['alloc.prof']
+
+
+def test_profile_off(tmp_path):
+    bus = EventBus('flowmancer')
+    exec_task_lifecycle('alloc', AllocatingTask, None, bus, ProcessResult(), dict(), profile_directory=str(tmp_path))
+    assert _profile_events(bus) == []
+    assert os.listdir(tmp_path) == []
+
+
+def test_profile_from_job_definition():
+    f = Flowmancer(test=True)
+    j = JobDefinition(tasks={'alloc': TaskDefinition(task='AllocatingTask', profile=['memory'])})
+    f.load_job_definition(j, '.')
+    assert f._executors['alloc'].instance.profile == ['memory']
+    f.enable_profiling('alloc')
+    assert f._executors['alloc'].instance.profile == ['cpu', 'memory']
+    with pytest.raises(ValueError):
+        f.enable_profiling('missing')
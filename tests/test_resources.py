@@ -0,0 +1,39 @@
+from multiprocessing import Process, Queue
+from typing import Any, cast
+
+from flowmancer.eventbus import EventBus
+from flowmancer.eventbus.execution import TaskResourceUsage
+from flowmancer.executor import ProcessResult, exec_task_lifecycle
+from flowmancer.resources import collect_resource_usage
+from flowmancer.task import Task, task
+
+
+@task
+class BusyTask(Task):
+    def run(self) -> None:
+        self.shared_dict['total'] = sum(i * i for i in range(200000))
+
+
+def test_collect_resource_usage():
+    usage = collect_resource_usage('task', 0.0)
+    assert usage is not None
+    assert usage.name == 'task'
+    assert usage.max_rss_bytes > 0
+    assert usage.user_cpu_seconds + usage.system_cpu_seconds > 0
+
+
+def test_resource_usage_event_from_child_process():
+    bus = EventBus('flowmancer', cast(Any, Queue()))
+    result = ProcessResult()
+    proc = Process(target=exec_task_lifecycle, args=('busy', BusyTask, None, bus, result))
+    proc.start()
+    proc.join()
+    events = []
+    while not bus.empty():
+        events.append(bus.get())
+    usage = [e for e in events if isinstance(e, TaskResourceUsage)]
+    assert len(usage) == 1
+    assert usage[0].name == 'busy'
+    assert usage[0].wall_seconds > 0
+    assert usage[0].user_cpu_seconds > 0
+    assert usage[0].max_rss_bytes > 1024 * 1024
@@ -0,0 +1,42 @@
+import subprocess
+
+import pytest
+
+from flowmancer.exceptions import CommandFailedError
+from flowmancer.retry import backoff_seconds, is_retryable
+
+
+def test_fixed_backoff():
+    assert [backoff_seconds('fixed', 2, a, 0) for a in (1, 2, 3)] == [2, 2, 2]
+
+
+def test_exponential_backoff_is_capped():
+    delays = []
+    for attempt in range(1, 6):
+        delays.append(backoff_seconds('exponential', 1, attempt, 0, cap=10))
+    assert delays == [1, 2, 4, 8, 10]
+
+
+def test_decorrelated_jitter_backoff():
+    previous = 0.0
+    for attempt in range(1, 50):
+        delay = backoff_seconds('decorrelated_jitter', 1, attempt, previous, cap=30)
+        assert 1 <= delay <= min(30, max(1, previous or 1) * 3)
+        previous = delay
+    # Tasks that failed together do not retry together.
+    assert len({backoff_seconds('decorrelated_jitter', 1, 1, 0) for _ in range(10)}) > 1
+
+
+@pytest.mark.parametrize('cause, retry_on, expected', [
+    (RuntimeError('x'), [], True),
+    (ConnectionResetError('x'), ['ConnectionError'], True),
+    (ConnectionResetError('x'), ['builtins.ConnectionResetError'], True),
+    (ValueError('x'), ['ConnectionError', 75], False),
+    (subprocess.TimeoutExpired('cmd', 1), ['subprocess.TimeoutExpired'], True),
+    (CommandFailedError('exited', 75), [75], True),
+    (CommandFailedError('exited', 1), [75], False),
+    (3, [3], True),
+    (3, ['SystemExit'], False),
+])
+def test_is_retryable(cause, retry_on, expected):
+    assert is_retryable(cause, retry_on) == expected
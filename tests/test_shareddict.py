@@ -0,0 +1,93 @@
+from multiprocessing import Process
+from typing import Any, Dict, cast
+
+import pytest
+
+from flowmancer.eventbus.execution import ExecutionState
+from flowmancer.flowmancer import Flowmancer
+from flowmancer.jobdefinition import SharedStateBackend
+from flowmancer.shareddict import SharedMemoryDict, SharedMemoryFullError
+from flowmancer.task import _task_classes
+
+
+@pytest.fixture
+def shm_dict():
+    d = SharedMemoryDict.create(64 * 1024)
+    yield d
+    d.close()
+    d.unlink()
+
+
+def _write_from_child(d: SharedMemoryDict) -> None:
+    d['child'] = 'hello'
+    d['counter'] = d['counter'] + 1
+    del d['removed']
+
+
+def test_dict_interface(shm_dict):
+    shm_dict['a'] = 1
+    shm_dict.update({'b': [1, 2], 'c': {'x': 'y'}})
+    del shm_dict['a']
+    assert 'a' not in shm_dict
+    assert len(shm_dict) == 2
+    assert sorted(shm_dict) == ['b', 'c']
+    assert shm_dict.get('missing', 'default') == 'default'
+    assert shm_dict.copy() == {'b': [1, 2], 'c': {'x': 'y'}}
+    with pytest.raises(KeyError):
+        del shm_dict['missing']
+
+
+def test_mutable_values_are_not_shared_from_cache(shm_dict):
+    shm_dict['events'] = []
+    shm_dict['events'].append('lost')
+    assert shm_dict['events'] == []
+
+
+def test_writes_visible_across_processes(shm_dict):
+    shm_dict['counter'] = 1
+    shm_dict['removed'] = True
+    # Warm the parent's cache so that the child's writes must invalidate it.
+    assert shm_dict['counter'] == 1 and 'removed' in shm_dict
+    version = shm_dict.version('counter')
+    proc = Process(target=_write_from_child, args=(shm_dict,))
+    proc.start()
+    proc.join()
+    assert shm_dict['child'] == 'hello'
+    assert shm_dict['counter'] == 2
+    assert shm_dict.version('counter') > version
+    assert 'removed' not in shm_dict
+
+
+def test_compaction_keeps_latest_values():
+    d = SharedMemoryDict.create(4 * 1024)
+    try:
+        for i in range(1000):
+            d['key'] = i
+            d[f'other{i % 3}'] = 'x' * 100
+        assert d['key'] == 999
+        assert sorted(d) == ['key', 'other0', 'other1', 'other2']
+        with pytest.raises(SharedMemoryFullError):
+            d['huge'] = 'x' * 8192
+    finally:
+        d.close()
+        d.unlink()
+
+
+def test_task_uses_shared_memory_dict(shm_dict):
+    shm_dict['events'] = []
+    task_instance = _task_classes['LifecycleSuccessTask'](shared_dict=cast(Dict[str, Any], shm_dict))
+    task_instance.on_create()
+    task_instance.run()
+    assert shm_dict['events'] == ['on_create', 'run']
+
+
+def test_shared_memory_backend_run(success_task_cls, fail_task_cls):
+    f = Flowmancer(test=True)
+    f._config.shared_state = SharedStateBackend.SHARED_MEMORY
+    f.add_executor(name='a', task_class=success_task_cls)
+    f.add_executor(name='b', task_class=fail_task_cls, max_attempts=3)
+    retcode = f.start()
+    assert retcode == 1
+    assert f._manager is None
+    assert f._executors['a'].instance.state == ExecutionState.COMPLETED
+    assert f._shared_dict == {'myvar': 'success', 'fail_counter': 3}
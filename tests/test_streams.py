@@ -0,0 +1,118 @@
+import pytest
+
+from flowmancer.eventbus.execution import ExecutionState
+from flowmancer.exceptions import TaskValidationError
+from flowmancer.flowmancer import Flowmancer
+from flowmancer.streams import StreamChannel, StreamClosedError, TaskStreams, UpstreamStreamError
+from flowmancer.task import Task, task
+
+
+@task
+class StreamProducerTask(Task):
+    count: int = 500
+    fail_after: int = -1
+
+    def run(self) -> None:
+        for i in range(self.count):
+            if i == self.fail_after:
+                raise RuntimeError('producer failed')
+            self.streams.write(i)
+
+
+@task
+class StreamConsumerTask(Task):
+    stop_after: int = -1
+
+    def run(self) -> None:
+        total = 0
+        for i, r in enumerate(self.streams.read()):
+            if i == self.stop_after:
+                raise RuntimeError('consumer failed')
+            total += r
+        self.shared_dict['total'] = total
+
+
+def test_channel_roundtrip():
+    # Leaves room for every batch, since nothing reads from the channel until the writer is done.
+    c = StreamChannel(capacity=1000)
+    writer = TaskStreams(outputs={'consumer': c})
+    reader = TaskStreams(inputs={'producer': c})
+    for i in range(250):
+        writer.write(i)
+    writer.end()
+    assert list(reader.read()) == list(range(250))
+
+
+def test_channel_error_propagates():
+    c = StreamChannel(capacity=10)
+    writer = TaskStreams(outputs={'consumer': c})
+    reader = TaskStreams(inputs={'producer': c})
+    writer.write(1)
+    writer.end('boom')
+    with pytest.raises(UpstreamStreamError):
+        list(reader.read('producer'))
+
+
+def test_writer_unblocked_when_reader_closes():
+    c = StreamChannel(capacity=1)
+    writer = TaskStreams(outputs={'consumer': c})
+    writer.write(1)
+    TaskStreams(inputs={'producer': c}).end()
+    with pytest.raises(StreamClosedError):
+        writer.write(2)
+
+
+def test_reader_not_left_waiting_on_exited_writer():
+    c = StreamChannel(capacity=10)
+    c.mark_writer_exited()
+    with pytest.raises(UpstreamStreamError):
+        list(TaskStreams(inputs={'producer': c}).read())
+
+
+def test_write_without_consumers_is_discarded():
+    TaskStreams().write(1)
+
+
+def test_streaming_job():
+    f = Flowmancer(test=True)
+    # The consumer does not need a slot of its own, so this does not deadlock even with a full channel.
+    f._config.max_concurrency = 1
+    f.add_executor(name='extract', task_class=StreamProducerTask)
+    f.add_executor(name='transform', task_class=StreamConsumerTask, streams_from=['extract'], stream_capacity=10)
+    retcode = f.start()
+    assert retcode == 0
+    assert f._shared_dict['total'] == sum(range(500))
+
+
+def test_streaming_job_producer_failure():
+    f = Flowmancer(test=True)
+    f.add_executor(name='extract', task_class=StreamProducerTask, parameters={'fail_after': 100})
+    f.add_executor(name='transform', task_class=StreamConsumerTask, streams_from=['extract'], stream_capacity=10)
+    retcode = f.start()
+    assert retcode == 2
+    assert f._states[ExecutionState.FAILED] == {'extract', 'transform'}
+    assert 'total' not in f._shared_dict
+
+
+def test_streaming_job_consumer_failure():
+    f = Flowmancer(test=True)
+    f.add_executor(name='extract', task_class=StreamProducerTask, parameters={'count': 100000})
+    f.add_executor(
+        name='transform',
+        task_class=StreamConsumerTask,
+        streams_from=['extract'],
+        stream_capacity=10,
+        parameters={'stop_after': 5}
+    )
+    retcode = f.start()
+    assert retcode == 2
+    assert f._states[ExecutionState.FAILED] == {'extract', 'transform'}
+
+
+def test_streaming_validation():
+    f = Flowmancer(test=True)
+    f.add_executor(name='extract', task_class=StreamProducerTask, max_attempts=2)
+    f.add_executor(name='transform', task_class=StreamConsumerTask, streams_from=['extract', 'missing'])
+    with pytest.raises(TaskValidationError) as e:
+        f._validate_tasks()
+    assert len(e.value.errors) == 2